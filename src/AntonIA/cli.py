@@ -1,7 +1,10 @@
 # src/AntonIA/cli.py
 import argparse
+import asyncio
 import logging
-from AntonIA.pipeline import main as run_pipeline
+import sys
+from AntonIA.common.config import DEFAULT_CONFIG_DIR, list_personas
+from AntonIA.pipeline import main as run_pipeline, amain as run_pipeline_async, run_batch, run_batch_offline, collect_storage_garbage, migrate_storage
 
 def main():
     parser = argparse.ArgumentParser(
@@ -15,6 +18,70 @@ def main():
         help="Name of the persona configuration to use (without .yaml extension)",
     )
 
+    parser.add_argument(
+        "--personas",
+        type=str,
+        help="Comma-separated persona names to run as one batch (e.g. 'a,b,c')",
+    )
+
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Run every persona found in the config directory as one batch",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Maximum number of personas running concurrently in batch mode",
+    )
+
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use the asyncio pipeline, generating caption and image concurrently",
+    )
+
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Send the LLM requests of every persona through the Batch API (cheaper, completes within hours)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="RUN_ID",
+        help="Resume a failed run from its last completed stage",
+    )
+
+    parser.add_argument(
+        "--gc-storage",
+        action="store_true",
+        help="Delete stored images no longer referenced by any saved file name, then exit",
+    )
+
+    parser.add_argument(
+        "--migrate-storage",
+        action="store_true",
+        help="Move the images of a flat storage directory into the configured sharding, then exit",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --migrate-storage, only list the moves",
+    )
+
+    parser.add_argument(
+        "--config-dir",
+        type=str,
+        default=DEFAULT_CONFIG_DIR,
+        help="Path to the configuration directory",
+    )
+
     parser.add_argument(
         "--verbose",
         "-v",
@@ -23,6 +90,10 @@ def main():
     )
 
     args = parser.parse_args()
+    if args.resume and (args.use_async or args.all or args.personas):
+        parser.error("--resume only applies to a single, non --async run")
+    if args.offline and (args.use_async or args.resume):
+        parser.error("--offline cannot be combined with --async or --resume")
 
     # Configure logging
     logging.basicConfig(
@@ -30,8 +101,35 @@ def main():
         format="[%(asctime)s] %(levelname)s - %(message)s",
     )
 
+    if args.migrate_storage:
+        moves = migrate_storage(config_dir=args.config_dir, dry_run=args.dry_run)
+        print(f"{'Would move' if args.dry_run else 'Moved'} {len(moves)} images")
+        return
+
+    if args.gc_storage:
+        removed, freed = collect_storage_garbage(persona=args.persona, config_dir=args.config_dir)
+        print(f"Removed {removed} unreferenced images ({freed} bytes)")
+        return
+
+    # Batch mode: several personas in one process
+    if args.all or args.personas or args.offline:
+        if args.all:
+            personas = list_personas(args.config_dir)
+        elif args.personas:
+            personas = [p.strip() for p in args.personas.split(",") if p.strip()]
+        else:
+            personas = [args.persona]
+        run = run_batch_offline if args.offline else run_batch
+        results = run(personas, config_dir=args.config_dir, max_workers=args.workers)
+        if not all(result.success for result in results):
+            sys.exit(1)
+        return
+
     # Run the pipeline
-    run_pipeline(persona=args.persona, config_dir=args.config_dir)
+    if args.use_async:
+        asyncio.run(run_pipeline_async(persona=args.persona, config_dir=args.config_dir))
+    else:
+        run_pipeline(persona=args.persona, config_dir=args.config_dir, resume_run_id=args.resume)
 
 if __name__ == "__main__":
     main()
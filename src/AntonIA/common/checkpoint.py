@@ -0,0 +1,89 @@
+"""
+checkpoint.py
+-------------
+Persists the outputs of each pipeline stage in a run-scoped directory, so a run that
+fails halfway can be resumed from its last completed stage instead of starting over.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import shutil
+import uuid
+from datetime import datetime
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Optional
+
+
+logger = getLogger("AntonIA.checkpoint")
+
+METADATA_FILE = "run.json"
+STAGE_FILE_SUFFIX = ".pkl"
+
+
+class CheckpointError(RuntimeError):
+    """Raised when a checkpoint cannot be resumed."""
+
+
+def new_run_id(persona: str) -> str:
+    return f"{persona}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+class RunCheckpoint:
+    """
+    Stage outputs of a single pipeline run, stored as `<checkpoint_dir>/<run_id>/<stage>.pkl`.
+
+    Use `RunCheckpoint.create` for a new run and `RunCheckpoint.resume` to pick up a
+    previous one. `completed_stages()` returns what the StageGraph needs to skip the
+    stages that already ran, and `save_stage` is meant as its `on_stage_complete` callback.
+    """
+    def __init__(self, directory: Path, run_id: str, persona: str):
+        self.directory = directory
+        self.run_id = run_id
+        self.persona = persona
+
+    @classmethod
+    def create(cls, checkpoint_dir: str, persona: str) -> "RunCheckpoint":
+        run_id = new_run_id(persona)
+        directory = Path(checkpoint_dir) / run_id
+        directory.mkdir(parents=True)
+        (directory / METADATA_FILE).write_text(
+            json.dumps({"run_id": run_id, "persona": persona, "created": datetime.now().isoformat()}),
+            encoding="utf-8",
+        )
+        return cls(directory, run_id, persona)
+
+    @classmethod
+    def resume(cls, checkpoint_dir: str, run_id: str, persona: Optional[str] = None) -> "RunCheckpoint":
+        directory = Path(checkpoint_dir) / run_id
+        metadata_path = directory / METADATA_FILE
+        if not metadata_path.exists():
+            raise CheckpointError(f"No checkpoint found for run '{run_id}' in {checkpoint_dir}")
+
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        if persona is not None and metadata["persona"] != persona:
+            raise CheckpointError(f"Run '{run_id}' belongs to persona '{metadata['persona']}', not '{persona}'")
+        return cls(directory, run_id, metadata["persona"])
+
+    def save_stage(self, stage: str, outputs: dict[str, Any]) -> None:
+        """Persist a stage's outputs, atomically so a crash never leaves a half-written stage."""
+        path = self.directory / f"{stage}{STAGE_FILE_SUFFIX}"
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(outputs, f)
+        os.replace(tmp_path, path)
+        logger.debug(f"Checkpointed stage '{stage}' of run '{self.run_id}'")
+
+    def completed_stages(self) -> dict[str, dict[str, Any]]:
+        """Return the outputs of every checkpointed stage, by stage name."""
+        completed = {}
+        for path in sorted(self.directory.glob(f"*{STAGE_FILE_SUFFIX}")):
+            with open(path, "rb") as f:
+                completed[path.stem] = pickle.load(f)
+        return completed
+
+    def clear(self) -> None:
+        """Delete the checkpoint once the run has completed."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import os
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
@@ -26,14 +26,80 @@ ENV_OPENAI_API_KEY = "OPENAI_API_KEY"
 # Default model / runtime defaults
 DEFAULT_LLM_MODEL = "gpt-4.1-nano"
 DEFAULT_LLM_TEMPERATURE = 0.8
+DEFAULT_LLM_REPAIR_ATTEMPTS = 2
 
 DEFAULT_IMAGE_MODEL = "gpt-image-1-mini"
 DEFAULT_IMAGE_SIZE = "1024x1024"
 DEFAULT_IMAGE_STORAGE_PATH = "./outputs/images"
+DEFAULT_IMAGE_CANDIDATES = 1
+DEFAULT_IMAGE_CANDIDATES_DESTINATION = "candidates"
+IMAGE_SCORING_METRICS = ("sharpness", "colorfulness", "text_contrast")  # see AntonIA.utils.image_scoring.METRICS
+DEFAULT_IMAGE_SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+# Post-processing defaults (see AntonIA.utils.image_postprocessing)
+DEFAULT_WATERMARK_OPACITY = 0.8
+DEFAULT_WATERMARK_SCALE = 0.2
+DEFAULT_PHRASE_SIZE_RATIO = 0.05
+
+# Output encoding defaults (see AntonIA.utils.image_handle.EncodingOptions)
+DEFAULT_IMAGE_FORMAT = "PNG"
+IMAGE_FORMATS = ("PNG", "JPEG", "WEBP")
+DEFAULT_IMAGE_QUALITY = 90
+DEFAULT_PNG_COMPRESS_LEVEL = 6
 
 # Database keys / defaults
 DEFAULT_DB_PAST_RECORDS_KEY = "past_records_path"
 DEFAULT_DB_PAST_RECORDS_TO_RETRIEVE = 10
+DEFAULT_DB_BACKEND = "parquet"
+DB_BACKENDS = ("parquet", "sqlite")
+DEFAULT_DB_STORAGE_MODE = "file"
+DB_STORAGE_MODES = ("file", "dataset")
+DEFAULT_DB_COMPACTION_THRESHOLD = 32
+
+# Storage defaults (see AntonIA.services.storage_client.LocalStorageClient)
+DEFAULT_STORAGE_FSYNC = "none"
+STORAGE_FSYNC_MODES = ("none", "always", "batch")
+DEFAULT_STORAGE_FSYNC_BATCH_SIZE = 16
+DEFAULT_STORAGE_LAYOUT = "plain"
+STORAGE_LAYOUTS = ("plain", "content_addressed")
+DEFAULT_STORAGE_SHARDING = "flat"
+STORAGE_SHARDINGS = ("flat", "date", "persona_date", "hash")
+DEFAULT_STORAGE_BACKEND = "local"
+STORAGE_BACKENDS = ("local", "s3")
+DEFAULT_S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_S3_MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_S3_MAX_CONCURRENCY = 4
+DEFAULT_S3_MAX_POOL_CONNECTIONS = 16
+
+# Pipeline defaults
+DEFAULT_CHECKPOINT_DIR = "./outputs/checkpoints"
+
+# Retry defaults (see AntonIA.services.retry.RetryPolicy)
+DEFAULT_RETRY_MAX_ATTEMPTS = 4
+DEFAULT_RETRY_BASE_DELAY = 1.0
+DEFAULT_RETRY_MAX_DELAY = 30.0
+DEFAULT_RETRY_JITTER = 0.5
+DEFAULT_RETRY_DEADLINE_SECONDS = 120.0
+DEFAULT_RETRY_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+# Rate limit defaults (see AntonIA.services.rate_limiter.TokenBucketRateLimiter)
+DEFAULT_RATE_LIMIT_BURST_SECONDS = 10.0
+
+# HTTP connection pool defaults (see AntonIA.services.http_client.HttpPoolSettings)
+DEFAULT_HTTP_MAX_CONNECTIONS = 20
+DEFAULT_HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_HTTP_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_HTTP_CONNECT_TIMEOUT = 10.0
+DEFAULT_HTTP_TIMEOUT = 600.0
+
+# Batch API defaults (offline mode, see AntonIA.services.batch_client.OpenAIBatchClient)
+DEFAULT_BATCH_POLL_INTERVAL = 30.0
+DEFAULT_BATCH_TIMEOUT = 24 * 3600.0
+DEFAULT_BATCH_COMPLETION_WINDOW = "24h"
+
+# Cache defaults
+DEFAULT_CACHE_MAX_ENTRIES = 256
 
 # Prompt keys tolerated in persona yaml
 PROMPT_KEY_SYSTEM = "system"
@@ -48,12 +114,51 @@ class ConfigError(RuntimeError):
     """Raised when configuration loading/validation fails."""
 
 
+@dataclass
+class CacheConfig:
+    enabled: bool = False
+    directory: Optional[str] = None  # memory-only cache when not set
+    max_entries: int = DEFAULT_CACHE_MAX_ENTRIES
+    ttl_seconds: Optional[float] = None
+    max_bytes: Optional[int] = None
+
+
 @dataclass
 class LLMConfig:
     api_key: str
     model: str
     temperature: float
     system_prompt: str
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    stream: bool = False  # stream the prompt response and start the caption as soon as its fields arrive
+    structured_output: bool = False  # constrain the prompt response to the expected JSON schema
+    repair_attempts: int = DEFAULT_LLM_REPAIR_ATTEMPTS  # requests allowed to repair a malformed prompt response
+
+
+@dataclass
+class PostprocessingConfig:
+    """Steps applied to the generated image, in this order; neutral values skip the step."""
+    aspect_ratio: Optional[str] = None  # centre crop, e.g. "1:1", "4:5" or "1.91:1" for Instagram
+    width: Optional[int] = None  # resize after cropping, e.g. 1080
+    brightness: float = 0.0
+    contrast: float = 1.0
+    saturation: float = 1.0
+    warmth: float = 0.0
+    sharpen: float = 0.0
+    phrase_overlay: bool = False  # write the phrase on the image
+    font_path: Optional[str] = None
+    phrase_size_ratio: float = DEFAULT_PHRASE_SIZE_RATIO
+    watermark_opacity: float = DEFAULT_WATERMARK_OPACITY
+    watermark_scale: float = DEFAULT_WATERMARK_SCALE
+
+
+@dataclass
+class EncodingConfig:
+    format: str = DEFAULT_IMAGE_FORMAT  # "PNG", "JPEG" or "WEBP"
+    quality: int = DEFAULT_IMAGE_QUALITY  # JPEG / WEBP
+    compress_level: int = DEFAULT_PNG_COMPRESS_LEVEL  # PNG, 0-9
+    optimize: bool = False
+    progressive: bool = False  # JPEG
 
 
 @dataclass
@@ -62,6 +167,14 @@ class ImageConfig:
     model: str
     size: str
     storage_path: str
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    candidates: int = DEFAULT_IMAGE_CANDIDATES  # images requested per run, the best scored one is kept
+    archive_candidates: bool = False  # store the rejected candidates under `storage_path/candidates`
+    scoring_weights: Optional[Dict[str, float]] = None  # see AntonIA.utils.image_scoring, None for defaults
+    postprocessing: PostprocessingConfig = field(default_factory=PostprocessingConfig)
+    encoding: EncodingConfig = field(default_factory=EncodingConfig)
+    stream_decode: bool = False  # decode the API response in chunks to a spooled file instead of bytes
+    spool_max_memory: int = DEFAULT_IMAGE_SPOOL_MAX_MEMORY  # bytes kept in memory before spilling to disk
 
 
 @dataclass
@@ -76,6 +189,9 @@ class DatabaseConfig:
     past_records_path: str
     runs_table_name: str
     past_records_to_retrieve: int
+    backend: str = DEFAULT_DB_BACKEND
+    storage_mode: str = DEFAULT_DB_STORAGE_MODE
+    compaction_threshold: int = DEFAULT_DB_COMPACTION_THRESHOLD
 
 
 @dataclass
@@ -90,6 +206,75 @@ class GrandmaConfig:
         return f"{self.name}_runs"
 
 
+@dataclass
+class RetryConfig:
+    max_attempts: int = DEFAULT_RETRY_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_RETRY_BASE_DELAY
+    max_delay: float = DEFAULT_RETRY_MAX_DELAY
+    jitter: float = DEFAULT_RETRY_JITTER
+    deadline_seconds: Optional[float] = DEFAULT_RETRY_DEADLINE_SECONDS
+    retryable_status_codes: tuple[int, ...] = DEFAULT_RETRY_STATUS_CODES
+
+
+@dataclass
+class ModelRateLimitConfig:
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+@dataclass
+class RateLimitConfig:
+    enabled: bool = False
+    state_file: Optional[str] = None  # shared by every process on the host when set
+    burst_seconds: float = DEFAULT_RATE_LIMIT_BURST_SECONDS
+    models: Dict[str, ModelRateLimitConfig] = field(default_factory=dict)
+
+
+@dataclass
+class HttpConfig:
+    max_connections: int = DEFAULT_HTTP_MAX_CONNECTIONS
+    max_keepalive_connections: int = DEFAULT_HTTP_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = DEFAULT_HTTP_KEEPALIVE_EXPIRY
+    connect_timeout: float = DEFAULT_HTTP_CONNECT_TIMEOUT
+    timeout: float = DEFAULT_HTTP_TIMEOUT
+
+
+@dataclass
+class BatchConfig:
+    poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL
+    timeout: float = DEFAULT_BATCH_TIMEOUT
+    completion_window: str = DEFAULT_BATCH_COMPLETION_WINDOW
+    base_url: Optional[str] = None  # None for the OpenAI API
+
+
+@dataclass
+class PipelineConfig:
+    checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR
+
+
+@dataclass
+class S3Config:
+    bucket: Optional[str] = None
+    prefix: str = ""
+    endpoint_url: Optional[str] = None  # None for AWS, e.g. "http://localhost:9000" for MinIO
+    region: Optional[str] = None
+    multipart_threshold: int = DEFAULT_S3_MULTIPART_THRESHOLD
+    multipart_chunk_size: int = DEFAULT_S3_MULTIPART_CHUNK_SIZE
+    max_concurrency: int = DEFAULT_S3_MAX_CONCURRENCY
+    max_pool_connections: int = DEFAULT_S3_MAX_POOL_CONNECTIONS
+    verify_etag: bool = False  # ETags are not MD5s with SSE-KMS / SSE-C and on some S3-compatible stores
+
+
+@dataclass
+class StorageConfig:
+    backend: str = DEFAULT_STORAGE_BACKEND  # "local" (image.storage_path) or "s3"
+    fsync: str = DEFAULT_STORAGE_FSYNC  # "none", "always" or "batch"
+    fsync_batch_size: int = DEFAULT_STORAGE_FSYNC_BATCH_SIZE
+    layout: str = DEFAULT_STORAGE_LAYOUT  # "plain" or "content_addressed"
+    sharding: str = DEFAULT_STORAGE_SHARDING  # "flat", "date", "persona_date" or "hash"
+    s3: S3Config = field(default_factory=S3Config)
+
+
 @dataclass
 class Config:
     grandma: GrandmaConfig
@@ -97,6 +282,12 @@ class Config:
     image: ImageConfig
     prompts: PromptsConfig
     database: DatabaseConfig
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    rate_limits: RateLimitConfig = field(default_factory=RateLimitConfig)
+    http: HttpConfig = field(default_factory=HttpConfig)
+    batch: BatchConfig = field(default_factory=BatchConfig)
+    storage: StorageConfig = field(default_factory=StorageConfig)
 
 
 # -------------------------
@@ -166,6 +357,18 @@ def _resolve_api_key(base_config: Dict[str, Any]) -> str:
     raise ConfigError(f"{ENV_OPENAI_API_KEY} not found in environment or base config.")
 
 
+def _build_cache_config(cache: Dict[str, Any]) -> CacheConfig:
+    ttl_seconds = cache.get("ttl_seconds")
+    max_bytes = cache.get("max_bytes")
+    return CacheConfig(
+        enabled=bool(cache.get("enabled", False)),
+        directory=cache.get("directory"),
+        max_entries=int(cache.get("max_entries", DEFAULT_CACHE_MAX_ENTRIES)),
+        ttl_seconds=float(ttl_seconds) if ttl_seconds is not None else None,
+        max_bytes=int(max_bytes) if max_bytes is not None else None,
+    )
+
+
 def _build_llm_config(base_config: Dict[str, Any], persona_prompts: Dict[str, Any], api_key: str) -> LLMConfig:
     llm = base_config.get("LLM", base_config.get("llm", {}))
     model = llm.get("model", DEFAULT_LLM_MODEL)
@@ -174,17 +377,147 @@ def _build_llm_config(base_config: Dict[str, Any], persona_prompts: Dict[str, An
     # system prompt is typically defined in persona prompts under 'system'
     system_prompt = first_present(persona_prompts, PROMPT_KEY_SYSTEM, "system_prompt", default="")
 
-    return LLMConfig(api_key=api_key, model=model, temperature=temperature, system_prompt=system_prompt)
+    llm_config = LLMConfig(
+        api_key=api_key,
+        model=model,
+        temperature=temperature,
+        system_prompt=system_prompt,
+        cache=_build_cache_config(llm.get("cache", {})),
+        stream=bool(llm.get("stream", False)),
+        structured_output=bool(llm.get("structured_output", False)),
+        repair_attempts=int(llm.get("repair_attempts", DEFAULT_LLM_REPAIR_ATTEMPTS)),
+    )
+    if llm_config.repair_attempts < 0:
+        raise ConfigError(f"LLM repair_attempts must be >= 0, got {llm_config.repair_attempts}.")
+    return llm_config
 
 
 def _build_image_config(base_config: Dict[str, Any], api_key: str) -> ImageConfig:
     image = base_config.get("image", {})
-    return ImageConfig(
+    image_config = ImageConfig(
         api_key=api_key,
         model=image.get("model", DEFAULT_IMAGE_MODEL),
         size=image.get("size", DEFAULT_IMAGE_SIZE),
         storage_path=image.get("storage_path", DEFAULT_IMAGE_STORAGE_PATH),
+        cache=_build_cache_config(image.get("cache", {})),
+        candidates=int(image.get("candidates", DEFAULT_IMAGE_CANDIDATES)),
+        archive_candidates=bool(image.get("archive_candidates", False)),
+        scoring_weights=image.get("scoring_weights"),
+        postprocessing=_build_postprocessing_config(image.get("postprocessing") or {}),
+        encoding=_build_encoding_config(image.get("encoding") or {}),
+        stream_decode=bool(image.get("stream_decode", False)),
+        spool_max_memory=int(image.get("spool_max_memory", DEFAULT_IMAGE_SPOOL_MAX_MEMORY)),
+    )
+    if not 1 <= image_config.candidates <= 10:
+        raise ConfigError("'image.candidates' must be between 1 and 10.")
+    if image_config.spool_max_memory < 0:
+        raise ConfigError("'image.spool_max_memory' must be >= 0.")
+    weights = image_config.scoring_weights
+    if weights is not None:
+        if not isinstance(weights, dict):
+            raise ConfigError("'image.scoring_weights' must be a mapping of metric names to weights.")
+        unknown = sorted(set(weights) - set(IMAGE_SCORING_METRICS))
+        if unknown:
+            raise ConfigError(f"Unknown 'image.scoring_weights' metrics {unknown}, expected some of {IMAGE_SCORING_METRICS}.")
+        if not all(isinstance(w, (int, float)) and not isinstance(w, bool) for w in weights.values()):
+            raise ConfigError("'image.scoring_weights' values must be numbers.")
+    return image_config
+
+
+def _build_storage_config(base_config: Dict[str, Any]) -> StorageConfig:
+    storage = base_config.get("storage") or {}
+    config = StorageConfig(
+        backend=str(storage.get("backend", DEFAULT_STORAGE_BACKEND)),
+        fsync=str(storage.get("fsync", DEFAULT_STORAGE_FSYNC)),
+        fsync_batch_size=int(storage.get("fsync_batch_size", DEFAULT_STORAGE_FSYNC_BATCH_SIZE)),
+        layout=str(storage.get("layout", DEFAULT_STORAGE_LAYOUT)),
+        sharding=str(storage.get("sharding", DEFAULT_STORAGE_SHARDING)),
+        s3=_build_s3_config(storage.get("s3") or {}),
     )
+    if config.backend not in STORAGE_BACKENDS:
+        raise ConfigError(f"Unknown storage backend '{config.backend}', expected one of {STORAGE_BACKENDS}.")
+    if config.backend == "s3" and not config.s3.bucket:
+        raise ConfigError("'storage.s3.bucket' is required with the s3 storage backend.")
+    if config.fsync not in STORAGE_FSYNC_MODES:
+        raise ConfigError(f"Unknown storage fsync mode '{config.fsync}', expected one of {STORAGE_FSYNC_MODES}.")
+    if config.fsync_batch_size < 1:
+        raise ConfigError("'storage.fsync_batch_size' must be >= 1.")
+    if config.layout not in STORAGE_LAYOUTS:
+        raise ConfigError(f"Unknown storage layout '{config.layout}', expected one of {STORAGE_LAYOUTS}.")
+    if config.sharding not in STORAGE_SHARDINGS:
+        raise ConfigError(f"Unknown storage sharding '{config.sharding}', expected one of {STORAGE_SHARDINGS}.")
+    return config
+
+
+def _build_s3_config(s3: Dict[str, Any]) -> S3Config:
+    config = S3Config(
+        bucket=s3.get("bucket"),
+        prefix=str(s3.get("prefix") or ""),
+        endpoint_url=s3.get("endpoint_url"),
+        region=s3.get("region"),
+        multipart_threshold=int(s3.get("multipart_threshold", DEFAULT_S3_MULTIPART_THRESHOLD)),
+        multipart_chunk_size=int(s3.get("multipart_chunk_size", DEFAULT_S3_MULTIPART_CHUNK_SIZE)),
+        max_concurrency=int(s3.get("max_concurrency", DEFAULT_S3_MAX_CONCURRENCY)),
+        max_pool_connections=int(s3.get("max_pool_connections", DEFAULT_S3_MAX_POOL_CONNECTIONS)),
+        verify_etag=bool(s3.get("verify_etag", False)),
+    )
+    if config.multipart_chunk_size < S3_MIN_PART_SIZE:
+        raise ConfigError(f"'storage.s3.multipart_chunk_size' must be at least {S3_MIN_PART_SIZE} bytes.")
+    if config.max_concurrency < 1 or config.max_pool_connections < 1:
+        raise ConfigError("'storage.s3.max_concurrency' and 'storage.s3.max_pool_connections' must be >= 1.")
+    return config
+
+
+def _build_encoding_config(encoding: Dict[str, Any]) -> EncodingConfig:
+    config = EncodingConfig(
+        format=str(encoding.get("format", DEFAULT_IMAGE_FORMAT)).upper(),
+        quality=int(encoding.get("quality", DEFAULT_IMAGE_QUALITY)),
+        compress_level=int(encoding.get("compress_level", DEFAULT_PNG_COMPRESS_LEVEL)),
+        optimize=bool(encoding.get("optimize", False)),
+        progressive=bool(encoding.get("progressive", False)),
+    )
+    if config.format == "JPG":
+        config.format = "JPEG"
+    if config.format not in IMAGE_FORMATS:
+        raise ConfigError(f"Unknown image encoding format '{config.format}', expected one of {IMAGE_FORMATS}.")
+    if not 1 <= config.quality <= 100:
+        raise ConfigError("'image.encoding.quality' must be between 1 and 100.")
+    if not 0 <= config.compress_level <= 9:
+        raise ConfigError("'image.encoding.compress_level' must be between 0 and 9.")
+    return config
+
+
+def _build_postprocessing_config(post: Dict[str, Any]) -> PostprocessingConfig:
+    width = post.get("width")
+    config = PostprocessingConfig(
+        aspect_ratio=post.get("aspect_ratio"),
+        width=int(width) if width is not None else None,
+        brightness=float(post.get("brightness", 0.0)),
+        contrast=float(post.get("contrast", 1.0)),
+        saturation=float(post.get("saturation", 1.0)),
+        warmth=float(post.get("warmth", 0.0)),
+        sharpen=float(post.get("sharpen", 0.0)),
+        phrase_overlay=bool(post.get("phrase_overlay", False)),
+        font_path=post.get("font_path"),
+        phrase_size_ratio=float(post.get("phrase_size_ratio", DEFAULT_PHRASE_SIZE_RATIO)),
+        watermark_opacity=float(post.get("watermark_opacity", DEFAULT_WATERMARK_OPACITY)),
+        watermark_scale=float(post.get("watermark_scale", DEFAULT_WATERMARK_SCALE)),
+    )
+    if config.aspect_ratio is not None:
+        parts = str(config.aspect_ratio).split(":")
+        try:
+            valid = len(parts) == 2 and all(float(part) > 0 for part in parts)
+        except ValueError:
+            valid = False
+        if not valid:
+            raise ConfigError(f"'image.postprocessing.aspect_ratio' must look like 'W:H', got '{config.aspect_ratio}'.")
+    if config.width is not None and config.width <= 0:
+        raise ConfigError("'image.postprocessing.width' must be positive.")
+    if not 0.0 <= config.watermark_opacity <= 1.0:
+        raise ConfigError("'image.postprocessing.watermark_opacity' must be between 0 and 1.")
+    if not 0.0 < config.watermark_scale <= 1.0:
+        raise ConfigError("'image.postprocessing.watermark_scale' must be in (0, 1].")
+    return config
 
 
 def _build_database_config(base_config: Dict[str, Any], grandma_name: str) -> DatabaseConfig:
@@ -194,10 +527,89 @@ def _build_database_config(base_config: Dict[str, Any], grandma_name: str) -> Da
     past_records_path = db.get(DEFAULT_DB_PAST_RECORDS_KEY, db.get("past_records_database_path"))
     past_records_to_retrieve = int(db.get("past_records_to_retrieve", DEFAULT_DB_PAST_RECORDS_TO_RETRIEVE))
     runs_table_name = f"{grandma_name}_runs"
+    backend = db.get("backend", DEFAULT_DB_BACKEND)
+    if backend not in DB_BACKENDS:
+        raise ConfigError(f"Unknown database backend '{backend}', expected one of {DB_BACKENDS}.")
+    storage_mode = db.get("storage_mode", DEFAULT_DB_STORAGE_MODE)
+    if storage_mode not in DB_STORAGE_MODES:
+        raise ConfigError(f"Unknown database storage mode '{storage_mode}', expected one of {DB_STORAGE_MODES}.")
     return DatabaseConfig(
         past_records_path=past_records_path,
         runs_table_name=runs_table_name,
         past_records_to_retrieve=past_records_to_retrieve,
+        backend=backend,
+        storage_mode=storage_mode,
+        compaction_threshold=int(db.get("compaction_threshold", DEFAULT_DB_COMPACTION_THRESHOLD)),
+    )
+
+
+def _build_pipeline_config(base_config: Dict[str, Any]) -> PipelineConfig:
+    pipeline = base_config.get("pipeline", {})
+    return PipelineConfig(checkpoint_dir=pipeline.get("checkpoint_dir", DEFAULT_CHECKPOINT_DIR))
+
+
+def _build_retry_config(base_config: Dict[str, Any]) -> RetryConfig:
+    retry = base_config.get("retry", {})
+    deadline_seconds = retry.get("deadline_seconds", DEFAULT_RETRY_DEADLINE_SECONDS)
+    retry_config = RetryConfig(
+        max_attempts=int(retry.get("max_attempts", DEFAULT_RETRY_MAX_ATTEMPTS)),
+        base_delay=float(retry.get("base_delay", DEFAULT_RETRY_BASE_DELAY)),
+        max_delay=float(retry.get("max_delay", DEFAULT_RETRY_MAX_DELAY)),
+        jitter=float(retry.get("jitter", DEFAULT_RETRY_JITTER)),
+        deadline_seconds=float(deadline_seconds) if deadline_seconds is not None else None,
+        retryable_status_codes=tuple(int(c) for c in retry.get("retryable_status_codes", DEFAULT_RETRY_STATUS_CODES)),
+    )
+    if retry_config.max_attempts < 1:
+        raise ConfigError("'retry.max_attempts' must be at least 1.")
+    if not 0 <= retry_config.jitter <= 1:
+        raise ConfigError("'retry.jitter' must be between 0 and 1.")
+    return retry_config
+
+
+def _build_rate_limit_config(base_config: Dict[str, Any]) -> RateLimitConfig:
+    rate_limits = base_config.get("rate_limits", {})
+    models = {}
+    for model, limits in (rate_limits.get("models") or {}).items():
+        limits = limits or {}
+        models[model] = ModelRateLimitConfig(
+            requests_per_minute=limits.get("requests_per_minute"),
+            tokens_per_minute=limits.get("tokens_per_minute"),
+        )
+        for key in ("requests_per_minute", "tokens_per_minute"):
+            value = getattr(models[model], key)
+            if value is not None and value <= 0:
+                raise ConfigError(f"'rate_limits.models.{model}.{key}' must be positive.")
+    return RateLimitConfig(
+        enabled=bool(rate_limits.get("enabled", False)),
+        state_file=rate_limits.get("state_file"),
+        burst_seconds=float(rate_limits.get("burst_seconds", DEFAULT_RATE_LIMIT_BURST_SECONDS)),
+        models=models,
+    )
+
+
+def _build_http_config(base_config: Dict[str, Any]) -> HttpConfig:
+    http = base_config.get("http", {})
+    http_config = HttpConfig(
+        max_connections=int(http.get("max_connections", DEFAULT_HTTP_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(http.get("max_keepalive_connections", DEFAULT_HTTP_MAX_KEEPALIVE_CONNECTIONS)),
+        keepalive_expiry=float(http.get("keepalive_expiry", DEFAULT_HTTP_KEEPALIVE_EXPIRY)),
+        connect_timeout=float(http.get("connect_timeout", DEFAULT_HTTP_CONNECT_TIMEOUT)),
+        timeout=float(http.get("timeout", DEFAULT_HTTP_TIMEOUT)),
+    )
+    if http_config.max_connections < 1:
+        raise ConfigError("'http.max_connections' must be at least 1.")
+    if http_config.max_keepalive_connections > http_config.max_connections:
+        raise ConfigError("'http.max_keepalive_connections' cannot exceed 'http.max_connections'.")
+    return http_config
+
+
+def _build_batch_config(base_config: Dict[str, Any]) -> BatchConfig:
+    batch = base_config.get("batch", {})
+    return BatchConfig(
+        poll_interval=float(batch.get("poll_interval", DEFAULT_BATCH_POLL_INTERVAL)),
+        timeout=float(batch.get("timeout", DEFAULT_BATCH_TIMEOUT)),
+        completion_window=str(batch.get("completion_window", DEFAULT_BATCH_COMPLETION_WINDOW)),
+        base_url=batch.get("base_url"),
     )
 
 
@@ -266,6 +678,12 @@ def load_config(persona: Optional[str] = None, config_dir: str = DEFAULT_CONFIG_
     image_cfg = _build_image_config(base_config, api_key)
     prompts_cfg = _build_prompts_config(persona_prompts)
     db_cfg = _build_database_config(base_config, grandma_cfg.name)
+    pipeline_cfg = _build_pipeline_config(base_config)
+    retry_cfg = _build_retry_config(base_config)
+    rate_limit_cfg = _build_rate_limit_config(base_config)
+    http_cfg = _build_http_config(base_config)
+    batch_cfg = _build_batch_config(base_config)
+    storage_cfg = _build_storage_config(base_config)
 
     config = Config(
         grandma=grandma_cfg,
@@ -273,6 +691,12 @@ def load_config(persona: Optional[str] = None, config_dir: str = DEFAULT_CONFIG_
         image=image_cfg,
         prompts=prompts_cfg,
         database=db_cfg,
+        pipeline=pipeline_cfg,
+        retry=retry_cfg,
+        rate_limits=rate_limit_cfg,
+        http=http_cfg,
+        batch=batch_cfg,
+        storage=storage_cfg,
     )
 
     logger.debug("Configuration loaded successfully: %s", config)
@@ -0,0 +1,202 @@
+"""
+stage_graph.py
+--------------
+A small executor for pipelines expressed as a graph of stages.
+
+Each stage declares the named values it consumes (inputs) and produces (outputs).
+The executor runs every stage as soon as its inputs are available, so independent
+stages run in parallel, skips stages whose outputs are already known (e.g. when
+resuming a run) and records how long each stage took.
+
+A stage can also publish some outputs before it finishes (e.g. fields parsed from a
+streamed response), so the stages depending on them start early.
+"""
+from __future__ import annotations
+
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Callable, Optional
+
+
+logger = getLogger("AntonIA.stage_graph")
+
+
+class StageGraphError(RuntimeError):
+    """Raised when the graph is invalid (unknown inputs, duplicated outputs, cycles)."""
+
+
+class StageFailedError(RuntimeError):
+    """Raised when a stage fails; the original exception is chained as the cause."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Stage '{stage}' failed.")
+        self.stage = stage
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A unit of work in the graph.
+
+    `fn` is called with the stage inputs as keyword arguments and must return
+    None when there are no outputs, the value itself for a single output, or a
+    tuple with one item per output otherwise.
+
+    Stages with `early_outputs` also get an `emit(name, value)` keyword argument to
+    publish those outputs before returning; they must still return every output.
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    early_outputs: tuple[str, ...] = ()
+
+    def outputs_from(self, returned: Any) -> dict[str, Any]:
+        if not self.outputs:
+            return {}
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: returned}
+        if not isinstance(returned, tuple) or len(returned) != len(self.outputs):
+            raise StageGraphError(f"Stage '{self.name}' must return a tuple of {len(self.outputs)} values.")
+        return dict(zip(self.outputs, returned))
+
+
+@dataclass
+class StageGraphResult:
+    values: dict[str, Any]
+    timings: dict[str, float] = field(default_factory=dict)
+    skipped: list[str] = field(default_factory=list)
+
+
+class StageGraph:
+    def __init__(self):
+        self._stages: dict[str, Stage] = {}
+
+    @property
+    def stages(self) -> list[Stage]:
+        return list(self._stages.values())
+
+    def add(
+            self,
+            name: str,
+            fn: Callable[..., Any],
+            inputs: tuple[str, ...] = (),
+            outputs: tuple[str, ...] = (),
+            early_outputs: tuple[str, ...] = (),
+            ) -> "StageGraph":
+        """Register a stage and return the graph, so calls can be chained."""
+        if name in self._stages:
+            raise StageGraphError(f"Stage '{name}' is already registered.")
+        if not set(early_outputs) <= set(outputs):
+            raise StageGraphError(f"Early outputs of stage '{name}' must be among its outputs.")
+        for stage in self._stages.values():
+            duplicated = set(stage.outputs) & set(outputs)
+            if duplicated:
+                raise StageGraphError(f"Outputs {sorted(duplicated)} are already produced by stage '{stage.name}'.")
+        self._stages[name] = Stage(name, fn, tuple(inputs), tuple(outputs), tuple(early_outputs))
+        return self
+
+    def run(
+            self,
+            initial_values: Optional[dict[str, Any]] = None,
+            completed: Optional[dict[str, dict[str, Any]]] = None,
+            max_workers: int = 4,
+            on_stage_complete: Optional[Callable[[str, dict[str, Any]], None]] = None,
+            ) -> StageGraphResult:
+        """
+        Run every stage once its inputs are available.
+
+        Args:
+            initial_values: values available before any stage runs
+            completed: outputs of stages finished in a previous attempt, by stage name;
+                those stages are skipped and their outputs reused
+            max_workers: maximum number of stages running at the same time
+            on_stage_complete: called with (stage name, outputs) after each stage succeeds
+
+        Returns:
+            StageGraphResult with every value, the duration of each executed stage
+            in seconds and the names of the skipped stages
+        """
+        values = dict(initial_values or {})
+        completed = completed or {}
+        self._validate(set(values))
+
+        result = StageGraphResult(values=values)
+        pending = {}
+        for name, stage in self._stages.items():
+            if name in completed:
+                values.update(completed[name])
+                result.skipped.append(name)
+                logger.info(f"Skipping stage '{name}' (already completed).")
+            else:
+                pending[name] = stage
+
+        # Stage completions and early outputs are both delivered through this queue
+        events: queue.SimpleQueue = queue.SimpleQueue()
+        running: dict[str, tuple[Future, float]] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(i in values for i in stage.inputs):
+                        del pending[name]
+                        logger.info(f"Starting stage '{name}'...")
+                        future = executor.submit(stage.fn, **self._kwargs(stage, values, events))
+                        running[name] = (future, time.perf_counter())
+                        future.add_done_callback(lambda f, stage=stage: events.put(("done", stage, f)))
+
+                if not running:
+                    # Only reachable if a skipped stage did not provide the outputs it declared
+                    raise StageGraphError(f"Stages {sorted(pending)} can never run: missing inputs.")
+
+                kind, stage, payload = events.get()
+                if kind == "emit":
+                    output, value = payload
+                    values.setdefault(output, value)
+                    logger.info(f"Stage '{stage.name}' published '{output}' early")
+                    continue
+
+                _, start = running.pop(stage.name)
+                try:
+                    outputs = stage.outputs_from(payload.result())
+                except Exception as e:
+                    for other, _ in running.values():
+                        other.cancel()
+                    logger.error(f"Stage '{stage.name}' failed: {e}")
+                    raise StageFailedError(stage.name) from e
+
+                result.timings[stage.name] = time.perf_counter() - start
+                logger.info(f"Stage '{stage.name}' finished in {result.timings[stage.name]:.2f}s")
+                values.update(outputs)
+                if on_stage_complete:
+                    on_stage_complete(stage.name, outputs)
+
+        return result
+
+    @staticmethod
+    def _kwargs(stage: Stage, values: dict[str, Any], events: queue.SimpleQueue) -> dict[str, Any]:
+        kwargs = {i: values[i] for i in stage.inputs}
+        if stage.early_outputs:
+            def emit(output: str, value: Any) -> None:
+                if output not in stage.early_outputs:
+                    raise StageGraphError(f"Stage '{stage.name}' cannot publish '{output}' early.")
+                events.put(("emit", stage, (output, value)))
+            kwargs["emit"] = emit
+        return kwargs
+
+    def _validate(self, available: set[str]) -> None:
+        """Check that every input is produced somewhere and that there are no cycles."""
+        produced = set(available)
+        remaining = dict(self._stages)
+        while remaining:
+            ready = [name for name, stage in remaining.items() if set(stage.inputs) <= produced]
+            if not ready:
+                all_outputs = available.union(*(s.outputs for s in self._stages.values()))
+                missing = {i for s in remaining.values() for i in s.inputs} - all_outputs
+                if missing:
+                    raise StageGraphError(f"Inputs {sorted(missing)} are not produced by any stage.")
+                raise StageGraphError(f"Stages {sorted(remaining)} form a dependency cycle.")
+            for name in ready:
+                produced.update(remaining.pop(name).outputs)
@@ -4,35 +4,149 @@ image_generator.py
 Handles the orchestration of AI image generation from prompts.
 """
 
+import asyncio
 from logging import getLogger
 from typing import Callable, Optional
 
-from ..services.image_generation_client import ImageGenerationClient
+from ..services.image_generation_client import ImageGenerationClient, AsyncImageGenerationClient
+from ..utils.image_handle import ImageData, ImageHandle
+from ..utils.image_scoring import ImageScorer, score_images
 
 
 
 logger = getLogger("AntonIA.image_generator")
 
 
-image_processing_fn_signature = Callable[[bytes], bytes]
+# May return an ImageHandle to defer the encoding to the storage step; receives an
+# ImageHandle instead of bytes when the image is decoded to a file (stream_to_file)
+image_processing_fn_signature = Callable[[ImageData], ImageData]
+archive_fn_signature = Callable[[list[bytes]], None]
 
-def generate(client: ImageGenerationClient, prompt: str, size: str = "1024x1024", postprocess_fn: Optional[image_processing_fn_signature] = None) -> bytes:
+def generate(
+        client: ImageGenerationClient,
+        prompt: str,
+        size: str = "1024x1024",
+        postprocess_fn: Optional[image_processing_fn_signature] = None,
+        stream_to_file: bool = False,
+        ) -> ImageData:
     """
     Generate an image given a prompt.
 
     Args:
         prompt: text describing the image to create
         size: resolution (default: 1024x1024)
+        stream_to_file: decode the image in chunks to a file (client.generate_image_files)
+            and pass it on as an ImageHandle, instead of holding it as bytes
 
     Returns:
-        Path to the generated image file
+        Image bytes, or an ImageHandle (from stream_to_file or postprocess_fn)
     """
     logger.info("Starting image generation process...")
 
-    image_bytes = client.generate_image(prompt, size)
+    if stream_to_file:
+        decoded = client.generate_image_files(prompt, size, n=1)[0]
+        image_bytes = ImageHandle.from_file(decoded.file, decoded.sha256)
+    else:
+        image_bytes = client.generate_image(prompt, size)
     logger.info(f"Image generated successfully")
 
     if postprocess_fn:
         image_bytes = postprocess_fn(image_bytes)
 
     return image_bytes
+
+
+async def agenerate(
+        client: AsyncImageGenerationClient,
+        prompt: str,
+        size: str = "1024x1024",
+        postprocess_fn: Optional[image_processing_fn_signature] = None,
+        stream_to_file: bool = False,
+        ) -> ImageData:
+    """
+    Async counterpart of generate. The CPU-bound postprocess_fn runs in a worker
+    thread so other coroutines keep running meanwhile.
+    """
+    logger.info("Starting image generation process...")
+
+    if stream_to_file:
+        decoded = (await client.generate_image_files(prompt, size, n=1))[0]
+        image_bytes = ImageHandle.from_file(decoded.file, decoded.sha256)
+    else:
+        image_bytes = await client.generate_image(prompt, size)
+    logger.info(f"Image generated successfully")
+
+    if postprocess_fn:
+        image_bytes = await asyncio.to_thread(postprocess_fn, image_bytes)
+
+    return image_bytes
+
+
+def select_best(images: list[bytes], scorer: Optional[ImageScorer] = None) -> tuple[bytes, list[bytes]]:
+    """
+    Score the candidates and split them into the best one and the rest.
+
+    Returns:
+        (best image bytes, remaining candidates ordered by decreasing score)
+    """
+    scores = score_images(images, scorer)
+    ranked = [image for _, image in sorted(zip(scores, images), key=lambda pair: pair[0], reverse=True)]
+    logger.info(f"Candidate scores: {', '.join(f'{score:.2f}' for score in scores)}")
+    return ranked[0], ranked[1:]
+
+
+def generate_best(
+        client: ImageGenerationClient,
+        prompt: str,
+        size: str = "1024x1024",
+        n: int = 4,
+        scorer: Optional[ImageScorer] = None,
+        postprocess_fn: Optional[image_processing_fn_signature] = None,
+        archive_fn: Optional[archive_fn_signature] = None,
+        ) -> ImageData:
+    """
+    Generate n candidates in a single request and keep the best scored one.
+
+    Args:
+        n: number of candidates to request
+        scorer: local image scorer (AntonIA.utils.image_scoring.weighted_scorer() if None)
+        postprocess_fn: applied to the selected image only
+        archive_fn: receives the rejected candidates, e.g. to store them for later review
+
+    Returns:
+        The selected image: bytes, or the ImageHandle returned by postprocess_fn
+    """
+    logger.info(f"Starting image generation process with {n} candidates...")
+
+    images = client.generate_images(prompt, size, n)
+    best, rejected = select_best(images, scorer)
+    if archive_fn and rejected:
+        archive_fn(rejected)
+
+    if postprocess_fn:
+        best = postprocess_fn(best)
+
+    return best
+
+
+async def agenerate_best(
+        client: AsyncImageGenerationClient,
+        prompt: str,
+        size: str = "1024x1024",
+        n: int = 4,
+        scorer: Optional[ImageScorer] = None,
+        postprocess_fn: Optional[image_processing_fn_signature] = None,
+        archive_fn: Optional[archive_fn_signature] = None,
+        ) -> ImageData:
+    """Async counterpart of generate_best; scoring, archiving and postprocessing run in worker threads."""
+    logger.info(f"Starting image generation process with {n} candidates...")
+
+    images = await client.generate_images(prompt, size, n)
+    best, rejected = await asyncio.to_thread(select_best, images, scorer)
+    if archive_fn and rejected:
+        await asyncio.to_thread(archive_fn, rejected)
+
+    if postprocess_fn:
+        best = await asyncio.to_thread(postprocess_fn, best)
+
+    return best
@@ -1,31 +1,136 @@
+import os
+import re
 from datetime import datetime
 from logging import getLogger
 import hashlib
-from ..services.storage_client import LocalStorageClient
+from pathlib import Path
+from typing import Optional
+from ..services.storage_client import StorageClient
+from ..utils.image_handle import EncodingOptions, ImageData, encode
 
 
 
 logger = getLogger("AntonIA.image_saver")
 
-def file_namer(data: bytes, extension: str, add_date: bool = True) -> str:
-    hash_digest = hashlib.sha256(data).hexdigest()[:8]
+SHARDINGS = ("flat", "date", "persona_date", "hash")
+_DATED_NAME = re.compile(r"^(\d{4})(\d{2})(\d{2})_\d{6}_")
+
+def file_namer(data: bytes, extension: str, add_date: bool = True, digest: Optional[str] = None) -> str:
+    """Name from the date and the data hash; pass `digest` when the SHA-256 is already known."""
+    hash_digest = (digest or hashlib.sha256(data).hexdigest())[:8]
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S") if add_date else ""
     parts = [part for part in [timestamp, hash_digest] if part]
     return "_".join(parts) + extension
 
-def save(image_data: bytes, storage_client: LocalStorageClient, add_date: bool = True) -> str:
+def shard_destination(sharding: str, digest: str, persona: Optional[str] = None, when: Optional[datetime] = None) -> list[str]:
+    """
+    Sub-directories for an image under a sharding scheme:
+    "flat" (none), "date" (YYYY/MM/DD), "persona_date" (persona/YYYY/MM/DD) or "hash" (h[:2]/h[2:4]).
+    """
+    if sharding not in SHARDINGS:
+        raise ValueError(f"Unknown sharding '{sharding}', expected one of {SHARDINGS}.")
+    if sharding == "flat":
+        return []
+    if sharding == "hash":
+        return [digest[:2], digest[2:4]]
+    when = when or datetime.now()
+    date_parts = [f"{when.year:04d}", f"{when.month:02d}", f"{when.day:02d}"]
+    if sharding == "persona_date":
+        return [persona or "default"] + date_parts
+    return date_parts
+
+def save(
+        image_data: ImageData,
+        storage_client: StorageClient,
+        add_date: bool = True,
+        destination: Optional[list[str]] = None,
+        encoding: Optional[EncodingOptions] = None,
+        sharding: str = "flat",
+        persona: Optional[str] = None,
+        ) -> str:
     """
     Save image data using the provided storage client.
 
     Args:
-        image_data: binary image data to be saved
-        storage_client: instance of LocalStorageClient to handle saving
+        image_data: binary image data, or an ImageHandle encoded (and hashed) here
+        storage_client: storage client handling the save (local directory or object store)
         add_date: whether to include the current date in the filename
+        destination: sub-directories within the storage, e.g. ["candidates"]
+        encoding: output format and encoder settings (bytes are stored as is if None)
+        sharding: sub-directory scheme appended to destination (see shard_destination)
+        persona: persona directory for the "persona_date" sharding
 
     Returns:
         Path to the saved image file as a string
     """
     logger.info("Saving image...")
-    filename = file_namer(image_data, extension=".png", add_date=add_date)
-    return storage_client.save_file(image_data, filename)
+    encoded = encode(image_data, encoding)
+    filename = file_namer(encoded.data, extension=encoded.extension, add_date=add_date, digest=encoded.sha256)
+    kwargs = {"sha256": encoded.sha256} if getattr(storage_client, "accepts_digest", False) else {}
+    destination = (destination or []) + shard_destination(sharding, encoded.sha256, persona)
+    if destination:
+        return storage_client.save_file(encoded.data, filename, destination, **kwargs)
+    return storage_client.save_file(encoded.data, filename, **kwargs)
+
+
+def migrate_flat_directory(
+        directory: str,
+        sharding: str,
+        persona: Optional[str] = None,
+        owners: Optional[dict[str, str]] = None,
+        dry_run: bool = False,
+        ) -> list[tuple[str, str]]:
+    """
+    Move the files directly inside a flat storage directory into their shard sub-directories.
+
+    The date comes from the file name written by file_namer (YYYYMMDD_HHMMSS_...) or,
+    failing that, from the file's modification time. Hidden files (temp files) and
+    sub-directories are left alone, as are files whose target already exists.
+
+    Args:
+        directory: flat directory, e.g. image.storage_path
+        sharding: target scheme (see shard_destination)
+        persona: persona directory for the "persona_date" sharding, for files missing from owners
+        owners: persona of each file, by file name
+        dry_run: only report the moves
+
+    Returns:
+        (old path, new path) of every file moved
+    """
+    root = Path(directory)
+    if sharding == "flat" or not root.is_dir():
+        return []
+    moves = []
+    for path in sorted(root.iterdir()):
+        if path.name.startswith(".") or not path.is_file():
+            continue
+        digest = _file_digest(path) if sharding == "hash" else ""
+        owner = (owners or {}).get(path.name, persona)
+        target_dir = root.joinpath(*shard_destination(sharding, digest, owner, _file_date(path)))
+        target = target_dir / path.name
+        if target.exists():
+            logger.warning(f"Not moving {path}: {target} already exists")
+            continue
+        if not dry_run:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        logger.debug(f"{'Would move' if dry_run else 'Moved'} {path} -> {target}")
+        moves.append((str(path), str(target)))
+    logger.info(f"{'Would move' if dry_run else 'Moved'} {len(moves)} files in {root} to the '{sharding}' layout")
+    return moves
+
+def _file_date(path: Path) -> datetime:
+    match = _DATED_NAME.match(path.name)
+    if match:
+        try:
+            return datetime(*(int(part) for part in match.groups()))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(path.stat().st_mtime)
 
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
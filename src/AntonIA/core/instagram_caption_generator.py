@@ -5,14 +5,37 @@ Generates a short, engaging Instagram caption written in the style of the 'grand
 based on the AI-generated image prompt and morning phrase.
 """
 
+from dataclasses import dataclass
 from logging import getLogger
-from ..services.llm_client import LLMClient, query_llm
+from ..services.llm_client import LLMClient, AsyncLLMClient, query_llm, aquery_llm
+from ..services.batch_client import BatchLLMClient, BatchRequest, query_llm_batch
 from ..utils.prompts import build_prompt_from_template
 
 logger = getLogger("AntonIA.instagram_caption_generator")
 
 
 
+def build_caption_prompt(
+        template: str, 
+        phrase: str, 
+        topic: str, 
+        style: str,
+        language: str,
+        hashtags: str,
+        ) -> str:
+    """Fill the caption template with the generated image details."""
+    return build_prompt_from_template(
+        template, 
+        {
+            "phrase": phrase, 
+            "topic": topic, 
+            "style": style,
+            "language": language,
+            "hashtags": hashtags,
+            }
+        )
+
+
 def generate(
         llm_client: LLMClient, 
         temperature: float, 
@@ -35,17 +58,57 @@ def generate(
     Returns:
         str: generated caption text
     """
-    prompt = build_prompt_from_template(
-        template, 
-        {
-            "phrase": phrase, 
-            "topic": topic, 
-            "style": style,
-            "language": language,
-            "hashtags": hashtags,
-            }
-        )
+    prompt = build_caption_prompt(template, phrase, topic, style, language, hashtags)
     logger.info("Generating Instagram caption...")
     return query_llm(llm_client, prompt, temperature=temperature)
 
 
+async def agenerate(
+        llm_client: AsyncLLMClient,
+        temperature: float,
+        template: str,
+        phrase: str,
+        topic: str,
+        style: str,
+        language: str,
+        hashtags: str,
+        ) -> str:
+    """Async counterpart of generate, for AsyncLLMClient instances."""
+    prompt = build_caption_prompt(template, phrase, topic, style, language, hashtags)
+    logger.info("Generating Instagram caption...")
+    return await aquery_llm(llm_client, prompt, temperature=temperature)
+
+
+@dataclass
+class CaptionJob:
+    """Arguments of `generate` for one run, plus the LLM settings its batch request is sent with."""
+    model: str
+    system_prompt: str
+    temperature: float
+    template: str
+    phrase: str
+    topic: str
+    style: str
+    language: str
+    hashtags: str
+
+
+def generate_batch(batch_client: BatchLLMClient, jobs: dict[str, CaptionJob]) -> dict[str, str]:
+    """
+    Offline counterpart of generate: sends the caption requests of several runs as one batch.
+
+    Returns:
+        dict: caption by job id; jobs whose request failed are missing
+    """
+    requests = [
+        BatchRequest(
+            custom_id=job_id,
+            model=job.model,
+            system_prompt=job.system_prompt,
+            prompt=build_caption_prompt(job.template, job.phrase, job.topic, job.style, job.language, job.hashtags),
+            temperature=job.temperature,
+        )
+        for job_id, job in jobs.items()
+    ]
+    logger.info(f"Generating {len(requests)} Instagram captions in a batch...")
+    return query_llm_batch(batch_client, requests)
@@ -4,18 +4,50 @@ phrase_generator.py
 Generates a 'good morning' phrase based on the day of the week using an AI language model.
 """
 
+from dataclasses import dataclass
 from datetime import datetime
 import json
+from typing import Callable, Optional
 
 from logging import getLogger
 
-from ..services.llm_client import LLMClient, query_llm
+from ..services.llm_client import (
+    LLMClient, AsyncLLMClient, query_llm, aquery_llm, stream_llm, without_cache, invalidate_llm_response,
+)
+from ..services.batch_client import BatchLLMClient, BatchRequest, query_llm_batch
 from ..utils.prompts import build_prompt_from_template
+from ..utils.json_stream import IncrementalJSONObjectParser, extract_json_object
 
 
 
 logger = getLogger("AntonIA.phrase_generator")
 
+RESPONSE_KEYS = ("phrase", "topic", "style", "font")
+
+# Fields of the response the caption needs; once streamed, the caption can be generated
+CAPTION_DETAIL_KEYS = ("phrase", "topic", "style")
+
+# Structured output request for the creation step: the model can only answer with this object
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "morning_image_details",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {key: {"type": "string"} for key in RESPONSE_KEYS},
+            "required": list(RESPONSE_KEYS),
+            "additionalProperties": False,
+        },
+    },
+}
+
+REPAIR_PROMPT_TEMPLATE = (
+    "Your previous answer could not be parsed. Answer again with only a JSON object "
+    "with the string fields {keys}, without markdown or any other text.\n\n"
+    "Previous answer:\n{response}"
+)
+
 
 def get_day_of_week() -> str:
     """Returns the current weekday as a string, e.g., 'Monday'."""
@@ -28,20 +60,112 @@ def parse_response(response: str) -> dict[str, str]:
         response: raw response string from the LLM
     Returns:
         dict: parsed response with keys 'phrase', 'topic', 'style', 'font'
+    Raises:
+        ValueError: if the response is not a JSON object with all of those keys as strings
     """
     logger.info("Parsing response ...")
     try:
         data = json.loads(response)
-        cleaned = {k: v.strip().lower() for k, v in data.items() if k != "phrase"}
-        cleaned["phrase"] = data["phrase"]
-        for key in ["phrase", "topic", "style", "font"]:
-            cleaned.setdefault(key, "")
-        return cleaned
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON from LLM response: {e}")
-        raise ValueError("Malformed LLM response: not valid JSON.") from e
+        # Tolerate markdown fences and prose around the object
+        try:
+            data = extract_json_object(response)
+            logger.warning("LLM response was not pure JSON, extracted the embedded object.")
+        except ValueError:
+            logger.error(f"Failed to parse JSON from LLM response: {e}")
+            raise ValueError("Malformed LLM response: not valid JSON.") from e
+    if not isinstance(data, dict):
+        raise ValueError("Malformed LLM response: not a JSON object.")
+    invalid = [key for key in RESPONSE_KEYS if not isinstance(data.get(key), str)]
+    if invalid:
+        raise ValueError(f"Malformed LLM response: missing or non-string fields {invalid}.")
+
+    cleaned = {k: v.strip().lower() for k, v in data.items() if k != "phrase" and isinstance(v, str)}
+    cleaned["phrase"] = data["phrase"]
+    return cleaned
+
+
+def parse_with_repair(
+        llm_client: LLMClient,
+        response: str,
+        temperature: float = 0.8,
+        repair_attempts: int = 0,
+        response_format: Optional[dict] = None,
+        prompt: Optional[str] = None,
+        ) -> dict[str, str]:
+    """
+    Parse the response; if it is malformed, ask the LLM to repair it, at most repair_attempts times.
+
+    When the prompt the response answers is given, a malformed response is also dropped
+    from the client's cache, so later runs do not get it again. Repair requests bypass the cache.
+
+    Raises:
+        ValueError: if the response is still malformed after the last repair attempt
+    """
+    for attempt in range(1, repair_attempts + 2):
+        try:
+            return parse_response(response)
+        except ValueError:
+            if attempt == 1 and prompt is not None:
+                invalidate_llm_response(llm_client, prompt, temperature, response_format)
+            if attempt > repair_attempts:
+                raise
+            logger.warning(f"Malformed LLM response, requesting a repaired one (attempt {attempt}/{repair_attempts})")
+            repair_prompt = REPAIR_PROMPT_TEMPLATE.format(keys=", ".join(RESPONSE_KEYS), response=response)
+            response = query_llm(without_cache(llm_client), repair_prompt, temperature, response_format)
+
+
+async def aparse_with_repair(
+        llm_client: AsyncLLMClient,
+        response: str,
+        temperature: float = 0.8,
+        repair_attempts: int = 0,
+        response_format: Optional[dict] = None,
+        ) -> dict[str, str]:
+    """Async counterpart of parse_with_repair."""
+    for attempt in range(1, repair_attempts + 2):
+        try:
+            return parse_response(response)
+        except ValueError:
+            if attempt > repair_attempts:
+                raise
+            logger.warning(f"Malformed LLM response, requesting a repaired one (attempt {attempt}/{repair_attempts})")
+            repair_prompt = REPAIR_PROMPT_TEMPLATE.format(keys=", ".join(RESPONSE_KEYS), response=response)
+            response = await aquery_llm(llm_client, repair_prompt, temperature, response_format)
     
 
+def caption_details(details: dict) -> dict[str, str]:
+    """Extract the fields needed by the caption, cleaned like parse_response does."""
+    return {key: details[key] if key == "phrase" else details[key].strip().lower() for key in CAPTION_DETAIL_KEYS}
+
+
+def build_creation_prompt(prompt_generateion_template: str, past_records: str, language: str) -> str:
+    """Fill the creation template with today's weekday, past records and language."""
+    return build_prompt_from_template(
+        prompt_generateion_template, 
+        {
+            "day_of_week": get_day_of_week(), 
+            "past_records": past_records, 
+            "language": language,
+            }
+        )
+
+
+def build_image_prompt(response: str, image_prompt_template: str, language: str) -> tuple[str, dict]:
+    """Parse the LLM response and fill the image template with it."""
+    return image_prompt_from_details(parse_response(response), image_prompt_template, language)
+
+
+def image_prompt_from_details(parsed_response: dict, image_prompt_template: str, language: str) -> tuple[str, dict]:
+    """Fill the image template with an already parsed response."""
+    parsed_response["language"] = language
+
+    image_prompt = build_prompt_from_template(image_prompt_template, parsed_response)
+    logger.info(f"Image generation prompt: {image_prompt}")
+
+    return image_prompt, parsed_response
+
+
 def generate(
         llm_client: LLMClient, 
         prompt_generateion_template: str,
@@ -49,6 +173,8 @@ def generate(
         past_records: str, 
         temperature: float = 0.8,
         language: str = "spanish",
+        response_format: Optional[dict] = None,
+        repair_attempts: int = 0,
         ) -> tuple[str, dict]:
     """
     Main function to generate the morning phrase and image prompt.
@@ -56,25 +182,118 @@ def generate(
         llm_client: instance of the LLMClient abstraction (e.g., OpenAI, Anthropic, etc.)
         past_records: string summarizing past records to avoid repetition
         temperature: sampling temperature for the LLM
+        response_format: structured output format, e.g. RESPONSE_FORMAT
+        repair_attempts: extra requests allowed to repair a malformed response
     Returns:
         str: generated prompt for image generation
     """
-    day_of_the_week = get_day_of_week()
+    prompt = build_creation_prompt(prompt_generateion_template, past_records, language)
+    response = query_llm(llm_client, prompt, temperature, response_format)
+    parsed_response = parse_with_repair(llm_client, response, temperature, repair_attempts, response_format, prompt)
+    return image_prompt_from_details(parsed_response, image_prompt_template, language)
 
-    prompt = build_prompt_from_template(
-        prompt_generateion_template, 
-        {
-            "day_of_week": day_of_the_week, 
-            "past_records": past_records, 
-            "language": language,
-            }
-        )
 
-    response = query_llm(llm_client, prompt, temperature)
-    parsed_response = parse_response(response)
-    parsed_response["language"] = language
+def generate_streaming(
+        llm_client: LLMClient,
+        prompt_generateion_template: str,
+        image_prompt_template: str,
+        past_records: str,
+        temperature: float = 0.8,
+        language: str = "spanish",
+        on_caption_details: Optional[Callable[[dict[str, str]], None]] = None,
+        response_format: Optional[dict] = None,
+        repair_attempts: int = 0,
+        ) -> tuple[str, dict]:
+    """
+    Streaming variant of generate.
 
-    image_prompt = build_prompt_from_template(image_prompt_template, parsed_response)
-    logger.info(f"Image generation prompt: {image_prompt}")
+    The response is parsed while it streams, and on_caption_details is called as soon
+    as the phrase, topic and style fields are complete, so the caption can be generated
+    while the rest of the response is still arriving. It is called exactly once, at
+    the latest when the response is complete.
+
+    Raises:
+        ValueError: if the response needed a repair that changed the details already reported
+    """
+    prompt = build_creation_prompt(prompt_generateion_template, past_records, language)
+    parser = IncrementalJSONObjectParser()
+    notified = None
+    for chunk in stream_llm(llm_client, prompt, temperature, response_format):
+        parser.feed(chunk)
+        if on_caption_details and notified is None and all(key in parser.fields for key in CAPTION_DETAIL_KEYS):
+            logger.info("Caption details received, the rest of the response is still streaming.")
+            notified = caption_details(parser.fields)
+            on_caption_details(notified)
 
+    parsed_response = parse_with_repair(llm_client, parser.text, temperature, repair_attempts, response_format, prompt)
+    if notified is not None and caption_details(parsed_response) != notified:
+        # The caption is already being written from the streamed fields and would not match the image
+        raise ValueError("Repaired LLM response changed the phrase, topic or style already sent to the caption.")
+    image_prompt, parsed_response = image_prompt_from_details(parsed_response, image_prompt_template, language)
+    if on_caption_details and notified is None:
+        on_caption_details(caption_details(parsed_response))
     return image_prompt, parsed_response
+
+
+async def agenerate(
+        llm_client: AsyncLLMClient,
+        prompt_generateion_template: str,
+        image_prompt_template: str,
+        past_records: str,
+        temperature: float = 0.8,
+        language: str = "spanish",
+        response_format: Optional[dict] = None,
+        repair_attempts: int = 0,
+        ) -> tuple[str, dict]:
+    """Async counterpart of generate, for AsyncLLMClient instances."""
+    prompt = build_creation_prompt(prompt_generateion_template, past_records, language)
+    response = await aquery_llm(llm_client, prompt, temperature, response_format)
+    parsed_response = await aparse_with_repair(llm_client, response, temperature, repair_attempts, response_format)
+    return image_prompt_from_details(parsed_response, image_prompt_template, language)
+
+
+@dataclass
+class PromptGenerationJob:
+    """Arguments of `generate` for one run, plus the LLM settings its batch request is sent with."""
+    model: str
+    system_prompt: str
+    prompt_generateion_template: str
+    image_prompt_template: str
+    past_records: str
+    temperature: float = 0.8
+    language: str = "spanish"
+    response_format: Optional[dict] = None
+
+
+def generate_batch(batch_client: BatchLLMClient, jobs: dict[str, PromptGenerationJob]) -> dict[str, tuple[str, dict]]:
+    """
+    Offline counterpart of generate: sends the requests of several runs as one batch.
+
+    Args:
+        batch_client: instance of the BatchLLMClient abstraction
+        jobs: generation inputs by job id
+    Returns:
+        dict: (image prompt, parsed response) by job id; jobs whose request or
+        response parsing failed are missing
+    """
+    requests = [
+        BatchRequest(
+            custom_id=job_id,
+            model=job.model,
+            system_prompt=job.system_prompt,
+            prompt=build_creation_prompt(job.prompt_generateion_template, job.past_records, job.language),
+            temperature=job.temperature,
+            response_format=job.response_format,
+        )
+        for job_id, job in jobs.items()
+    ]
+    responses = query_llm_batch(batch_client, requests)
+
+    results = {}
+    for job_id, response in responses.items():
+        job = jobs[job_id]
+        try:
+            results[job_id] = build_image_prompt(response, job.image_prompt_template, job.language)
+        except ValueError as e:
+            logger.error(f"Discarding batch response of '{job_id}': {e}")
+    return results
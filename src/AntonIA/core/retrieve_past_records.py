@@ -1,8 +1,7 @@
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, time, timedelta
 
 from AntonIA.core.prompt_generator import logger
-from AntonIA.services.database_client import DatabaseClient
+from AntonIA.services.database_client import DatabaseClient, Filter
 
 
 def retrieve_past_n_days(database_client: DatabaseClient, table: str, n_days: int) -> str:
@@ -17,7 +16,7 @@ def retrieve_past_n_days(database_client: DatabaseClient, table: str, n_days: in
         str: Each record as a line starting with a tab
     """
     logger.info(f"Retrieving past {n_days} days outputs from database table '{table}'...")
-    query = f"timestamp >= '{(datetime.now() - pd.Timedelta(days=n_days)).date()}'"
-    records = database_client.get_records_matching_query(table, query)
+    since = datetime.combine((datetime.now() - timedelta(days=n_days)).date(), time.min)
+    records = database_client.get_records_matching_filters(table, [Filter("timestamp", ">=", since)])
     formatted_records = "\n".join("\t" + str(record) for record in records.to_dict(orient="records"))
     return formatted_records
@@ -1,10 +1,21 @@
+import asyncio
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Optional
+
 from AntonIA.common.logger_setup import setup_logging
-from AntonIA.common.config import load_config
+from AntonIA.common.checkpoint import RunCheckpoint
+from AntonIA.common.stage_graph import StageGraph
+from AntonIA.common.config import load_config, list_personas, Config, BatchConfig, CacheConfig, DatabaseConfig, HttpConfig, RateLimitConfig, RetryConfig, StorageConfig, DEFAULT_CONFIG_DIR, DEFAULT_IMAGE_CANDIDATES_DESTINATION
 from AntonIA.services import (
-    OpenAIClient, MockAIClient,
-    LocalStorageClient, MockStorageClient,
-    OpenAIimageGenerationClient, MockImageGenerationClient,
-    LocalFileDatabaseClient, MockDatabaseClient,
+    OpenAIClient, AsyncOpenAIClient, CachingLLMClient, MockAIClient,
+    LocalStorageClient, S3StorageClient, MockStorageClient,
+    OpenAIimageGenerationClient, AsyncOpenAIimageGenerationClient, CachingImageGenerationClient, MockImageGenerationClient,
+    LocalFileDatabaseClient, SQLiteDatabaseClient, MockDatabaseClient,
+    LRUCache, DiskCache, RetryPolicy, RateLimit, TokenBucketRateLimiter,
+    HttpClientRegistry, HttpPoolSettings, OpenAIBatchClient,
 )
 from AntonIA.core import (
     image_saver,
@@ -14,32 +25,199 @@ from AntonIA.core import (
     run_info_saver,
     retrieve_past_records,
 )
-from AntonIA.utils.image_utils import add_watermark_fn_factory
+from AntonIA.utils import image_postprocessing
+from AntonIA.utils.image_postprocessing import PostProcessChain
+from AntonIA.utils.image_utils import is_valid_watermark
+from AntonIA.utils.image_handle import EncodingOptions, ImageData
+from AntonIA.utils.image_scoring import weighted_scorer
 from AntonIA.utils.prompts import build_prompt_from_template
 
 
 
-def main(persona: str = "default"):
+def build_database_client(database_config: DatabaseConfig):
+    if database_config.backend == "sqlite":
+        return SQLiteDatabaseClient(db_path=database_config.past_records_path)
+    return LocalFileDatabaseClient(
+        db_path=database_config.past_records_path,
+        storage_mode=database_config.storage_mode,
+        compaction_threshold=database_config.compaction_threshold,
+        )
+
+
+def close_database_client(database_client) -> None:
+    """Close the database connection, for the clients that hold one (see SQLiteDatabaseClient)."""
+    close = getattr(database_client, "close", None)
+    if close:
+        close()
+
+
+@dataclass
+class SharedClients:
+    """Clients that do not depend on the persona and can be reused across a batch of runs."""
+    storage_client: object
+    database_client: object
+    rate_limiter: Optional[TokenBucketRateLimiter] = None
+    http_clients: Optional[HttpClientRegistry] = None
+
+    def http_client(self):
+        return self.http_clients.client() if self.http_clients else None
+
+    def async_http_client(self):
+        return self.http_clients.async_client() if self.http_clients else None
+
+    def flush_storage(self) -> None:
+        """Make the files saved so far durable (see LocalStorageClient fsync modes)."""
+        flush = getattr(self.storage_client, "flush", None)
+        if flush:
+            flush()
+
+    def close(self) -> None:
+        """Flush pending storage writes, close the database connection and the pooled HTTP clients."""
+        self.flush_storage()
+        close_database_client(self.database_client)
+        if self.http_clients:
+            self.http_clients.close()
+
+    async def aclose(self) -> None:
+        """Like close, also closing the async HTTP client of the running event loop."""
+        if self.http_clients:
+            await self.http_clients.aclose()
+        await asyncio.to_thread(self.close)
+
+
+@dataclass
+class PersonaRunResult:
+    persona: str
+    success: bool
+    duration_seconds: float
+    error: Optional[str] = None
+
+
+def build_storage_client(storage_config: StorageConfig, storage_path: str):
+    if storage_config.backend == "s3":
+        s3 = storage_config.s3
+        return S3StorageClient(
+            bucket=s3.bucket,
+            prefix=s3.prefix,
+            endpoint_url=s3.endpoint_url,
+            region=s3.region,
+            multipart_threshold=s3.multipart_threshold,
+            multipart_chunk_size=s3.multipart_chunk_size,
+            max_concurrency=s3.max_concurrency,
+            max_pool_connections=s3.max_pool_connections,
+            verify_etag=s3.verify_etag,
+        )
+    return LocalStorageClient(
+        base_dir=storage_path,
+        fsync=storage_config.fsync,
+        fsync_batch_size=storage_config.fsync_batch_size,
+        layout=storage_config.layout,
+    )
+
+
+def build_shared_clients(config: Config) -> SharedClients:
+    return SharedClients(
+        storage_client=build_storage_client(config.storage, config.image.storage_path),
+        database_client=build_database_client(config.database),
+        rate_limiter=build_rate_limiter(config.rate_limits),
+        http_clients=HttpClientRegistry(build_http_pool_settings(config.http)),
+    )
+
+
+def with_llm_cache(llm_client, cache_config: CacheConfig):
+    if not cache_config.enabled:
+        return llm_client
+    disk_cache = None
+    if cache_config.directory:
+        disk_cache = DiskCache(cache_config.directory, cache_config.ttl_seconds, cache_config.max_bytes)
+    return CachingLLMClient(llm_client, LRUCache(cache_config.max_entries), disk_cache)
+
+
+def with_image_cache(image_generation_client, cache_config: CacheConfig):
+    if not cache_config.enabled or not cache_config.directory:
+        return image_generation_client
+    disk_cache = DiskCache(cache_config.directory, cache_config.ttl_seconds, cache_config.max_bytes)
+    return CachingImageGenerationClient(image_generation_client, disk_cache)
+
+
+def build_retry_policy(retry_config: RetryConfig) -> RetryPolicy:
+    return RetryPolicy(**asdict(retry_config))
+
+
+def build_rate_limiter(rate_limit_config: RateLimitConfig) -> Optional[TokenBucketRateLimiter]:
+    if not rate_limit_config.enabled:
+        return None
+    return TokenBucketRateLimiter(
+        limits={model: RateLimit(**asdict(limits)) for model, limits in rate_limit_config.models.items()},
+        burst_seconds=rate_limit_config.burst_seconds,
+        state_file=rate_limit_config.state_file,
+    )
+
+
+def build_http_pool_settings(http_config: HttpConfig) -> HttpPoolSettings:
+    return HttpPoolSettings(**asdict(http_config))
+
+
+def build_batch_client(config: Config, shared_clients: SharedClients) -> OpenAIBatchClient:
+    batch_config: BatchConfig = config.batch
+    return OpenAIBatchClient(
+        api_key=config.llm.api_key,
+        base_url=batch_config.base_url,
+        poll_interval=batch_config.poll_interval,
+        timeout=batch_config.timeout,
+        completion_window=batch_config.completion_window,
+        retry_policy=build_retry_policy(config.retry),
+        http_client=shared_clients.http_client(),
+    )
+
+
+def _system_prompt(config: Config) -> str:
+    return build_prompt_from_template(config.llm.system_prompt, {"language": config.grandma.language})
+
+
+def _response_format(config: Config) -> Optional[dict]:
+    return prompt_generator.RESPONSE_FORMAT if config.llm.structured_output else None
+
+
+def main(
+        persona: str = "default",
+        config_dir: str = DEFAULT_CONFIG_DIR,
+        shared_clients: Optional[SharedClients] = None,
+        resume_run_id: Optional[str] = None,
+        ):
     logger = setup_logging()
 
-    config = load_config(persona)
+    config = load_config(persona, config_dir=config_dir)
 
     # Set up clients
-    llm_client_1 = OpenAIClient(
-        api_key=config.llm.api_key,
-        model=config.llm.model,
-        system_prompt=build_prompt_from_template(
-            config.llm.system_prompt, 
-            {"language": config.grandma.language}
-            ),
+    owns_clients = shared_clients is None
+    shared_clients = shared_clients or build_shared_clients(config)
+    retry_policy = build_retry_policy(config.retry)
+    llm_client_1 = with_llm_cache(
+        OpenAIClient(
+            api_key=config.llm.api_key,
+            model=config.llm.model,
+            system_prompt=_system_prompt(config),
+            retry_policy=retry_policy,
+            rate_limiter=shared_clients.rate_limiter,
+            http_client=shared_clients.http_client(),
+        ),
+        config.llm.cache,
     )
     llm_client_2 = llm_client_1  # Using the same LLM client for both tasks, set up like this for easy swapping with MockAIClient
-    image_generator_client = OpenAIimageGenerationClient(
-        api_key=config.image.api_key, 
-        model=config.image.model
-        )
-    storage_client = LocalStorageClient(base_dir=config.image.storage_path)
-    database_client = LocalFileDatabaseClient(db_path=config.database.past_records_path)
+    image_generator_client = with_image_cache(
+        OpenAIimageGenerationClient(
+            api_key=config.image.api_key, 
+            model=config.image.model,
+            retry_policy=retry_policy,
+            rate_limiter=shared_clients.rate_limiter,
+            http_client=shared_clients.http_client(),
+            spool_max_memory=config.image.spool_max_memory,
+            ),
+        config.image.cache,
+    )
+    storage_client = shared_clients.storage_client
+    database_client = shared_clients.database_client
 
     # llm_client_1 = MockAIClient(response='{"phrase": "Good Morning", "topic": "Nice sunset", "style": "Aquarela", "font": "Comic Sans"}')
     # llm_client_2 = MockAIClient(response="This is a caption")
@@ -49,58 +227,556 @@ def main(persona: str = "default"):
 
 
     # Pipeline execution
-    past_records = retrieve_past_records.retrieve_past_n_days(
-        database_client=database_client, 
-        table=config.database.runs_table_name, 
-        n_days=config.database.past_records_to_retrieve
+    stage_graph = build_stage_graph(
+        config,
+        llm_client_1,
+        llm_client_2,
+        image_generator_client,
+        storage_client,
+        database_client,
+        )
+    if resume_run_id:
+        checkpoint = RunCheckpoint.resume(config.pipeline.checkpoint_dir, resume_run_id, persona)
+        logger.info(f"Resuming run '{checkpoint.run_id}'")
+    else:
+        checkpoint = RunCheckpoint.create(config.pipeline.checkpoint_dir, persona)
+        logger.info(f"Starting run '{checkpoint.run_id}'")
+
+    try:
+        result = stage_graph.run(
+            completed=checkpoint.completed_stages(),
+            on_stage_complete=checkpoint.save_stage,
+            )
+    except Exception:
+        logger.error(f"Run '{checkpoint.run_id}' failed, resume it with --resume {checkpoint.run_id}")
+        raise
+    finally:
+        if owns_clients:
+            shared_clients.close()
+    checkpoint.clear()
+
+    timings = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in result.timings.items())
+    logger.info(f"Pipeline finished for persona '{persona}' ({timings})")
+
+
+def _encoding(config: Config) -> EncodingOptions:
+    encoding = config.image.encoding
+    return EncodingOptions(
+        format=encoding.format,
+        quality=encoding.quality,
+        compress_level=encoding.compress_level,
+        optimize=encoding.optimize,
+        progressive=encoding.progressive,
+        )
+
+
+def _postprocess_fn(config: Config, phrase: Optional[str] = None) -> Optional[PostProcessChain]:
+    """Chain of the configured post-processing steps, decoding and encoding the image once."""
+    post = config.image.postprocessing
+    ops = []
+    if post.aspect_ratio or post.width:
+        ops.append(image_postprocessing.resize(post.width, post.aspect_ratio))
+    if (post.brightness, post.contrast, post.saturation, post.warmth) != (0.0, 1.0, 1.0, 0.0):
+        ops.append(image_postprocessing.color_grade(post.brightness, post.contrast, post.saturation, post.warmth))
+    if post.sharpen:
+        ops.append(image_postprocessing.sharpen(post.sharpen))
+    if post.phrase_overlay and phrase:
+        ops.append(image_postprocessing.text_overlay(phrase, post.font_path, post.phrase_size_ratio))
+    if is_valid_watermark(config.grandma.watermark_path):
+        ops.append(image_postprocessing.watermark(config.grandma.watermark_path, post.watermark_opacity, post.watermark_scale))
+    return PostProcessChain(ops, _encoding(config)) if ops else None
+
+
+def _shard_options(config: Config) -> dict:
+    """image_saver.save sharding arguments; the persona directory is the grandma's name."""
+    return {"sharding": config.storage.sharding, "persona": config.grandma.name}
+
+
+def _archive_candidates_fn(config: Config, storage_client):
+    if not config.image.archive_candidates:
+        return None
+    def archive(images: list[bytes]) -> None:
+        for image_bytes in images:
+            image_saver.save(image_bytes, storage_client, destination=[DEFAULT_IMAGE_CANDIDATES_DESTINATION], **_shard_options(config))
+    return archive
+
+
+def generate_image(config: Config, image_generator_client, storage_client, prompt: str, phrase: Optional[str] = None) -> ImageData:
+    """
+    Generate the run's image, keeping the best of several candidates when `image.candidates` > 1.
+    The phrase is only used when `image.postprocessing.phrase_overlay` is enabled.
+    """
+    if config.image.candidates > 1:
+        return image_generator.generate_best(
+            image_generator_client,
+            prompt,
+            size=config.image.size,
+            n=config.image.candidates,
+            scorer=weighted_scorer(config.image.scoring_weights),
+            postprocess_fn=_postprocess_fn(config, phrase),
+            archive_fn=_archive_candidates_fn(config, storage_client),
+            )
+    return image_generator.generate(
+        image_generator_client,
+        prompt,
+        size=config.image.size,
+        postprocess_fn=_postprocess_fn(config, phrase),
+        stream_to_file=config.image.stream_decode,
         )
 
-    prompt_for_image_generation, response_details = prompt_generator.generate(
-        llm_client=llm_client_1, 
-        prompt_generateion_template=config.prompts.creation_template,
-        image_prompt_template=config.prompts.image_gen_template,
-        past_records=past_records, 
-        temperature=config.llm.temperature,
-        language=config.grandma.language,
+
+async def agenerate_image(config: Config, image_generator_client, storage_client, prompt: str, phrase: Optional[str] = None) -> ImageData:
+    """Async counterpart of generate_image."""
+    if config.image.candidates > 1:
+        return await image_generator.agenerate_best(
+            image_generator_client,
+            prompt,
+            size=config.image.size,
+            n=config.image.candidates,
+            scorer=weighted_scorer(config.image.scoring_weights),
+            postprocess_fn=_postprocess_fn(config, phrase),
+            archive_fn=_archive_candidates_fn(config, storage_client),
+            )
+    return await image_generator.agenerate(
+        image_generator_client,
+        prompt,
+        size=config.image.size,
+        postprocess_fn=_postprocess_fn(config, phrase),
+        stream_to_file=config.image.stream_decode,
         )
-    
-    caption = instagram_caption_generator.generate(
-        llm_client_2, 
-        template=config.prompts.instagram_caption_template,
-        phrase=response_details["phrase"], 
-        topic=response_details["topic"], 
-        style=response_details["style"], 
-        temperature=config.llm.temperature,
-        language=config.grandma.language,
-        hashtags=config.grandma.hashtags,
+
+
+def build_stage_graph(
+        config: Config,
+        llm_client_1,
+        llm_client_2,
+        image_generator_client,
+        storage_client,
+        database_client,
+        ) -> StageGraph:
+    """
+    Declare the pipeline steps with the values they consume and produce.
+    The caption and image stages only depend on the prompt stage, so they run in parallel.
+    """
+    graph = StageGraph()
+
+    graph.add(
+        "retrieve_past_records",
+        lambda: retrieve_past_records.retrieve_past_n_days(
+            database_client=database_client, 
+            table=config.database.runs_table_name, 
+            n_days=config.database.past_records_to_retrieve
+            ),
+        outputs=("past_records",),
     )
 
-    image_bytes = image_generator.generate(
-        image_generator_client, 
-        prompt_for_image_generation, 
-        size=config.image.size, 
-        postprocess_fn=add_watermark_fn_factory(
-            config.grandma.watermark_path, 
-            opacity=0.8, 
-            scale=0.2,
+    def generate_prompt(past_records, emit=None):
+        # When streaming, the caption details are published as soon as they are parsed,
+        # so the caption stage starts before the response is complete
+        generate = prompt_generator.generate_streaming if emit else prompt_generator.generate
+        options = {"on_caption_details": lambda details: emit("caption_details", details)} if emit else {}
+        prompt_for_image_generation, response_details = generate(
+            llm_client=llm_client_1, 
+            prompt_generateion_template=config.prompts.creation_template,
+            image_prompt_template=config.prompts.image_gen_template,
+            past_records=past_records, 
+            temperature=config.llm.temperature,
+            language=config.grandma.language,
+            response_format=_response_format(config),
+            repair_attempts=config.llm.repair_attempts,
+            **options,
+            )
+        return prompt_for_image_generation, response_details, prompt_generator.caption_details(response_details)
+
+    graph.add(
+        "generate_prompt",
+        generate_prompt,
+        inputs=("past_records",),
+        outputs=("prompt_for_image_generation", "response_details", "caption_details"),
+        early_outputs=("caption_details",) if config.llm.stream else (),
+    )
+
+    graph.add(
+        "generate_caption",
+        lambda caption_details: instagram_caption_generator.generate(
+            llm_client_2, 
+            template=config.prompts.instagram_caption_template,
+            phrase=caption_details["phrase"], 
+            topic=caption_details["topic"], 
+            style=caption_details["style"], 
+            temperature=config.llm.temperature,
+            language=config.grandma.language,
+            hashtags=config.grandma.hashtags,
             ),
-        )
-    
-    saved_image_path = image_saver.save(image_bytes, storage_client)
-
-    run_info = run_info_saver.RunInfo.from_generation_details(
-        prompt=prompt_for_image_generation,
-        response_details=response_details,
-        caption=caption,
-        image_path=saved_image_path,
+        inputs=("caption_details",),
+        outputs=("caption",),
     )
 
-    run_info_saver.save(
-        database_client, 
-        config.database.runs_table_name, 
-        run_info,
+    graph.add(
+        "generate_image",
+        lambda prompt_for_image_generation, caption_details: generate_image(
+            config,
+            image_generator_client,
+            storage_client,
+            prompt_for_image_generation,
+            phrase=caption_details["phrase"],
+            ),
+        inputs=("prompt_for_image_generation", "caption_details"),
+        outputs=("image_bytes",),
+    )
+
+    graph.add(
+        "save_image",
+        lambda image_bytes: image_saver.save(image_bytes, storage_client, encoding=_encoding(config), **_shard_options(config)),
+        inputs=("image_bytes",),
+        outputs=("saved_image_path",),
+    )
+
+    graph.add(
+        "save_run_info",
+        lambda prompt_for_image_generation, response_details, caption, saved_image_path: run_info_saver.save(
+            database_client, 
+            config.database.runs_table_name, 
+            run_info_saver.RunInfo.from_generation_details(
+                prompt=prompt_for_image_generation,
+                response_details=response_details,
+                caption=caption,
+                image_path=saved_image_path,
+                ),
+            ),
+        inputs=("prompt_for_image_generation", "response_details", "caption", "saved_image_path"),
+    )
+
+    return graph
+
+
+async def amain(persona: str = "default", config_dir: str = DEFAULT_CONFIG_DIR, shared_clients: Optional[SharedClients] = None):
+    """
+    Asyncio variant of main.
+
+    The caption and the image only depend on the prompt generation output, so both
+    branches run concurrently and a run takes roughly prompt + max(caption, image).
+    Local database and storage I/O run in worker threads.
+    """
+    logger = setup_logging()
+
+    config = load_config(persona, config_dir=config_dir)
+
+    # Set up clients
+    owns_clients = shared_clients is None
+    shared_clients = shared_clients or build_shared_clients(config)
+    retry_policy = build_retry_policy(config.retry)
+    llm_client = AsyncOpenAIClient(
+        api_key=config.llm.api_key,
+        model=config.llm.model,
+        system_prompt=_system_prompt(config),
+        retry_policy=retry_policy,
+        rate_limiter=shared_clients.rate_limiter,
+        http_client=shared_clients.async_http_client(),
+    )
+    image_generator_client = AsyncOpenAIimageGenerationClient(
+        api_key=config.image.api_key,
+        model=config.image.model,
+        retry_policy=retry_policy,
+        rate_limiter=shared_clients.rate_limiter,
+        http_client=shared_clients.async_http_client(),
+        spool_max_memory=config.image.spool_max_memory,
+        )
+    storage_client = shared_clients.storage_client
+    database_client = shared_clients.database_client
+
+    try:
+        # Pipeline execution
+        past_records = await asyncio.to_thread(
+            retrieve_past_records.retrieve_past_n_days,
+            database_client=database_client,
+            table=config.database.runs_table_name,
+            n_days=config.database.past_records_to_retrieve
+            )
+
+        prompt_for_image_generation, response_details = await prompt_generator.agenerate(
+            llm_client=llm_client,
+            prompt_generateion_template=config.prompts.creation_template,
+            image_prompt_template=config.prompts.image_gen_template,
+            past_records=past_records,
+            temperature=config.llm.temperature,
+            language=config.grandma.language,
+            response_format=_response_format(config),
+            repair_attempts=config.llm.repair_attempts,
+            )
+
+        caption, image_bytes = await asyncio.gather(
+            instagram_caption_generator.agenerate(
+                llm_client,
+                template=config.prompts.instagram_caption_template,
+                phrase=response_details["phrase"],
+                topic=response_details["topic"],
+                style=response_details["style"],
+                temperature=config.llm.temperature,
+                language=config.grandma.language,
+                hashtags=config.grandma.hashtags,
+            ),
+            agenerate_image(config, image_generator_client, storage_client, prompt_for_image_generation, response_details["phrase"]),
+        )
+
+        saved_image_path = await asyncio.to_thread(
+            image_saver.save, image_bytes, storage_client, encoding=_encoding(config), **_shard_options(config)
+            )
+        if owns_clients:
+            await asyncio.to_thread(shared_clients.flush_storage)
+
+        run_info = run_info_saver.RunInfo.from_generation_details(
+            prompt=prompt_for_image_generation,
+            response_details=response_details,
+            caption=caption,
+            image_path=saved_image_path,
         )
 
+        await asyncio.to_thread(
+            run_info_saver.save,
+            database_client,
+            config.database.runs_table_name,
+            run_info,
+            )
+    finally:
+        if owns_clients:
+            await shared_clients.aclose()
+
+
+def run_batch(personas: list[str], config_dir: str = DEFAULT_CONFIG_DIR, max_workers: int = 4) -> list[PersonaRunResult]:
+    """
+    Run the pipeline for several personas in one process with a bounded worker pool.
+
+    Storage, database and HTTP clients and the rate limiter only depend on the base
+    configuration, so they are built once and shared by every persona run. A failing persona does not stop the
+    others; each one gets its own result.
+
+    Args:
+        personas: persona names (without .yaml extension)
+        config_dir: path to the config directory
+        max_workers: maximum number of personas running at the same time
+
+    Returns:
+        One PersonaRunResult per persona, in the order they were given
+    """
+    logger = setup_logging()
+    if not personas:
+        return []
+
+    # Shared clients only depend on the base config: a broken persona must not stop the batch
+    shared_clients = build_shared_clients(load_config(None, config_dir=config_dir))
+    try:
+        return _run_personas(
+            personas,
+            lambda persona: main(persona, config_dir=config_dir, shared_clients=shared_clients),
+            max_workers,
+            logger,
+            )
+    finally:
+        shared_clients.close()
+
+
+def collect_storage_garbage(persona: str = "default", config_dir: str = DEFAULT_CONFIG_DIR) -> tuple[int, int]:
+    """
+    Delete stored images no saved path refers to any more (content-addressed layout).
+
+    Returns:
+        (number of objects removed, bytes freed)
+    """
+    setup_logging()
+    config = load_config(persona, config_dir=config_dir)
+    if config.storage.backend != "local":
+        raise ValueError("Storage garbage collection only applies to the local storage backend.")
+    storage_client = LocalStorageClient(base_dir=config.image.storage_path, layout=config.storage.layout)
+    return storage_client.collect_garbage()
+
+
+def migrate_storage(config_dir: str = DEFAULT_CONFIG_DIR, dry_run: bool = False) -> list[tuple[str, str]]:
+    """
+    Move the images of a flat storage_path (and its candidates directory) into the configured sharding.
+
+    With the "persona_date" sharding, each image goes to the persona whose run records
+    reference it; images no run references go to the "unassigned" directory. The
+    `image_path` of every run record pointing at a moved image is then rewritten.
+
+    Returns:
+        (old path, new path) of every file moved
+    """
+    setup_logging()
+    config = load_config(config_dir=config_dir)
+    if config.storage.backend != "local":
+        raise ValueError("Storage migration only applies to the local storage backend.")
+    database_client = build_database_client(config.database)
+    try:
+        tables = {}  # runs table -> persona directory
+        for persona in list_personas(config_dir):
+            persona_config = load_config(persona, config_dir=config_dir)
+            tables[persona_config.database.runs_table_name] = persona_config.grandma.name
+        image_paths = {table: [str(path) for path in database_client.get_all_records(table).get("image_path", [])] for table in tables}
+
+        owners = {}
+        if config.storage.sharding == "persona_date":
+            for table, image_paths_of_table in image_paths.items():
+                owners.update({Path(image_path).name: tables[table] for image_path in image_paths_of_table})
+        moves = []
+        storage_path = Path(config.image.storage_path)
+        for directory in (storage_path, storage_path / DEFAULT_IMAGE_CANDIDATES_DESTINATION):
+            moves += image_saver.migrate_flat_directory(
+                str(directory), config.storage.sharding, persona="unassigned", owners=owners, dry_run=dry_run,
+                )
+        if dry_run or not moves:
+            return moves
+
+        # Records may hold the path relative to another directory than the one used here
+        moved = {Path(old).resolve(): new for old, new in moves}
+        for table, image_paths_of_table in image_paths.items():
+            replacements = {path: moved[Path(path).resolve()] for path in image_paths_of_table if Path(path).resolve() in moved}
+            if replacements:
+                database_client.replace_values(table, "image_path", replacements)
+        return moves
+    finally:
+        close_database_client(database_client)
+
+
+def _run_personas(personas: list[str], run_fn, max_workers: int, logger) -> list[PersonaRunResult]:
+    """Call run_fn for every persona in a worker pool and collect one result per persona."""
+    def run_persona(persona: str) -> PersonaRunResult:
+        start = time.perf_counter()
+        try:
+            run_fn(persona)
+            return PersonaRunResult(persona, True, time.perf_counter() - start)
+        except Exception as e:
+            logger.exception(f"Pipeline failed for persona '{persona}'")
+            return PersonaRunResult(persona, False, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="persona") as executor:
+        results = list(executor.map(run_persona, personas))
+
+    for result in results:
+        status = "OK" if result.success else f"FAILED ({result.error})"
+        logger.info(f"[{result.persona}] {status} in {result.duration_seconds:.1f}s")
+    return results
+
+
+def run_batch_offline(
+        personas: list[str],
+        config_dir: str = DEFAULT_CONFIG_DIR,
+        max_workers: int = 4,
+        batch_client=None,
+        ) -> list[PersonaRunResult]:
+    """
+    Run the pipeline for several personas with their LLM requests sent through the Batch API.
+
+    Meant for scheduled runs, where latency does not matter but cost does. The prompt
+    requests of every persona go in one batch and, once it completes, the caption
+    requests in a second one. Each stage output is checkpointed, and every persona's
+    pipeline is then resumed from its checkpoint to generate and save the image.
+    A persona whose batch request failed keeps its checkpoint, so it can be finished
+    later with --resume.
+
+    Args:
+        personas: persona names (without .yaml extension), each one listed once
+        config_dir: path to the config directory
+        max_workers: maximum number of personas generating images at the same time
+        batch_client: BatchLLMClient to use (built from the config if None)
+
+    Returns:
+        One PersonaRunResult per persona, in the order they were given
+    """
+    logger = setup_logging()
+    if not personas:
+        return []
+    if len(set(personas)) != len(personas):
+        raise ValueError("Each persona can only appear once in an offline batch.")
+
+    # Shared and batch clients only depend on the base config: a broken persona must not stop the batch
+    base_config = load_config(None, config_dir=config_dir)
+    shared_clients = build_shared_clients(base_config)
+    batch_client = batch_client or build_batch_client(base_config, shared_clients)
+    failures: dict[str, Exception] = {}
+
+    # Runs and past records, one checkpoint per persona
+    runs: dict[str, tuple[Config, RunCheckpoint]] = {}
+    past_records: dict[str, str] = {}
+    for persona in personas:
+        try:
+            config = load_config(persona, config_dir=config_dir)
+            checkpoint = RunCheckpoint.create(config.pipeline.checkpoint_dir, persona)
+            past_records[checkpoint.run_id] = retrieve_past_records.retrieve_past_n_days(
+                database_client=shared_clients.database_client,
+                table=config.database.runs_table_name,
+                n_days=config.database.past_records_to_retrieve,
+                )
+            checkpoint.save_stage("retrieve_past_records", {"past_records": past_records[checkpoint.run_id]})
+            runs[persona] = (config, checkpoint)
+        except Exception as e:
+            logger.exception(f"Could not prepare the offline run of persona '{persona}'")
+            failures[persona] = e
+
+    def without_result(stage: str, results: dict) -> None:
+        for persona, (_, checkpoint) in list(runs.items()):
+            if checkpoint.run_id not in results:
+                failures[persona] = RuntimeError(f"No batch result for stage '{stage}', resume with --resume {checkpoint.run_id}")
+                del runs[persona]
+
+    try:
+        # First batch: image prompts
+        prompts = prompt_generator.generate_batch(batch_client, {
+            checkpoint.run_id: prompt_generator.PromptGenerationJob(
+                model=config.llm.model,
+                system_prompt=_system_prompt(config),
+                prompt_generateion_template=config.prompts.creation_template,
+                image_prompt_template=config.prompts.image_gen_template,
+                past_records=past_records[checkpoint.run_id],
+                temperature=config.llm.temperature,
+                language=config.grandma.language,
+                response_format=_response_format(config),
+                )
+            for config, checkpoint in runs.values()
+        })
+        without_result("generate_prompt", prompts)
+        for _, checkpoint in runs.values():
+            prompt_for_image_generation, response_details = prompts[checkpoint.run_id]
+            checkpoint.save_stage("generate_prompt", {
+                "prompt_for_image_generation": prompt_for_image_generation,
+                "response_details": response_details,
+                "caption_details": prompt_generator.caption_details(response_details),
+                })
+
+        # Second batch: captions, which depend on the generated prompts
+        captions = instagram_caption_generator.generate_batch(batch_client, {
+            checkpoint.run_id: instagram_caption_generator.CaptionJob(
+                model=config.llm.model,
+                system_prompt=_system_prompt(config),
+                temperature=config.llm.temperature,
+                template=config.prompts.instagram_caption_template,
+                phrase=prompts[checkpoint.run_id][1]["phrase"],
+                topic=prompts[checkpoint.run_id][1]["topic"],
+                style=prompts[checkpoint.run_id][1]["style"],
+                language=config.grandma.language,
+                hashtags=config.grandma.hashtags,
+                )
+            for config, checkpoint in runs.values()
+        })
+        without_result("generate_caption", captions)
+        for _, checkpoint in runs.values():
+            checkpoint.save_stage("generate_caption", {"caption": captions[checkpoint.run_id]})
+    except Exception as e:
+        logger.exception("LLM batch failed")
+        for persona in runs:
+            failures[persona] = e
+        runs.clear()
+
+    def run_persona(persona: str) -> None:
+        if persona in failures:
+            raise failures[persona]
+        main(persona, config_dir=config_dir, shared_clients=shared_clients, resume_run_id=runs[persona][1].run_id)
+
+    try:
+        return _run_personas(personas, run_persona, max_workers, logger)
+    finally:
+        shared_clients.close()
+
 
 if __name__ == "__main__":
     main("AntonIA_cast")
@@ -1,4 +1,9 @@
-from .llm_client import OpenAIClient, MockAIClient
-from .storage_client import LocalStorageClient, MockStorageClient
-from .image_generation_client import OpenAIimageGenerationClient, MockImageGenerationClient
-from .database_client import LocalFileDatabaseClient, MockDatabaseClient
+from .llm_client import OpenAIClient, AsyncOpenAIClient, CachingLLMClient, MockAIClient
+from .storage_client import LocalStorageClient, S3StorageClient, MockStorageClient
+from .image_generation_client import OpenAIimageGenerationClient, AsyncOpenAIimageGenerationClient, CachingImageGenerationClient, MockImageGenerationClient
+from .database_client import LocalFileDatabaseClient, SQLiteDatabaseClient, MockDatabaseClient, Filter
+from .cache import LRUCache, DiskCache
+from .retry import RetryPolicy
+from .rate_limiter import RateLimit, TokenBucketRateLimiter
+from .http_client import HttpClientRegistry, HttpPoolSettings
+from .batch_client import OpenAIBatchClient, MockBatchClient, BatchRequest
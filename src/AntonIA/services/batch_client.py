@@ -0,0 +1,211 @@
+"""
+batch_client.py
+---------------
+Offline text generation through the OpenAI Batch API.
+
+Scheduled runs do not need low latency, so their chat requests can be collected into a
+single JSONL file, submitted as one batch (at a lower price and with separate rate limits)
+and collected once the batch completes.
+
+Classes:
+    BatchRequest: one chat completion request of a batch.
+    BatchLLMClient (Protocol): interface for clients that run a list of requests as a batch.
+    MockBatchClient: mock implementation for testing.
+    OpenAIBatchClient: implementation using the OpenAI Files and Batches endpoints.
+    BatchError: raised when a batch cannot be submitted or does not complete.
+Functions:
+    query_llm_batch(batch_client, requests): run the requests and return the texts by custom_id.
+"""
+import json
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Callable, Optional, Protocol
+
+import httpx
+from openai import OpenAI
+
+from .retry import RetryPolicy, call_with_retry
+
+
+logger = getLogger("AntonIA.batch_client")
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+FINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchError(RuntimeError):
+    """Raised when a batch fails as a whole or does not complete in time."""
+
+
+@dataclass(frozen=True)
+class BatchRequest:
+    """A chat completion request; `custom_id` identifies its result in the batch output."""
+    custom_id: str
+    model: str
+    system_prompt: str
+    prompt: str
+    temperature: float = 0.8
+    response_format: Optional[dict] = None
+
+    def to_jsonl_line(self) -> str:
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": self.prompt},
+            ],
+            "temperature": self.temperature,
+        }
+        if self.response_format:
+            body["response_format"] = self.response_format
+        return json.dumps({
+            "custom_id": self.custom_id,
+            "method": "POST",
+            "url": CHAT_COMPLETIONS_ENDPOINT,
+            "body": body,
+        }, ensure_ascii=False)
+
+
+class BatchLLMClient(Protocol):
+    def run(self, requests: list[BatchRequest]) -> dict[str, str]:
+        """
+        Run the requests as one batch and wait for it.
+
+        Returns:
+            dict: generated text by custom_id; requests that failed are missing
+        """
+        pass
+
+
+class MockBatchClient:
+    def __init__(self, response: str = "This is a mock response."):
+        self.response = response
+        self.batches: list[list[BatchRequest]] = []
+
+    def run(self, requests: list[BatchRequest]) -> dict[str, str]:
+        self.batches.append(list(requests))
+        return {request.custom_id: self.response for request in requests}
+
+
+class OpenAIBatchClient:
+    """
+    Args:
+        api_key: OpenAI API key
+        base_url: API base URL, to target a compatible server (None for the OpenAI API)
+        poll_interval: seconds between two status checks of a running batch
+        timeout: seconds to wait for a batch before giving up (it keeps running server side)
+        completion_window: completion window requested to the Batch API
+        retry_policy: retries for transient errors of every API call
+        http_client: pooled HTTP client shared with other service objects (see HttpClientRegistry)
+    """
+    def __init__(
+            self,
+            api_key,
+            base_url: Optional[str] = None,
+            poll_interval: float = 30.0,
+            timeout: float = 24 * 3600.0,
+            completion_window: str = "24h",
+            retry_policy: Optional[RetryPolicy] = None,
+            http_client: Optional[httpx.Client] = None,
+            sleep: Optional[Callable[[float], None]] = None,
+            clock: Optional[Callable[[], float]] = None,
+            ):
+        client_options = {"max_retries": 0} if retry_policy else {}
+        if base_url is not None:
+            client_options["base_url"] = base_url
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = OpenAI(api_key=api_key, **client_options)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.completion_window = completion_window
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self._sleep = sleep or time.sleep
+        self._clock = clock or time.monotonic
+
+    def run(self, requests: list[BatchRequest]) -> dict[str, str]:
+        if not requests:
+            return {}
+        batch_id = self.submit(requests)
+        batch = self.wait(batch_id)
+        return self.results(batch)
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        """Upload the requests as a JSONL file and create the batch; return its id."""
+        custom_ids = [request.custom_id for request in requests]
+        if len(set(custom_ids)) != len(custom_ids):
+            raise BatchError("Batch requests must have unique custom_ids.")
+
+        payload = "\n".join(request.to_jsonl_line() for request in requests).encode("utf-8")
+        input_file = self._call(
+            lambda: self.client.files.create(file=("batch.jsonl", payload, "application/jsonl"), purpose="batch"),
+            "Batch file upload",
+        )
+        batch = self._call(
+            lambda: self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=CHAT_COMPLETIONS_ENDPOINT,
+                completion_window=self.completion_window,
+            ),
+            "Batch creation",
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """Poll the batch until it reaches a final status and return it."""
+        start = self._clock()
+        while True:
+            batch = self._call(lambda: self.client.batches.retrieve(batch_id), "Batch status request")
+            if batch.status in FINAL_BATCH_STATUSES:
+                logger.info(f"Batch {batch_id} finished with status '{batch.status}'")
+                return batch
+            if self._clock() - start + self.poll_interval > self.timeout:
+                raise BatchError(f"Batch {batch_id} did not complete within {self.timeout:.0f}s (status '{batch.status}').")
+            logger.debug(f"Batch {batch_id} is '{batch.status}', checking again in {self.poll_interval:.0f}s")
+            self._sleep(self.poll_interval)
+
+    def results(self, batch) -> dict[str, str]:
+        """Download the output of a finished batch; failed requests are logged and left out."""
+        if not batch.output_file_id:
+            raise BatchError(f"Batch {batch.id} ended with status '{batch.status}' and no output.")
+
+        texts = {}
+        for entry in self._read_jsonl(batch.output_file_id):
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                logger.warning(f"Batch request '{entry.get('custom_id')}' failed: {entry.get('error') or response}")
+                continue
+            texts[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+
+        if batch.error_file_id:
+            for entry in self._read_jsonl(batch.error_file_id):
+                logger.warning(f"Batch request '{entry.get('custom_id')}' failed: {entry.get('error') or entry.get('response')}")
+        return texts
+
+    def _read_jsonl(self, file_id: str) -> list[dict]:
+        content = self._call(lambda: self.client.files.content(file_id), "Batch output download")
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    def _call(self, fn, description: str):
+        return call_with_retry(fn, self.retry_policy, description)
+
+
+def query_llm_batch(batch_client: BatchLLMClient, requests: list[BatchRequest]) -> dict[str, str]:
+    """
+    Runs the requests through the batch client.
+
+    Returns:
+        dict: generated text by custom_id (failed requests are missing)
+    Raises:
+        RuntimeError: if the batch as a whole fails
+    """
+    logger.info(f"Querying LLM with a batch of {len(requests)} requests...")
+    try:
+        texts = batch_client.run(requests)
+    except Exception as e:
+        logger.error(f"Error querying LLM batch: {e}")
+        raise RuntimeError("Failed to query the LLM batch.") from e
+    logger.info(f"LLM batch returned {len(texts)}/{len(requests)} responses.")
+    return texts
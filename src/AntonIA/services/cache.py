@@ -0,0 +1,141 @@
+"""
+cache.py
+--------
+Small key/value caches used to avoid paying for the same API call twice.
+
+Classes:
+    CacheStats: hit/miss counters shared by the caches.
+    LRUCache: bounded in-memory cache evicting the least recently used entry.
+    DiskCache: on-disk cache with a time-to-live and a total size cap (LRU eviction).
+Functions:
+    make_cache_key(*parts): stable hash of JSON-serializable parts, usable as a key by both caches.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Union
+
+
+logger = getLogger("AntonIA.cache")
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Return the SHA-256 hex digest of the JSON representation of parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache:
+    """In-memory cache keeping at most `max_entries` values."""
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._entries:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return self._entries[key]
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    On-disk cache storing one file per entry under `directory`.
+
+    Entries older than `ttl_seconds` are treated as missing. When the total size
+    exceeds `max_bytes`, the least recently read entries are deleted first.
+    The write time is kept in the file mtime and the last read time in its atime.
+    """
+    def __init__(self, directory: str, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        with self._lock:
+            try:
+                stat = path.stat()
+                if self.ttl_seconds is not None and time.time() - stat.st_mtime > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+                    raise FileNotFoundError(path)
+                data = path.read_bytes()
+                os.utime(path, (time.time(), stat.st_mtime))
+            except FileNotFoundError:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return data
+
+    def set(self, key: str, value: Union[bytes, BinaryIO]) -> None:
+        """Store bytes, or the content of a binary file object (copied in chunks from its current position)."""
+        path = self._path(key)
+        with self._lock:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                tmp_path.write_bytes(value)
+            else:
+                with open(tmp_path, "wb") as f:
+                    shutil.copyfileobj(value, f)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._path(key).unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        entries = [(p, p.stat()) for p in self.directory.glob("*/*") if not p.name.startswith(".")]
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in sorted(entries, key=lambda e: e[1].st_atime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            logger.debug(f"Evicted cache entry {path.name}")
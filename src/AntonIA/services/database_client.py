@@ -1,15 +1,73 @@
+import json
+import operator
 import os
-from typing import Protocol
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Literal, Protocol, Optional
 from logging import getLogger
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 
 
 logger = getLogger("AntonIA.database_client")
 
 
+# Storage modes for LocalFileDatabaseClient
+STORAGE_MODE_FILE = "file"        # one {table}.parquet rewritten on every save
+STORAGE_MODE_DATASET = "dataset"  # {table}/ directory of append-only part files
+
+PART_FILE_PREFIX = "part-"
+COMPACTED_FILE_PREFIX = "compacted-"
+COMPACTION_LOCK_FILE = ".compaction.lock"
+# Parquet metadata key listing the files a compacted file replaces, until they are deleted
+COMPACTED_FROM_METADATA_KEY = b"antonia.compacted_from"
+COMPACTION_LOCK_TIMEOUT_SECONDS = 600
+
+
+FilterOperator = Literal["==", "!=", "<", "<=", ">", ">="]
+
+_FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+@dataclass(frozen=True)
+class Filter:
+    """
+    A single `column <operator> value` condition.
+    Lists of filters are combined with AND.
+    """
+    column: str
+    operator: FilterOperator
+    value: Any
+
+    def __post_init__(self):
+        if self.operator not in _FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{self.operator}'.")
+
+    def as_tuple(self) -> tuple[str, str, Any]:
+        """Return the filter in the (column, op, value) form understood by pyarrow/pandas."""
+        return (self.column, self.operator, self.value)
+
+    def as_expression(self) -> ds.Expression:
+        """Return the filter as a pyarrow dataset expression."""
+        return _FILTER_OPERATORS[self.operator](ds.field(self.column), self.value)
+
+
 class DatabaseClient(Protocol):
     def save_record(self, table: str, record: dict) -> None:
         """Save a record to the specified table in the database."""
@@ -23,6 +81,14 @@ class DatabaseClient(Protocol):
         """Retrieve records matching a specific query from the specified table in the database."""
         pass
 
+    def get_records_matching_filters(self, table: str, filters: list[Filter]) -> pd.DataFrame:
+        """Retrieve records matching all the given filters, letting the backend push them down."""
+        pass
+
+    def replace_values(self, table: str, column: str, replacements: dict[Any, Any]) -> int:
+        """Replace the values of a column found in replacements, returning the number of rows changed."""
+        pass
+
 class MockDatabaseClient:
     """
     Mock client to simulate database operations in memory.
@@ -57,18 +123,71 @@ class MockDatabaseClient:
             logger.error(f"[MOCK] Error querying table '{table}': {e}")
             return pd.DataFrame()  # Return empty DataFrame on error
 
+    def get_records_matching_filters(self, table: str, filters: list[Filter]) -> pd.DataFrame:
+        df = self.get_all_records(table)
+        if df.empty:
+            return df
+        try:
+            return _apply_filters(df, filters)
+        except KeyError as e:
+            logger.error(f"[MOCK] Error filtering table '{table}': {e}")
+            return pd.DataFrame()  # Return empty DataFrame on error
+
+    def replace_values(self, table: str, column: str, replacements: dict[Any, Any]) -> int:
+        changed = 0
+        for record in self.tables.get(table, []):
+            if column in record and record[column] in replacements:
+                record[column] = replacements[record[column]]
+                changed += 1
+        return changed
+
 
 class LocalFileDatabaseClient:
-    def __init__(self, db_path: str):
+    """
+    Parquet-backed database where every table lives under `db_path`.
+
+    Two storage modes are supported:
+        - "file": the table is a single `{table}.parquet` that is read, extended and
+          rewritten on every save (cost grows with the table history).
+        - "dataset": the table is a `{table}/` directory of append-only part files.
+          Each save writes one small part file, and once `compaction_threshold` part
+          files have accumulated they are merged into a single compacted file
+          (in a background thread unless `background_compaction` is False). Once
+          `compaction_threshold` compacted files have accumulated, they are merged too.
+          A compacted file is written before its inputs are deleted and lists them in
+          its metadata, so readers skip the inputs instead of returning their rows twice.
+          A legacy `{table}.parquet` file is still read transparently.
+    """
+    def __init__(
+            self,
+            db_path: str,
+            storage_mode: str = STORAGE_MODE_FILE,
+            compaction_threshold: int = 32,
+            background_compaction: bool = True,
+            ):
+        if storage_mode not in (STORAGE_MODE_FILE, STORAGE_MODE_DATASET):
+            raise ValueError(f"Unknown storage mode '{storage_mode}'.")
+
         # Generate the database directory if it doesn't exist
         db_path = Path(db_path)
         db_path.mkdir(parents=True, exist_ok=True)
 
         self.db_path = db_path
         self.pd = pd
+        self.storage_mode = storage_mode
+        self.compaction_threshold = compaction_threshold
+        self.background_compaction = background_compaction
+        self._compaction_locks: dict[str, threading.Lock] = {}
+        self._compaction_threads: list[threading.Thread] = []
 
     def save_record(self, table: str, record: dict) -> None:
         """Save a record to a parquet file representing the table."""
+        if self.storage_mode == STORAGE_MODE_DATASET:
+            self._append_part(table, record)
+            logger.info(f"Record saved to {table} table.")
+            self._maybe_compact(table)
+            return
+
         new_row = self.pd.DataFrame([record])
 
         try:
@@ -82,6 +201,13 @@ class LocalFileDatabaseClient:
 
     def get_all_records(self, table: str) -> pd.DataFrame:
         """Retrieve all records from the specified table."""
+        if self.storage_mode == STORAGE_MODE_DATASET:
+            df = self._read_dataset(table)
+            if df is None:
+                logger.warning(f"Table '{table}' does not exist.")
+                return self.pd.DataFrame()
+            return df
+
         try:
             df = self.pd.read_parquet(f"{self.db_path}/{table}.parquet")
             return df
@@ -100,3 +226,422 @@ class LocalFileDatabaseClient:
         except Exception as e:
             logger.error(f"Error querying table '{table}': {e}")
             raise Exception(f"Error querying table '{table}': {e}") from e
+
+    def get_records_matching_filters(self, table: str, filters: list[Filter]) -> pd.DataFrame:
+        """
+        Retrieve records matching all the given filters from the specified table.
+
+        Filters are pushed down to pyarrow so that files and row groups whose
+        statistics cannot match are skipped instead of being loaded.
+        """
+        try:
+            if self.storage_mode == STORAGE_MODE_DATASET:
+                df = self._read_dataset(table, filters)
+                if df is None:
+                    logger.warning(f"Table '{table}' does not exist.")
+                    return self.pd.DataFrame()
+                return df
+
+            return self.pd.read_parquet(
+                f"{self.db_path}/{table}.parquet",
+                filters=[f.as_tuple() for f in filters] or None,
+            )
+        except FileNotFoundError:
+            logger.warning(f"Table '{table}' does not exist.")
+            return self.pd.DataFrame()
+        except pa.ArrowException as e:
+            logger.error(f"Error filtering table '{table}': {e}")
+            raise Exception(f"Error filtering table '{table}': {e}") from e
+
+    def compact(self, table: str, full: bool = False) -> int:
+        """
+        Merge the table's part files into a single compacted parquet file.
+
+        Args:
+            table: name of the table to compact
+            full: also merge previously compacted files and the legacy single file
+
+        Returns:
+            Number of files merged (0 if there was nothing to do or another
+            compaction of the same table is already running)
+        """
+        if self.storage_mode != STORAGE_MODE_DATASET:
+            return 0
+
+        lock = self._compaction_locks.setdefault(table, threading.Lock())
+        if not lock.acquire(blocking=False):
+            return 0
+        try:
+            with _CompactionFileLock(self._table_dir(table)) as acquired:
+                if not acquired:
+                    logger.debug(f"Compaction of '{table}' already running in another process.")
+                    return 0
+                return self._compact_files(table, full)
+        finally:
+            lock.release()
+
+    def wait_for_compaction(self) -> None:
+        """Block until all background compactions started by this client have finished."""
+        for thread in self._compaction_threads:
+            thread.join()
+        self._compaction_threads = []
+
+    def replace_values(self, table: str, column: str, replacements: dict[Any, Any]) -> int:
+        """
+        Replace the values of a column found in replacements, rewriting the affected files.
+
+        Returns:
+            Number of rows changed
+        Raises:
+            Exception: in dataset mode, if another process is compacting the table
+        """
+        if self.storage_mode != STORAGE_MODE_DATASET or not self._table_dir(table).exists():
+            legacy_file = self._legacy_file(table)
+            changed = _replace_in_file(legacy_file, column, replacements) if legacy_file.exists() else 0
+        else:
+            # Files are rewritten in place, so a compaction must not merge them meanwhile
+            with self._compaction_locks.setdefault(table, threading.Lock()):
+                with _CompactionFileLock(self._table_dir(table)) as acquired:
+                    if not acquired:
+                        raise Exception(f"Table '{table}' is being compacted by another process, retry later.")
+                    self._remove_covered_files(table)
+                    changed = sum(_replace_in_file(file, column, replacements) for file in self._dataset_files(table))
+        if changed:
+            logger.info(f"Replaced {changed} '{column}' values in table '{table}'.")
+        return changed
+
+    # -------------------------
+    # Dataset mode helpers
+    # -------------------------
+    def _table_dir(self, table: str) -> Path:
+        return self.db_path / table
+
+    def _legacy_file(self, table: str) -> Path:
+        return self.db_path / f"{table}.parquet"
+
+    def _part_files(self, table: str) -> list[Path]:
+        return sorted(self._table_dir(table).glob(f"{PART_FILE_PREFIX}*.parquet"))
+
+    def _compacted_files(self, table: str) -> list[Path]:
+        return sorted(self._table_dir(table).glob(f"{COMPACTED_FILE_PREFIX}*.parquet"))
+
+    def _all_dataset_files(self, table: str) -> list[Path]:
+        files = []
+        if self._legacy_file(table).exists():
+            files.append(self._legacy_file(table))
+        files.extend(self._compacted_files(table))
+        files.extend(self._part_files(table))
+        return files
+
+    def _dataset_files(self, table: str) -> list[Path]:
+        """Files holding the table rows, without the inputs of a compaction that have not been deleted yet."""
+        files = self._all_dataset_files(table)
+        covered = _covered_file_names(files)
+        return [f for f in files if f.name not in covered]
+
+    def _remove_covered_files(self, table: str) -> None:
+        """Delete the inputs left behind by a compaction that was interrupted; requires the compaction lock."""
+        files = self._all_dataset_files(table)
+        covered = _covered_file_names(files)
+        for file in files:
+            if file.name in covered:
+                logger.info(f"Removing {file.name} of table '{table}', already merged into a compacted file.")
+                file.unlink(missing_ok=True)
+
+    def _append_part(self, table: str, record: dict) -> Path:
+        table_dir = self._table_dir(table)
+        table_dir.mkdir(exist_ok=True)
+        part_path = table_dir / _unique_file_name(PART_FILE_PREFIX)
+        _write_atomically(pa.Table.from_pandas(self.pd.DataFrame([record]), preserve_index=False), part_path)
+        return part_path
+
+    def _read_dataset(
+            self,
+            table: str,
+            filters: Optional[list[Filter]] = None,
+            attempts: int = 3,
+            ) -> Optional[pd.DataFrame]:
+        # A concurrent compaction may delete files between listing and reading them,
+        # in which case the listing is simply refreshed.
+        for attempt in range(attempts):
+            try:
+                files = self._dataset_files(table)
+                if not files:
+                    return None
+                return _read_parquet_files(files, filters).to_pandas()
+            except FileNotFoundError:
+                if attempt == attempts - 1:
+                    raise
+                logger.debug(f"Files of table '{table}' changed while reading, retrying...")
+
+    def _maybe_compact(self, table: str) -> None:
+        if self.compaction_threshold <= 0 or max(
+                len(self._part_files(table)), len(self._compacted_files(table))) < self.compaction_threshold:
+            return
+
+        if not self.background_compaction:
+            self.compact(table)
+            return
+
+        # Non-daemon so that the interpreter waits for the compaction before exiting
+        thread = threading.Thread(target=self.compact, args=(table,), name=f"compact-{table}")
+        thread.start()
+        self._compaction_threads.append(thread)
+
+    def _compact_files(self, table: str, full: bool) -> int:
+        self._remove_covered_files(table)
+        if full:
+            files = self._all_dataset_files(table)
+        elif 0 < self.compaction_threshold <= len(self._compacted_files(table)):
+            files = self._compacted_files(table) + self._part_files(table)
+        else:
+            files = self._part_files(table)
+        if len(files) < 2:
+            return 0
+
+        # Publish the merged rows first; until the inputs are deleted, readers skip them
+        # because the compacted file lists them in its metadata
+        merged = _read_parquet_files(files)
+        metadata = dict(merged.schema.metadata or {})
+        metadata[COMPACTED_FROM_METADATA_KEY] = json.dumps([f.name for f in files]).encode()
+        target = self._table_dir(table) / _unique_file_name(COMPACTED_FILE_PREFIX)
+        _write_atomically(merged.replace_schema_metadata(metadata), target)
+
+        for file in files:
+            file.unlink(missing_ok=True)
+
+        logger.info(f"Compacted {len(files)} files of table '{table}' into {target.name}.")
+        return len(files)
+
+
+class SQLiteDatabaseClient:
+    """
+    SQLite-backed database storing every table in a single database file.
+
+    Tables are created from the first record saved to them and gain new columns
+    as records with new keys arrive. Tables with a `timestamp` column get an
+    index on it so date-range filters are index range scans. The database runs
+    in WAL mode so several processes can read while one writes, and a single
+    connection is reused (and serialized with a lock) for the client's lifetime.
+    """
+    def __init__(self, db_path: str, filename: str = "antonia.sqlite3", timeout: float = 30.0):
+        db_path = Path(db_path)
+        db_path.mkdir(parents=True, exist_ok=True)
+
+        self.db_file = db_path / filename
+        self._connection = sqlite3.connect(self.db_file, timeout=timeout, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        self._columns: dict[str, set[str]] = {}
+
+    def save_record(self, table: str, record: dict) -> None:
+        """Insert a record into the table, creating the table or columns as needed."""
+        row = {k: _to_sqlite_value(v) for k, v in record.items()}
+        columns = ", ".join(_quote(c) for c in row)
+        placeholders = ", ".join("?" for _ in row)
+
+        with self._lock, self._connection:
+            self._ensure_columns(table, list(row))
+            self._connection.execute(
+                f"INSERT INTO {_quote(table)} ({columns}) VALUES ({placeholders})",
+                list(row.values()),
+            )
+        logger.info(f"Record saved to {table} table.")
+
+    def get_all_records(self, table: str) -> pd.DataFrame:
+        """Retrieve all records from the specified table."""
+        return self._select(table, [])
+
+    def get_records_matching_query(self, table: str, query: str) -> pd.DataFrame:
+        """Retrieve records matching a pandas query string from the specified table."""
+        df = self.get_all_records(table)
+        if df.empty:
+            return df
+        try:
+            return df.query(query)
+        except Exception as e:
+            logger.error(f"Error querying table '{table}': {e}")
+            raise Exception(f"Error querying table '{table}': {e}") from e
+
+    def get_records_matching_filters(self, table: str, filters: list[Filter]) -> pd.DataFrame:
+        """Retrieve records matching all the given filters as an SQL WHERE clause."""
+        return self._select(table, filters)
+
+    def replace_values(self, table: str, column: str, replacements: dict[Any, Any]) -> int:
+        """Replace the values of a column found in replacements, returning the number of rows changed."""
+        with self._lock, self._connection:
+            if column not in self._table_columns(table):
+                return 0
+            cursor = self._connection.executemany(
+                f"UPDATE {_quote(table)} SET {_quote(column)} = ? WHERE {_quote(column)} = ?",
+                [(_to_sqlite_value(new), _to_sqlite_value(old)) for old, new in replacements.items()],
+            )
+            changed = cursor.rowcount
+        if changed:
+            logger.info(f"Replaced {changed} '{column}' values in table '{table}'.")
+        return changed
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _select(self, table: str, filters: list[Filter]) -> pd.DataFrame:
+        sql = f"SELECT * FROM {_quote(table)}"
+        if filters:
+            sql += " WHERE " + " AND ".join(f"{_quote(f.column)} {f.operator} ?" for f in filters)
+        params = [_to_sqlite_value(f.value) for f in filters]
+
+        with self._lock:
+            columns = self._table_columns(table)
+            if not columns:
+                logger.warning(f"Table '{table}' does not exist.")
+                return pd.DataFrame()
+            # SQLite silently reads an unknown double-quoted identifier as a string literal
+            unknown = [f.column for f in filters if f.column not in columns]
+            if unknown:
+                self._columns.pop(table, None)
+                unknown = [c for c in unknown if c not in self._table_columns(table)]
+            if unknown:
+                logger.error(f"Error filtering table '{table}': unknown columns {unknown}")
+                raise Exception(f"Error filtering table '{table}': unknown columns {unknown}")
+            try:
+                df = pd.read_sql_query(sql, self._connection, params=params)
+            except (sqlite3.Error, pd.errors.DatabaseError) as e:
+                logger.error(f"Error filtering table '{table}': {e}")
+                raise Exception(f"Error filtering table '{table}': {e}") from e
+
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+        return df
+
+    def _table_columns(self, table: str) -> set[str]:
+        if table not in self._columns:
+            rows = self._connection.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+            if not rows:
+                return set()
+            self._columns[table] = {row[1] for row in rows}
+        return self._columns[table]
+
+    def _ensure_columns(self, table: str, columns: list[str]) -> None:
+        if set(columns) <= self._table_columns(table):
+            return
+
+        # Take the write lock before reading the schema, so that another process cannot add
+        # the same column between the check and the ALTER; the caller's commit releases it
+        if not self._connection.in_transaction:
+            self._connection.execute("BEGIN IMMEDIATE")
+        # Refresh from the database, another process may have changed the table meanwhile
+        self._columns.pop(table, None)
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({', '.join(_quote(c) for c in columns)})"
+        )
+        existing = self._table_columns(table)
+        for column in columns:
+            if column not in existing:
+                self._connection.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+
+        if "timestamp" in columns:
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_timestamp')} "
+                f"ON {_quote(table)} ({_quote('timestamp')})"
+            )
+        self._columns.pop(table, None)
+
+
+def _quote(identifier: str) -> str:
+    """Quote an SQL identifier (table or column name)."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _to_sqlite_value(value: Any) -> Any:
+    """Store datetimes as fixed-width ISO strings so they sort and compare chronologically."""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _unique_file_name(prefix: str) -> str:
+    """Return a parquet file name that sorts chronologically and never collides."""
+    return f"{prefix}{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _write_atomically(table: pa.Table, path: Path) -> None:
+    """Write a parquet file under a temporary name and rename it into place."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _replace_in_file(path: Path, column: str, replacements: dict[Any, Any]) -> int:
+    """Rewrite a parquet file with the column values found in replacements replaced; returns the rows changed."""
+    df = pq.read_table(path).to_pandas()
+    if column not in df.columns:
+        return 0
+    mask = df[column].isin(list(replacements))
+    changed = int(mask.sum())
+    if changed:
+        df.loc[mask, column] = df.loc[mask, column].map(replacements)
+        _write_atomically(pa.Table.from_pandas(df, preserve_index=False), path)
+    return changed
+
+
+def _covered_file_names(files: list[Path]) -> set[str]:
+    """Names of the files that the compacted files among files replace."""
+    covered = set()
+    for file in files:
+        if file.name.startswith(COMPACTED_FILE_PREFIX):
+            metadata = pq.read_schema(file).metadata or {}
+            covered.update(json.loads(metadata.get(COMPACTED_FROM_METADATA_KEY, b"[]")))
+    return covered
+
+
+def _read_parquet_files(files: list[Path], filters: Optional[list[Filter]] = None) -> pa.Table:
+    """Read several parquet files as one table, unifying schemas that drifted over time."""
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+    dataset = ds.dataset([str(f) for f in files], schema=schema, format="parquet")
+
+    expression = None
+    for f in filters or []:
+        expression = f.as_expression() if expression is None else expression & f.as_expression()
+    return dataset.to_table(filter=expression)
+
+
+def _apply_filters(df: pd.DataFrame, filters: list[Filter]) -> pd.DataFrame:
+    """Apply filters to an in-memory DataFrame (used when there is nothing to push down to)."""
+    mask = pd.Series(True, index=df.index)
+    for f in filters:
+        mask &= _FILTER_OPERATORS[f.operator](df[f.column], f.value)
+    return df[mask]
+
+
+class _CompactionFileLock:
+    """
+    Cross-process lock guarding the compaction of a single table directory.
+    Locks older than COMPACTION_LOCK_TIMEOUT_SECONDS are considered stale and broken.
+    """
+    def __init__(self, table_dir: Path):
+        self.path = table_dir / COMPACTION_LOCK_FILE
+        self.acquired = False
+
+    def __enter__(self) -> bool:
+        try:
+            if time.time() - self.path.stat().st_mtime > COMPACTION_LOCK_TIMEOUT_SECONDS:
+                logger.warning(f"Breaking stale compaction lock {self.path}")
+                self.path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            self.acquired = True
+        except FileExistsError:
+            self.acquired = False
+        return self.acquired
+
+    def __exit__(self, *exc) -> None:
+        if self.acquired:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,99 @@
+"""
+http_client.py
+--------------
+Shared, keep-alive pooled HTTP clients for the OpenAI service objects.
+
+Every `OpenAI(...)` object creates its own connection pool unless it is given an
+HTTP client. Handing the same pooled client to every service object lets all LLM and
+image requests of a process reuse open connections, so the TCP and TLS handshakes
+are paid once per connection instead of once per service object.
+
+Classes:
+    HttpPoolSettings: pool size and timeouts of the shared clients.
+    HttpClientRegistry: hands out one sync client per process and one async client per event loop.
+"""
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Optional
+
+import httpx
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+
+logger = getLogger("AntonIA.http_client")
+
+
+@dataclass(frozen=True)
+class HttpPoolSettings:
+    """
+    Attributes:
+        max_connections: maximum number of open connections
+        max_keepalive_connections: idle connections kept open for reuse
+        keepalive_expiry: seconds an idle connection is kept open
+        connect_timeout: seconds to establish a connection
+        timeout: seconds for reading, writing and waiting for a pooled connection
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    timeout: float = 600.0  # image generation can take minutes
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+class HttpClientRegistry:
+    """
+    Lazily creates the shared HTTP clients and closes them on `close()`.
+
+    Async clients are bound to the event loop they were created in, so one is kept
+    per running loop; the sync client is shared by every thread.
+    """
+    def __init__(self, settings: Optional[HttpPoolSettings] = None):
+        self.settings = settings or HttpPoolSettings()
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = DefaultHttpxClient(limits=self.settings.limits(), timeout=self.settings.timeouts())
+                logger.debug(f"Created shared HTTP client ({self.settings})")
+            return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """Return the async client of the running event loop; must be called from a coroutine."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = DefaultAsyncHttpxClient(limits=self.settings.limits(), timeout=self.settings.timeouts())
+                self._async_clients[loop] = client
+                logger.debug(f"Created shared async HTTP client ({self.settings})")
+            return client
+
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop."""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        """Close the sync client. Async clients are closed with `aclose` from their own loop."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
@@ -2,26 +2,62 @@
 image_generation_client.py
 --------------------------
 Abstraction layer for AI-based image generation services.
-Currently implemented for OpenAI's Images API.
+Currently implemented for OpenAI's Images API, with a blocking and an asyncio client.
 """
+import asyncio
 import base64
+import hashlib
 from logging import getLogger
-from typing import Protocol, Literal
+from typing import Protocol, Literal, Optional
 from PIL import Image
 import io
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 
+from ..utils.base64_stream import DEFAULT_SPOOL_MAX_MEMORY, DecodedFile, decode_base64_spooled
+from ..utils.image_scoring import map_candidates
+from .cache import DiskCache, CacheStats, make_cache_key
+from .retry import RetryPolicy, call_with_retry, acall_with_retry
+from .rate_limiter import TokenBucketRateLimiter
 
 
 logger = getLogger("AntonIA.image_generation_client")
 
 
+def _pop_b64_images(result):
+    """Yield the base64 payloads of a response, dropping each one from it once consumed."""
+    while result.data:
+        yield result.data.pop(0).b64_json
+
+
 class ImageGenerationClient(Protocol):
     def generate_image(self, prompt: str, size: str = "1024x1024") -> bytes:
         """Generate an image from a textual prompt and return the path to the saved image."""
         pass
 
+    def generate_images(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[bytes]:
+        """Generate n alternative images from a textual prompt in a single request and return their bytes."""
+        pass
+
+    def generate_image_files(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[DecodedFile]:
+        """Like generate_images, returning each image as a file-like object instead of bytes."""
+        pass
+
+
+class AsyncImageGenerationClient(Protocol):
+    async def generate_image(self, prompt: str, size: str = "1024x1024") -> bytes:
+        """Generate an image from a textual prompt without blocking the event loop and return its bytes."""
+        pass
+
+    async def generate_images(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[bytes]:
+        """Async counterpart of ImageGenerationClient.generate_images."""
+        pass
+
+    async def generate_image_files(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[DecodedFile]:
+        """Async counterpart of ImageGenerationClient.generate_image_files."""
+        pass
+
 
 class MockImageGenerationClient:
     def __init__(self):
@@ -38,19 +74,44 @@ class MockImageGenerationClient:
     def generate_image(self, prompt: str, size: str = "1024x1024") -> bytes:
         logger.info(f"Mock image generation for prompt: '{prompt}'")
         return self._default_image
+
+    def generate_images(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[bytes]:
+        logger.info(f"Mock generation of {n} images for prompt: '{prompt}'")
+        return [self._default_image] * n
+
+    def generate_image_files(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[DecodedFile]:
+        encoded = base64.b64encode(self._default_image).decode("ascii")
+        return [decode_base64_spooled(encoded) for _ in range(n)]
     
 
 class OpenAIimageGenerationClient:
-    def __init__(self, api_key, model: str = "gpt-image-1"):
+    def __init__(
+            self,
+            api_key,
+            model: str = "gpt-image-1",
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[TokenBucketRateLimiter] = None,
+            http_client: Optional[httpx.Client] = None,
+            spool_max_memory: int = DEFAULT_SPOOL_MAX_MEMORY,
+            ):
         """
         Initialize the image generation client.
 
         Args:
             model: model identifier for image generation (e.g., 'gpt-image-1')
-            output_dir: local directory where images will be saved
+            retry_policy: retries for transient API errors (replaces the SDK's built-in retries)
+            rate_limiter: limiter shared with other clients, consulted before every request
+            http_client: pooled HTTP client shared with other service objects (see HttpClientRegistry)
+            spool_max_memory: bytes an image decoded by generate_image_files keeps in memory before spilling to disk
         """
-        self.client = OpenAI(api_key=api_key)
+        client_options = {"max_retries": 0} if retry_policy else {}
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = OpenAI(api_key=api_key, **client_options)
         self.model = model
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.rate_limiter = rate_limiter
+        self.spool_max_memory = spool_max_memory
 
     def generate_image(
             self, 
@@ -72,20 +133,185 @@ class OpenAIimageGenerationClient:
         Returns:
             Path to the saved image file
         """
-        logger.info("Generating image...")
+        return self.generate_images(prompt, size, n=1)[0]
+
+    def generate_images(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[bytes]:
+        """
+        Generate n alternative images in a single request.
+
+        Returns:
+            Bytes of every generated image
+        """
+        return self._generate(prompt, size, n, base64.b64decode)
+
+    def generate_image_files(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[DecodedFile]:
+        """
+        Like generate_images, but decodes each image in chunks into a spooled temporary file
+        (in memory up to `spool_max_memory` bytes), so no full bytes copy of it is built.
+        """
+        return self._generate(prompt, size, n, lambda b64: decode_base64_spooled(b64, self.spool_max_memory))
+
+    def _generate(self, prompt: str, size: str, n: int, decode):
+        logger.info("Generating image..." if n == 1 else f"Generating {n} image candidates...")
         logger.debug(f"Prompt: {prompt}")
 
+        def request():
+            if self.rate_limiter:
+                self.rate_limiter.acquire(self.model)
+            return self.client.images.generate(
+                model=self.model,
+                prompt=prompt,
+                size=size,
+                n=n,
+                quality="auto",
+            )
+
         try:
-            result = self.client.images.generate(
+            result = call_with_retry(request, self.retry_policy, "Image generation request")
+            return map_candidates(decode, list(_pop_b64_images(result)))
+
+        except Exception as e:
+            logger.exception("Failed to generate image")
+            raise RuntimeError("Image generation failed") from e
+
+
+class CachingImageGenerationClient:
+    """
+    Wraps an ImageGenerationClient and stores the decoded images on disk, keyed by a
+    hash of (model, prompt, size), so re-running a crashed pipeline does not pay for
+    the same image twice. Size cap and LRU eviction are handled by the DiskCache.
+    """
+    def __init__(self, client: ImageGenerationClient, disk_cache: DiskCache):
+        self.client = client
+        self.disk_cache = disk_cache
+        self.stats = CacheStats()
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", "")
+
+    def generate_image(self, prompt: str, size: str = "1024x1024") -> bytes:
+        key = make_cache_key(self.model, prompt, size)
+        cached = self.disk_cache.get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            logger.info("Image served from cache.")
+            return cached
+
+        self.stats.misses += 1
+        image_bytes = self.client.generate_image(prompt, size)
+        self.disk_cache.set(key, image_bytes)
+        return image_bytes
+
+    def generate_images(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[bytes]:
+        """Candidates are cached one entry each and only reused if all n of them are still cached."""
+        keys = [make_cache_key(self.model, prompt, size, n, i) for i in range(n)]
+        cached = [self.disk_cache.get(key) for key in keys]
+        if all(image is not None for image in cached):
+            self.stats.hits += 1
+            logger.info(f"{n} image candidates served from cache.")
+            return cached
+
+        self.stats.misses += 1
+        images = self.client.generate_images(prompt, size, n)
+        for key, image_bytes in zip(keys, images):
+            self.disk_cache.set(key, image_bytes)
+        return images
+
+    def generate_image_files(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[DecodedFile]:
+        """Same cache entries as generate_image / generate_images; new files are copied into the cache in chunks."""
+        keys = [make_cache_key(self.model, prompt, size)] if n == 1 else [make_cache_key(self.model, prompt, size, n, i) for i in range(n)]
+        cached = [self.disk_cache.get(key) for key in keys]
+        if all(image is not None for image in cached):
+            self.stats.hits += 1
+            logger.info("Image served from cache." if n == 1 else f"{n} image candidates served from cache.")
+            return [DecodedFile(io.BytesIO(data), len(data), hashlib.sha256(data).hexdigest()) for data in cached]
+
+        self.stats.misses += 1
+        files = self.client.generate_image_files(prompt, size, n)
+        for key, decoded in zip(keys, files):
+            self.disk_cache.set(key, decoded.file)
+            decoded.file.seek(0)
+        return files
+
+
+class AsyncOpenAIimageGenerationClient:
+    def __init__(
+            self,
+            api_key,
+            model: str = "gpt-image-1",
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[TokenBucketRateLimiter] = None,
+            http_client: Optional[httpx.AsyncClient] = None,
+            spool_max_memory: int = DEFAULT_SPOOL_MAX_MEMORY,
+            ):
+        """
+        Initialize the asyncio image generation client.
+
+        Args:
+            model: model identifier for image generation (e.g., 'gpt-image-1')
+            retry_policy: retries for transient API errors (replaces the SDK's built-in retries)
+            rate_limiter: limiter shared with other clients, consulted before every request
+            http_client: pooled HTTP client shared with other service objects (see HttpClientRegistry)
+            spool_max_memory: bytes an image decoded by generate_image_files keeps in memory before spilling to disk
+        """
+        client_options = {"max_retries": 0} if retry_policy else {}
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = AsyncOpenAI(api_key=api_key, **client_options)
+        self.model = model
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.rate_limiter = rate_limiter
+        self.spool_max_memory = spool_max_memory
+
+    async def generate_image(
+            self,
+            prompt: str,
+            size: Literal[
+                '1024x1024',
+                '1024x1536',
+                '1536x1024',
+                'auto',
+                ] = "1024x1024"
+            ) -> bytes:
+        """
+        Generate an image from a textual prompt, awaiting the API call.
+
+        Args:
+            prompt: textual description of the desired image
+            size: resolution (supported: '1024x1024', '1024x1536', etc.)
+
+        Returns:
+            Decoded image bytes
+        """
+        return (await self.generate_images(prompt, size, n=1))[0]
+
+    async def generate_images(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[bytes]:
+        """Generate n alternative images in a single request, awaiting the API call."""
+        return await self._generate(prompt, size, n, base64.b64decode)
+
+    async def generate_image_files(self, prompt: str, size: str = "1024x1024", n: int = 1) -> list[DecodedFile]:
+        """Async counterpart of OpenAIimageGenerationClient.generate_image_files; decoding runs in a worker thread."""
+        return await self._generate(prompt, size, n, lambda b64: decode_base64_spooled(b64, self.spool_max_memory))
+
+    async def _generate(self, prompt: str, size: str, n: int, decode):
+        logger.info("Generating image..." if n == 1 else f"Generating {n} image candidates...")
+        logger.debug(f"Prompt: {prompt}")
+
+        async def request():
+            if self.rate_limiter:
+                await asyncio.to_thread(self.rate_limiter.acquire, self.model)
+            return await self.client.images.generate(
                 model=self.model,
                 prompt=prompt,
                 size=size,
-                n=1,
+                n=n,
                 quality="auto",
             )
 
-            image_base64 = result.data[0].b64_json
-            return base64.b64decode(image_base64)
+        try:
+            result = await acall_with_retry(request, self.retry_policy, "Image generation request")
+            return await asyncio.to_thread(map_candidates, decode, list(_pop_b64_images(result)))
 
         except Exception as e:
             logger.exception("Failed to generate image")
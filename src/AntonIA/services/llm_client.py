@@ -6,19 +6,43 @@ Classes:
     LLMClient (Protocol): Interface for LLM clients with a text generation method.
     MockAIClient: Mock implementation of LLMClient for testing purposes.
     OpenAIClient: Implementation of LLMClient using the OpenAI API.
+    AsyncLLMClient (Protocol): Interface for LLM clients with an awaitable text generation method.
+    AsyncOpenAIClient: Implementation of AsyncLLMClient using the async OpenAI API.
+    CachingLLMClient: Wrapper around any LLMClient that reuses responses for identical requests.
 Functions:
     query_llm(llm_client, prompt, temperature): Queries the provided LLM client with a prompt and returns the generated text.
+    stream_llm(llm_client, prompt, temperature): Yields the generated text in chunks as they arrive.
+    aquery_llm(llm_client, prompt, temperature): Async counterpart of query_llm for AsyncLLMClient instances.
+    without_cache(llm_client): Returns the client behind a CachingLLMClient.
+    invalidate_llm_response(llm_client, prompt, temperature): Drops a cached response.
 """
 
+import asyncio
 from logging import getLogger
-from typing import Protocol
+from typing import Iterator, Protocol, Optional
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 
+from .cache import LRUCache, DiskCache, CacheStats, make_cache_key
+from .retry import RetryPolicy, call_with_retry, acall_with_retry
+from .rate_limiter import TokenBucketRateLimiter, estimate_tokens
 
 
 logger = getLogger("AntonIA.llm_client")
 
+# Completion tokens budgeted per request by the rate limiter, on top of the prompt
+ESTIMATED_COMPLETION_TOKENS = 500
+
+def _estimated_request_tokens(system_prompt: str, prompt: str) -> int:
+    return estimate_tokens(system_prompt) + estimate_tokens(prompt) + ESTIMATED_COMPLETION_TOKENS
+
+
+def _format_options(response_format: Optional[dict]) -> dict:
+    """Request options for structured output; empty so plain requests keep their exact signature."""
+    return {"response_format": response_format} if response_format else {}
+
+
 class LLMClient(Protocol):
     """
     Protocol for a Large Language Model (LLM) client.
@@ -61,7 +85,7 @@ class MockAIClient:
     def __init__(self, response: str = "This is a mock response."):
         self.response = response
 
-    def generate_text(self, prompt: str, temperature: float = 0.8) -> str:
+    def generate_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> str:
         """
         Generates a text response based on the given prompt and temperature.
 
@@ -75,39 +99,301 @@ class MockAIClient:
         """Mock implementation for testing purposes."""
         return self.response
 
+    def stream_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None, chunk_size: int = 8) -> Iterator[str]:
+        """Yield the mock response in chunks of chunk_size characters."""
+        for i in range(0, len(self.response), chunk_size):
+            yield self.response[i:i + chunk_size]
+
 
 class OpenAIClient:
-    def __init__(self, api_key, model: str = "gpt-4.1-nano", system_prompt: str = ""):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(
+            self,
+            api_key,
+            model: str = "gpt-4.1-nano",
+            system_prompt: str = "",
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[TokenBucketRateLimiter] = None,
+            http_client: Optional[httpx.Client] = None,
+            ):
+        # When a retry policy is given it replaces the SDK's built-in retries
+        client_options = {"max_retries": 0} if retry_policy else {}
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = OpenAI(api_key=api_key, **client_options)
         self.model = model
         self.system_prompt = system_prompt
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.rate_limiter = rate_limiter
 
-    def generate_text(self, prompt: str, temperature: float = 0.8) -> str:
-        """Send a text-generation request and return the model’s text."""
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt}
-                ],
-            temperature=temperature,
-        )
+    def generate_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> str:
+        """
+        Send a text-generation request and return the model’s text.
+        A response_format (e.g. a JSON schema) requests structured output.
+        """
+
+        def request():
+            if self.rate_limiter:
+                self.rate_limiter.acquire(self.model, _estimated_request_tokens(self.system_prompt, prompt))
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": prompt}
+                    ],
+                temperature=temperature,
+                **_format_options(response_format),
+            )
+
+        response = call_with_retry(request, self.retry_policy, "LLM request")
+        return response.choices[0].message.content
+
+    def stream_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> Iterator[str]:
+        """
+        Send a streaming text-generation request and yield the text as it arrives.
+        Only opening the stream is retried; an error in the middle of it is raised.
+        """
+
+        def request():
+            if self.rate_limiter:
+                self.rate_limiter.acquire(self.model, _estimated_request_tokens(self.system_prompt, prompt))
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": prompt}
+                    ],
+                temperature=temperature,
+                stream=True,
+                **_format_options(response_format),
+            )
+
+        stream = call_with_retry(request, self.retry_policy, "LLM streaming request")
+        with stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+class AsyncLLMClient(Protocol):
+    """
+    Protocol for a Large Language Model (LLM) client whose requests can be awaited,
+    so that several of them run concurrently in an asyncio event loop.
+    """
+    async def generate_text(self, prompt: str, temperature: float = 0.8) -> str:
+        """
+        Generates text from a given prompt using a language model.
+
+        Args:
+            prompt (str): The input text prompt to guide the text generation.
+            temperature (float, optional): Sampling temperature for controlling randomness. Defaults to 0.8.
+
+        Returns:
+            str: The generated text from the model.
+        """
+        pass
+
+
+class AsyncOpenAIClient:
+    def __init__(
+            self,
+            api_key,
+            model: str = "gpt-4.1-nano",
+            system_prompt: str = "",
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[TokenBucketRateLimiter] = None,
+            http_client: Optional[httpx.AsyncClient] = None,
+            ):
+        client_options = {"max_retries": 0} if retry_policy else {}
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = AsyncOpenAI(api_key=api_key, **client_options)
+        self.model = model
+        self.system_prompt = system_prompt
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.rate_limiter = rate_limiter
+
+    async def generate_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> str:
+        """Send a text-generation request without blocking the event loop and return the model’s text."""
+
+        async def request():
+            if self.rate_limiter:
+                # The limiter blocks while waiting, keep that off the event loop
+                await asyncio.to_thread(
+                    self.rate_limiter.acquire, self.model, _estimated_request_tokens(self.system_prompt, prompt)
+                )
+            return await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": prompt}
+                    ],
+                temperature=temperature,
+                **_format_options(response_format),
+            )
+
+        response = await acall_with_retry(request, self.retry_policy, "LLM request")
         return response.choices[0].message.content
 
-def query_llm(llm_client: LLMClient, prompt: str, temperature: float = 0.8) -> str:
+class CachingLLMClient:
+    """
+    Wraps an LLMClient and reuses its responses for identical requests.
+
+    Requests are keyed on (system prompt, model, prompt, temperature); the system
+    prompt and model are read from the wrapped client when it exposes them.
+    Responses are looked up in memory first, then on disk (if a DiskCache is given),
+    and only on a miss in both is the wrapped client queried.
+    """
+    def __init__(
+            self,
+            llm_client: LLMClient,
+            memory_cache: Optional[LRUCache] = None,
+            disk_cache: Optional[DiskCache] = None,
+            ):
+        self.llm_client = llm_client
+        self.memory_cache = memory_cache if memory_cache is not None else LRUCache()
+        self.disk_cache = disk_cache
+        self.stats = CacheStats()
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llm_client, "model", "")
+
+    @property
+    def system_prompt(self) -> str:
+        return getattr(self.llm_client, "system_prompt", "")
+
+    def generate_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> str:
+        """Return the cached response for this request, querying the wrapped client on a miss."""
+        key = self._key(prompt, temperature, response_format)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        response = self.llm_client.generate_text(prompt, temperature=temperature, **_format_options(response_format))
+        self._store(key, response)
+        return response
+
+    def stream_text(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> Iterator[str]:
+        """Yield the cached response in one chunk, or stream from the wrapped client and cache the result."""
+        key = self._key(prompt, temperature, response_format)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        for chunk in stream_llm_chunks(self.llm_client, prompt, temperature, response_format):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, "".join(chunks))
+
+    def invalidate(self, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> None:
+        """Drop the cached response for this request, e.g. because it turned out to be malformed."""
+        key = self._key(prompt, temperature, response_format)
+        self.memory_cache.delete(key)
+        if self.disk_cache is not None:
+            self.disk_cache.delete(key)
+
+    def _key(self, prompt: str, temperature: float, response_format: Optional[dict]) -> str:
+        parts = [self.system_prompt, self.model, prompt, temperature]
+        if response_format:
+            parts.append(response_format)
+        return make_cache_key(*parts)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        cached = self.memory_cache.get(key)
+        if cached is None and self.disk_cache is not None:
+            cached = self.disk_cache.get(key)
+            if cached is not None:
+                self.memory_cache.set(key, cached)
+
+        if cached is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        logger.info("LLM response served from cache.")
+        return cached.decode("utf-8")
+
+    def _store(self, key: str, response: str) -> None:
+        self.memory_cache.set(key, response.encode("utf-8"))
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, response.encode("utf-8"))
+
+
+def without_cache(llm_client: LLMClient) -> LLMClient:
+    """Return the client behind a CachingLLMClient, for requests whose answers should not be reused."""
+    return llm_client.llm_client if isinstance(llm_client, CachingLLMClient) else llm_client
+
+
+def invalidate_llm_response(llm_client: LLMClient, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> None:
+    """Drop the cached response of a request; does nothing for clients without a cache."""
+    invalidate = getattr(llm_client, "invalidate", None)
+    if invalidate is not None:
+        invalidate(prompt, temperature, response_format)
+
+
+def query_llm(llm_client: LLMClient, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> str:
     """
     Generates a good morning phrase based on the day of the week.
 
     Args:
         llm_client: instance of the LLMClient abstraction (e.g., OpenAI, Anthropic, etc.)
         prompt: text prompt to send to the LLM
+        response_format: structured output format (e.g. a JSON schema), for clients supporting it
+    Returns:
+        str: response of the LLM
+    """
+    logger.info("Querying LLM...")
+    try:
+        response = llm_client.generate_text(prompt, temperature=temperature, **_format_options(response_format))
+        logger.info(f"LLM response: {response}")
+        return response
+    except Exception as e:
+        logger.exception("Error querying LLM.")
+        raise RuntimeError("Failed to query the LLM.") from e
+
+def stream_llm_chunks(llm_client: LLMClient, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> Iterator[str]:
+    """Stream from clients with a `stream_text` method, otherwise yield the whole response at once."""
+    options = _format_options(response_format)
+    if hasattr(llm_client, "stream_text"):
+        yield from llm_client.stream_text(prompt, temperature=temperature, **options)
+    else:
+        yield llm_client.generate_text(prompt, temperature=temperature, **options)
+
+
+def stream_llm(llm_client: LLMClient, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> Iterator[str]:
+    """
+    Streaming counterpart of query_llm.
+
+    Args:
+        llm_client: instance of the LLMClient abstraction
+        prompt: text prompt to send to the LLM
+    Yields:
+        str: chunks of the LLM response
+    """
+    logger.info("Querying LLM (streaming)...")
+    chunks = []
+    try:
+        for chunk in stream_llm_chunks(llm_client, prompt, temperature, response_format):
+            chunks.append(chunk)
+            yield chunk
+    except Exception as e:
+        logger.exception("Error querying LLM.")
+        raise RuntimeError("Failed to query the LLM.") from e
+    logger.info(f"LLM response: {''.join(chunks)}")
+
+async def aquery_llm(llm_client: AsyncLLMClient, prompt: str, temperature: float = 0.8, response_format: Optional[dict] = None) -> str:
+    """
+    Async counterpart of query_llm.
+
+    Args:
+        llm_client: instance of the AsyncLLMClient abstraction
+        prompt: text prompt to send to the LLM
     Returns:
         str: response of the LLM
     """
     logger.info("Querying LLM...")
     try:
-        response = llm_client.generate_text(prompt, temperature=temperature)
+        response = await llm_client.generate_text(prompt, temperature=temperature, **_format_options(response_format))
         logger.info(f"LLM response: {response}")
         return response
     except Exception as e:
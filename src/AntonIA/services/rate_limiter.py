@@ -0,0 +1,156 @@
+"""
+rate_limiter.py
+---------------
+Client-side token-bucket rate limiting for API requests, per model.
+
+Each model has up to two buckets: one for requests and one for (estimated) tokens,
+refilled continuously at the per-minute quota. A request waits until both buckets
+can pay for it, which keeps throughput just under quota instead of alternating
+between bursts and 429 errors.
+
+The bucket state lives in memory (shared by every client holding the same limiter)
+or, when a state file is given, in a JSON file guarded by an exclusive file lock so
+that every process on the host draws from the same buckets.
+
+Classes:
+    RateLimit: per-minute quotas of a model.
+    TokenBucketRateLimiter: blocks callers until their request fits the quotas.
+Functions:
+    estimate_tokens(text): rough token count of a text, for the token bucket.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+
+logger = getLogger("AntonIA.rate_limiter")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+class _MemoryState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict = {}
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict]:
+        with self._lock:
+            yield self._state
+
+
+class _FileState:
+    """Bucket state in a JSON file; an flock on a sibling lock file serializes processes."""
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict]:
+        import fcntl  # POSIX only, imported here so in-memory limiting works everywhere
+
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.loads(self.path.read_text(encoding="utf-8"))
+                except (FileNotFoundError, json.JSONDecodeError):
+                    state = {}
+                yield state
+                tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+                tmp_path.write_text(json.dumps(state), encoding="utf-8")
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class TokenBucketRateLimiter:
+    """
+    Args:
+        limits: quotas by model name
+        default_limit: quotas for models not listed in `limits` (unlimited if None)
+        burst_seconds: bucket capacity, in seconds worth of quota
+        state_file: JSON file shared by every process on the host (in-memory state if None)
+    """
+    def __init__(
+            self,
+            limits: dict[str, RateLimit],
+            default_limit: Optional[RateLimit] = None,
+            burst_seconds: float = 10.0,
+            state_file: Optional[str] = None,
+            sleep: Optional[Callable[[float], None]] = None,
+            clock: Optional[Callable[[], float]] = None,
+            ):
+        self.limits = limits
+        self.default_limit = default_limit
+        self.burst_seconds = burst_seconds
+        self._state = _FileState(state_file) if state_file else _MemoryState()
+        self._sleep = sleep or time.sleep
+        # Wall-clock time, so that several processes agree on when buckets were refilled
+        self._clock = clock or time.time
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """
+        Block until one request of `tokens` estimated tokens fits the model's quotas.
+
+        Returns:
+            Total seconds spent waiting
+        """
+        limit = self.limits.get(model, self.default_limit)
+        if limit is None:
+            return 0.0
+
+        costs = {"requests": (1, limit.requests_per_minute), "tokens": (tokens, limit.tokens_per_minute)}
+        waited = 0.0
+        while True:
+            with self._state.transaction() as state:
+                wait = self._try_consume(state.setdefault(model, {}), costs)
+            if wait <= 0:
+                if waited:
+                    logger.debug(f"Rate limiter delayed a '{model}' request by {waited:.2f}s")
+                return waited
+            self._sleep(wait)
+            waited += wait
+
+    def _try_consume(self, buckets: dict, costs: dict[str, tuple[float, Optional[float]]]) -> float:
+        """Refill the buckets and take the costs if all of them allow it; otherwise return the wait."""
+        now = self._clock()
+        wait = 0.0
+        for name, (cost, per_minute) in costs.items():
+            if not per_minute or not cost:
+                continue
+            rate = per_minute / 60.0
+            capacity = max(rate * self.burst_seconds, 1.0)
+            level, updated = buckets.get(name, (capacity, now))
+            level = min(capacity, level + (now - updated) * rate)
+            buckets[name] = (level, now)
+
+            # Requests larger than the bucket wait for a full bucket, then leave it in debt
+            required = min(cost, capacity)
+            if level < required:
+                wait = max(wait, (required - level) / rate)
+
+        if wait > 0:
+            return wait
+        for name, (cost, per_minute) in costs.items():
+            if per_minute and cost:
+                level, updated = buckets[name]
+                buckets[name] = (level - cost, updated)
+        return 0.0
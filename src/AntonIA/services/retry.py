@@ -0,0 +1,126 @@
+"""
+retry.py
+--------
+Retry policy with exponential backoff and jitter for calls to external APIs.
+
+Classes:
+    RetryPolicy: how many times, how long and on which errors to retry.
+Functions:
+    is_retryable(error, policy): whether an error is worth another attempt.
+    call_with_retry(fn, policy, description): call fn, retrying transient failures.
+    acall_with_retry(fn, policy, description): async counterpart for coroutine functions.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+
+
+logger = getLogger("AntonIA.retry")
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Attributes:
+        max_attempts: total number of attempts, including the first one
+        base_delay: delay in seconds before the first retry, doubled on every retry
+        max_delay: upper bound for a single delay in seconds
+        jitter: fraction (0.0–1.0) of each delay that is randomized, to spread retries of concurrent runs
+        deadline_seconds: overall time budget; no retry starts if it would end after the deadline
+        retryable_status_codes: HTTP status codes considered transient
+    """
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    jitter: float = 0.5
+    deadline_seconds: Optional[float] = 120.0
+    retryable_status_codes: tuple[int, ...] = (408, 409, 429, 500, 502, 503, 504)
+
+    def delay_for(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Return the delay before retry number `attempt` (1-based)."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay *= 1 - self.jitter * random.random()
+        return max(delay, _retry_after(error))
+
+
+def _retry_after(error: Optional[BaseException]) -> float:
+    """Seconds requested by the server through a Retry-After header, 0 if none."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_retryable(error: BaseException, policy: RetryPolicy) -> bool:
+    """Timeouts, connection errors and the policy's status codes are retryable."""
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in policy.retryable_status_codes
+    return False
+
+
+def _next_delay(policy: RetryPolicy, attempt: int, error: BaseException, start: float, clock: Callable[[], float]) -> Optional[float]:
+    """Delay before the next attempt, or None if the error should be raised."""
+    if attempt >= policy.max_attempts or not is_retryable(error, policy):
+        return None
+    delay = policy.delay_for(attempt, error)
+    if policy.deadline_seconds is not None and clock() - start + delay > policy.deadline_seconds:
+        logger.warning("Retry deadline reached, giving up.")
+        return None
+    return delay
+
+
+def call_with_retry(
+        fn: Callable[[], T],
+        policy: RetryPolicy,
+        description: str = "API call",
+        sleep: Optional[Callable[[float], None]] = None,
+        clock: Optional[Callable[[], float]] = None,
+        ) -> T:
+    """Call fn until it succeeds, the error is not retryable, or attempts/deadline run out."""
+    sleep = sleep or time.sleep
+    clock = clock or time.monotonic
+    start = clock()
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            delay = _next_delay(policy, attempt, e, start, clock)
+            if delay is None:
+                raise
+            logger.warning(f"{description} failed (attempt {attempt}/{policy.max_attempts}): {e}. Retrying in {delay:.1f}s")
+            sleep(delay)
+            attempt += 1
+
+
+async def acall_with_retry(
+        fn: Callable[[], Awaitable[T]],
+        policy: RetryPolicy,
+        description: str = "API call",
+        clock: Optional[Callable[[], float]] = None,
+        ) -> T:
+    """Async counterpart of call_with_retry; waits with asyncio.sleep."""
+    clock = clock or time.monotonic
+    start = clock()
+    attempt = 1
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            delay = _next_delay(policy, attempt, e, start, clock)
+            if delay is None:
+                raise
+            logger.warning(f"{description} failed (attempt {attempt}/{policy.max_attempts}): {e}. Retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
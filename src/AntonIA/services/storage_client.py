@@ -1,51 +1,473 @@
+import base64
+import errno
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from logging import getLogger
-from typing import Protocol, Optional
+from typing import BinaryIO, Protocol, Optional, Union
 
 
 
 logger = getLogger("AntonIA.storage_client")
 
 class StorageClient(Protocol):
-    def save_file(self, file_path: Path, destination: str) -> str:
+    def save_file(
+            self,
+            data: Union[bytes, BinaryIO],
+            filename: str,
+            destination: Optional[list[str]] = None,
+            sha256: Optional[str] = None,
+            ) -> str:
         """Save a file to the storage and return its URL or identifier."""
         pass
 
 
 class MockStorageClient:
-    def save_file(self, data: bytes, filename: str, destination: Optional[list[str]] = None) -> str:
+    def save_file(
+            self,
+            data: Union[bytes, BinaryIO],
+            filename: str,
+            destination: Optional[list[str]] = None,
+            sha256: Optional[str] = None,
+            ) -> str:
         logger.info(f"Mock save file '{filename}' to destination '{'/'.join(destination) if destination else ''}'")
         return f"mock://{('/'.join(destination) + '/' if destination else '')}{filename}"
 
 
+FSYNC_MODES = ("none", "always", "batch")
+STORAGE_LAYOUTS = ("plain", "content_addressed")
+OBJECTS_DIR = "objects"
+REFERENCE_SUFFIX = ".ref"
+LINK_ATTEMPTS = 3
+# os.link errors meaning hard links are not possible here (other errors are real failures)
+_NO_HARDLINK_ERRNOS = {errno.EPERM, errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK}
+COPY_CHUNK_SIZE = 1 << 20
+
+
 class LocalStorageClient:
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, fsync: str = "none", fsync_batch_size: int = 16, layout: str = "plain"):
         """
         Initialize the local storage client.
 
+        Files are written to a temporary name in the target directory and renamed into
+        place, so a crash never leaves a truncated file under the final name.
+
+        With the "content_addressed" layout, each distinct content is stored once under
+        `objects/<h[:2]>/<h[2:4]>/<sha256>` and the requested path is a hard link to it
+        (or, where hard links are not supported, a `<name>.ref` record holding the object
+        path, and the object path is returned). Saving content that is already stored only
+        adds the link.
+
         Args:
             base_dir: local directory where files will be saved
+            fsync: "none" (leave it to the OS), "always" (fsync every file before its rename,
+                then its directory), or "batch" (fsync every file before its rename, and the
+                directories of pending renames every fsync_batch_size saves and on flush)
+            fsync_batch_size: saves between two automatic flushes in "batch" mode
+            layout: "plain" (one file per save) or "content_addressed" (deduplicated objects)
         """
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"Unknown fsync mode '{fsync}', expected one of {FSYNC_MODES}.")
+        if layout not in STORAGE_LAYOUTS:
+            raise ValueError(f"Unknown storage layout '{layout}', expected one of {STORAGE_LAYOUTS}.")
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.fsync_batch_size = fsync_batch_size
+        self.layout = layout
+        self.objects_dir = self.base_dir / OBJECTS_DIR
+        self._known_dirs = {self.base_dir}
+        self._pending: list[Path] = []
+        self._lock = threading.Lock()
 
-    def save_file(self, data: bytes, filename: str, destination: Optional[list[str]] = None) -> str:
+    @property
+    def content_addressed(self) -> bool:
+        return self.layout == "content_addressed"
+
+    @property
+    def accepts_digest(self) -> bool:
+        """Whether image_saver should pass the content SHA-256 to save_file."""
+        return self.content_addressed
+
+    def save_file(
+            self,
+            data: Union[bytes, BinaryIO],
+            filename: str,
+            destination: Optional[list[str]] = None,
+            sha256: Optional[str] = None,
+            ) -> str:
         """
         Save a file to the local storage.
 
         Args:
-            file_path: path to the file to be saved
+            data: file content, as bytes or as a binary file object copied in chunks from its start
             destination: relative path within the storage base directory
+            sha256: hex digest of the content, if known (lets the content-addressed layout skip
+                writing content it already stores)
 
         Returns:
             Full path to the saved file as a string
         """
         dest_path = self.base_dir / (Path(*destination) if destination else Path()) / filename
-        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(dest_path.parent)
 
-        with open(dest_path, "wb") as f:
-            f.write(data)
+        if self.content_addressed:
+            dest_path, entry = self._save_linked(data, dest_path, sha256)
+        else:
+            self._write_atomic(data, dest_path)
+            entry = dest_path
+        self._synced(entry)
 
         logger.info(f"File saved to {dest_path}")
         return str(dest_path)
-    
+
+    def object_path(self, sha256: str) -> Path:
+        """Location of the object with this digest in the content-addressed layout."""
+        return self.objects_dir / sha256[:2] / sha256[2:4] / sha256
+
+    def lookup(self, sha256: str) -> Optional[str]:
+        """Path of the stored object with this digest, or None."""
+        path = self.object_path(sha256)
+        return str(path) if path.exists() else None
+
+    def collect_garbage(self) -> tuple[int, int]:
+        """
+        Delete the objects no longer referenced by any saved path.
+        An object's references are its extra hard links plus the `.ref` records naming it.
+
+        Returns:
+            (number of objects removed, bytes freed)
+        """
+        referenced = set()
+        for record in self.base_dir.rglob(f"*{REFERENCE_SUFFIX}"):
+            if self.objects_dir not in record.parents:
+                referenced.add(record.read_text(encoding="utf-8").strip())
+        removed, freed = 0, 0
+        if not self.objects_dir.exists():
+            return removed, freed
+        for path in self.objects_dir.glob("*/*/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            stat = path.stat()
+            if stat.st_nlink > 1 or str(path.relative_to(self.base_dir)) in referenced:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += stat.st_size
+        logger.info(f"Garbage collection removed {removed} objects ({freed} bytes)")
+        return removed, freed
+
+    def _store_object(self, data: Union[bytes, BinaryIO], sha256: Optional[str]) -> Path:
+        if sha256 is not None and self.object_path(sha256).exists():
+            return self.object_path(sha256)
+        self._ensure_dir(self.objects_dir)
+        tmp_path = self.objects_dir / f".{uuid.uuid4().hex}.tmp"
+        try:
+            digest = self._write_atomic(data, None, tmp_path)
+            object_path = self.object_path(digest)
+            self._ensure_dir(object_path.parent)
+            if object_path.exists():
+                tmp_path.unlink()
+            else:
+                os.replace(tmp_path, object_path)
+                self._synced(object_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return object_path
+
+    def _save_linked(self, data: Union[bytes, BinaryIO], dest_path: Path, sha256: Optional[str]) -> tuple[Path, Path]:
+        """
+        Store the object and point dest_path at it.
+
+        Returns:
+            (path of the saved image, directory entry written for dest_path)
+        """
+        for attempt in range(1, LINK_ATTEMPTS + 1):
+            object_path = self._store_object(data, sha256)
+            try:
+                return self._link(object_path, dest_path)
+            except FileNotFoundError:
+                # The object was garbage collected after it was found, or the directory was removed
+                if attempt == LINK_ATTEMPTS:
+                    raise
+                logger.warning(f"Object {object_path.name} disappeared while linking {dest_path}, storing it again")
+                with self._lock:
+                    self._known_dirs.discard(dest_path.parent)
+                    self._known_dirs.discard(object_path.parent)
+                self._ensure_dir(dest_path.parent)
+
+    def _link(self, object_path: Path, dest_path: Path) -> tuple[Path, Path]:
+        """
+        Point dest_path at the object with a hard link. Where hard links are not possible,
+        write a reference record next to it instead and report the object as the saved image.
+        """
+        tmp_path = dest_path.with_name(f".{dest_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(object_path, tmp_path)
+        except FileNotFoundError:
+            raise
+        except OSError as e:
+            if e.errno not in _NO_HARDLINK_ERRNOS:
+                raise
+            record = dest_path.with_name(dest_path.name + REFERENCE_SUFFIX)
+            self._write_atomic(str(object_path.relative_to(self.base_dir)).encode("utf-8"), record)
+            return object_path, record
+        try:
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return dest_path, dest_path
+
+    def _write_atomic(self, data: Union[bytes, BinaryIO], dest_path: Optional[Path], tmp_path: Optional[Path] = None) -> str:
+        """Write data to tmp_path and rename it to dest_path (if given); returns the content SHA-256."""
+        tmp_path = tmp_path or dest_path.with_name(f".{dest_path.name}.{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        try:
+            with self._open_tmp(tmp_path) as f:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    digest.update(data)
+                    f.write(data)
+                else:
+                    data.seek(0)
+                    for chunk in iter(lambda: data.read(COPY_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        f.write(chunk)
+                if self.fsync != "none":
+                    # The data must be on disk before the rename makes it visible
+                    f.flush()
+                    os.fsync(f.fileno())
+            if dest_path is not None:
+                os.replace(tmp_path, dest_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return digest.hexdigest()
+
+    def _synced(self, path: Path) -> None:
+        """Apply the fsync mode to a file just renamed into place."""
+        if self.fsync == "always":
+            _fsync_dir(path.parent)
+        elif self.fsync == "batch":
+            with self._lock:
+                self._pending.append(path)
+                batch_full = len(self._pending) >= self.fsync_batch_size
+            if batch_full:
+                self.flush()
+
+    def flush(self) -> None:
+        """Fsync the directories of the files renamed since the last flush ("batch" mode)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for directory in {path.parent for path in pending}:
+            _fsync_dir(directory)
+        if pending:
+            logger.debug(f"Flushed the directory entries of {len(pending)} saved files to disk")
+
+    def _open_tmp(self, tmp_path: Path):
+        try:
+            return open(tmp_path, "wb")
+        except FileNotFoundError:
+            # The directory was removed since it was cached
+            with self._lock:
+                self._known_dirs.discard(tmp_path.parent)
+            self._ensure_dir(tmp_path.parent)
+            return open(tmp_path, "wb")
+
+    def _ensure_dir(self, directory: Path) -> None:
+        if directory in self._known_dirs:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._known_dirs.add(directory)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist the directory entries (renames) of a directory; a no-op where unsupported."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+S3_MIN_PART_SIZE = 5 * 1024 * 1024  # S3 rejects smaller parts, except the last one
+
+
+class S3StorageClient:
+    def __init__(
+            self,
+            bucket: str,
+            prefix: str = "",
+            endpoint_url: Optional[str] = None,
+            region: Optional[str] = None,
+            multipart_threshold: int = 8 * 1024 * 1024,
+            multipart_chunk_size: int = 8 * 1024 * 1024,
+            max_concurrency: int = 4,
+            max_pool_connections: int = 16,
+            verify_etag: bool = False,
+            client=None,
+            ):
+        """
+        Storage client for S3 and S3-compatible object stores (MinIO, moto, ...).
+
+        One boto3 client with a connection pool is shared by every thread, so persona runs
+        of a batch upload concurrently. Files larger than multipart_threshold are uploaded
+        in parts, up to max_concurrency at a time. Every request carries a Content-MD5 header,
+        so the store rejects corrupted bodies, and objects are tagged with their SHA-256 in
+        the object metadata.
+        Credentials come from the usual boto3 sources (environment, ~/.aws, instance role).
+
+        Args:
+            bucket: target bucket
+            prefix: key prefix for every object, e.g. "antonia/images"
+            endpoint_url: URL of an S3-compatible store (None for AWS)
+            region: bucket region
+            multipart_threshold: size from which files are uploaded in parts
+            multipart_chunk_size: part size (at least 5 MiB)
+            max_concurrency: parts of one file uploaded at the same time
+            max_pool_connections: HTTP connections kept by the boto3 client
+            verify_etag: also check that returned ETags are the MD5 of the data (not the case
+                with SSE-KMS / SSE-C encryption and some S3-compatible stores)
+            client: ready boto3 S3 client, instead of building one (boto3 is then not imported)
+        """
+        if multipart_chunk_size < S3_MIN_PART_SIZE:
+            raise ValueError(f"multipart_chunk_size must be at least {S3_MIN_PART_SIZE} bytes.")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunk_size = multipart_chunk_size
+        self.max_concurrency = max_concurrency
+        self.verify_etag = verify_etag
+        self.client = client or _build_s3_client(endpoint_url, region, max_pool_connections)
+
+    accepts_digest = True
+
+    def save_file(
+            self,
+            data: Union[bytes, BinaryIO],
+            filename: str,
+            destination: Optional[list[str]] = None,
+            sha256: Optional[str] = None,
+            ) -> str:
+        """
+        Upload a file as an object.
+
+        Args:
+            data: file content, as bytes or as a binary file object read in chunks from its start
+            destination: key path segments between the prefix and the file name
+            sha256: hex digest of the content, if known (computed while reading otherwise)
+
+        Returns:
+            "s3://<bucket>/<key>"
+        """
+        key = "/".join([part for part in [self.prefix, *(destination or [])] if part] + [filename])
+        stream = BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+        stream.seek(0)
+        first = stream.read(self.multipart_threshold + 1)
+        if len(first) <= self.multipart_threshold:
+            self._put(key, first, sha256)
+        else:
+            self._put_multipart(key, first, stream, sha256)
+        url = f"s3://{self.bucket}/{key}"
+        logger.info(f"File saved to {url}")
+        return url
+
+    def _put(self, key: str, body: bytes, sha256: Optional[str]) -> None:
+        md5 = hashlib.md5(body, usedforsecurity=False)
+        response = self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=body,
+            ContentMD5=_b64(md5.digest()),
+            Metadata={"sha256": sha256 or hashlib.sha256(body).hexdigest()},
+            )
+        if self.verify_etag:
+            _check_etag(key, response["ETag"], md5.hexdigest())
+
+    def _put_multipart(self, key: str, first: bytes, stream: BinaryIO, sha256: Optional[str]) -> None:
+        # The SHA-256 metadata must be set when the upload starts: hash the file first if it is unknown
+        if sha256 is None:
+            digest = hashlib.sha256(first)
+            for chunk in iter(lambda: stream.read(self.multipart_chunk_size), b""):
+                digest.update(chunk)
+            sha256 = digest.hexdigest()
+            stream.seek(0)
+            first = b""
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, Metadata={"sha256": sha256})["UploadId"]
+        try:
+            part_md5s = []
+            parts = []
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="s3-part") as executor:
+                pending = []
+                for number, body in enumerate(self._parts(first, stream), start=1):
+                    md5 = hashlib.md5(body, usedforsecurity=False).digest()
+                    part_md5s.append(md5)
+                    pending.append(executor.submit(self._upload_part, key, upload_id, number, body, md5))
+                    if len(pending) >= self.max_concurrency:
+                        # Bound the parts held in memory
+                        parts.append(pending.pop(0).result())
+                parts += [future.result() for future in pending]
+            response = self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+                )
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        if self.verify_etag:
+            expected = f"{hashlib.md5(b''.join(part_md5s), usedforsecurity=False).hexdigest()}-{len(part_md5s)}"
+            _check_etag(key, response["ETag"], expected)
+
+    def _parts(self, first: bytes, stream: BinaryIO):
+        buffer = first
+        while True:
+            while len(buffer) < self.multipart_chunk_size:
+                chunk = stream.read(self.multipart_chunk_size - len(buffer))
+                if not chunk:
+                    break
+                buffer += chunk
+            if not buffer:
+                return
+            yield buffer[:self.multipart_chunk_size]
+            buffer = buffer[self.multipart_chunk_size:]
+
+    def _upload_part(self, key: str, upload_id: str, number: int, body: bytes, md5: bytes) -> dict:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body, ContentMD5=_b64(md5),
+            )
+        if self.verify_etag:
+            _check_etag(f"{key} part {number}", response["ETag"], md5.hex())
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+
+def _build_s3_client(endpoint_url: Optional[str], region: Optional[str], max_pool_connections: int):
+    try:
+        import boto3
+        from botocore.config import Config as BotoConfig
+    except ImportError as e:
+        raise ImportError("S3StorageClient needs boto3: install it with `pip install boto3`.") from e
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        region_name=region,
+        config=BotoConfig(max_pool_connections=max_pool_connections, retries={"mode": "adaptive"}),
+        )
+
+
+def _b64(digest: bytes) -> str:
+    return base64.b64encode(digest).decode("ascii")
+
+
+def _check_etag(what: str, etag: str, expected: str) -> None:
+    if etag.strip('"') != expected:
+        raise IOError(f"Upload of {what} was corrupted: ETag {etag} does not match {expected}.")
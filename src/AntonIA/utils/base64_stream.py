@@ -0,0 +1,70 @@
+"""
+base64_stream.py
+----------------
+Chunked base64 decoding into a file-like object.
+
+Decoding a large base64 payload with `base64.b64decode` builds the whole output in one
+bytes object, which is then usually copied again. Decoding it in chunks into a spooled
+temporary file keeps a single copy (in memory below `max_memory`, on disk above it),
+and the SHA-256 of the output is computed on the way.
+
+Classes:
+    DecodedFile: decoded data as a rewound file, with its size and SHA-256 hex digest.
+Functions:
+    decode_base64_to(encoded, sink, chunk_size): decode into a writable binary file.
+    decode_base64_spooled(encoded, max_memory, chunk_size): decode into a SpooledTemporaryFile.
+"""
+import base64
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+
+B64_CHUNK_SIZE = 1 << 20  # characters per decoded chunk, a multiple of 4
+DEFAULT_SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class DecodedFile:
+    file: BinaryIO
+    size: int
+    sha256: str
+
+
+def decode_base64_to(encoded: str, sink: BinaryIO, chunk_size: int = B64_CHUNK_SIZE) -> tuple[int, str]:
+    """
+    Decode base64 text chunk by chunk into sink.
+    The text must not contain whitespace or line breaks (as in API `b64_json` fields).
+
+    Returns:
+        (number of bytes written, SHA-256 hex digest of the decoded data)
+    Raises:
+        ValueError: if chunk_size is not a multiple of 4 or the text is not valid base64
+    """
+    if chunk_size <= 0 or chunk_size % 4:
+        raise ValueError(f"chunk_size must be a positive multiple of 4, got {chunk_size}.")
+    digest = hashlib.sha256()
+    size = 0
+    for start in range(0, len(encoded), chunk_size):
+        chunk = base64.b64decode(encoded[start:start + chunk_size], validate=True)
+        digest.update(chunk)
+        sink.write(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def decode_base64_spooled(
+        encoded: str,
+        max_memory: int = DEFAULT_SPOOL_MAX_MEMORY,
+        chunk_size: int = B64_CHUNK_SIZE,
+        ) -> DecodedFile:
+    """Decode into a temporary file kept in memory up to max_memory bytes, rewound for reading."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        size, sha256 = decode_base64_to(encoded, spooled, chunk_size)
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return DecodedFile(spooled, size, sha256)
@@ -0,0 +1,259 @@
+"""
+image_handle.py
+---------------
+In-memory image passed from generation to storage, encoded exactly once.
+
+A handle starts from encoded bytes or an encoded file (as returned by the image API)
+or from a decoded array (after post-processing). It decodes lazily, at most once, and encodes at
+most once, at the storage boundary, computing the SHA-256 of the output while it is
+being written. Once encoded, the decoded pixels are released.
+
+Classes:
+    EncodingOptions: output format and encoder settings (PNG, JPEG or WEBP).
+    EncodedImage: encoded bytes, their format and SHA-256 hex digest.
+    ImageHandle: lazily decoded / encoded image.
+Functions:
+    detect_format(data): format of encoded bytes from their signature.
+    as_handle(image, encoding): wrap bytes in a handle (handles are returned as is).
+    encode(image, encoding): EncodedImage of bytes or of a handle.
+"""
+import hashlib
+from dataclasses import dataclass
+from io import BytesIO
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+
+IMAGE_FORMATS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+@dataclass(frozen=True)
+class EncodingOptions:
+    """
+    Args:
+        format: "PNG", "JPEG" or "WEBP"
+        quality: JPEG / WEBP quality (1-100)
+        compress_level: PNG zlib level (0-9, lower is faster and bigger)
+        optimize: extra encoder passes for smaller files (slower)
+        progressive: progressive JPEG
+    """
+    format: str = "PNG"
+    quality: int = 90
+    compress_level: int = 6
+    optimize: bool = False
+    progressive: bool = False
+
+    def __post_init__(self):
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format '{self.format}', expected one of {sorted(IMAGE_FORMATS)}.")
+
+    @property
+    def extension(self) -> str:
+        return IMAGE_FORMATS[self.format]
+
+    def save_options(self) -> dict:
+        """Keyword arguments for PIL.Image.save."""
+        if self.format == "PNG":
+            return {"compress_level": self.compress_level, "optimize": self.optimize}
+        if self.format == "JPEG":
+            return {"quality": self.quality, "optimize": self.optimize, "progressive": self.progressive}
+        return {"quality": self.quality, "method": 6 if self.optimize else 4}
+
+
+DEFAULT_ENCODING = EncodingOptions()
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """`data` is bytes, or a binary file when the image was never loaded in memory as a whole."""
+    data: Union[bytes, BinaryIO]
+    sha256: str
+    format: str = "PNG"
+
+    @property
+    def extension(self) -> str:
+        return IMAGE_FORMATS[self.format]
+
+    def read_bytes(self) -> bytes:
+        if isinstance(self.data, bytes):
+            return self.data
+        self.data.seek(0)
+        content = self.data.read()
+        self.data.seek(0)
+        return content
+
+
+def _file_header(file: BinaryIO, size: int = 12) -> bytes:
+    position = file.tell()
+    header = file.read(size)
+    file.seek(position)
+    return header
+
+
+def detect_format(data: bytes) -> Optional[str]:
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+class _HashingWriter:
+    """File-like sink that hashes the chunks Pillow writes while keeping them."""
+    def __init__(self):
+        self._buffer = BytesIO()
+        self._hash = hashlib.sha256()
+
+    def write(self, chunk) -> int:
+        self._hash.update(chunk)
+        return self._buffer.write(chunk)
+
+    def flush(self) -> None:
+        pass
+
+    def result(self) -> tuple[bytes, str]:
+        return self._buffer.getvalue(), self._hash.hexdigest()
+
+
+class ImageHandle:
+    """
+    Args:
+        data: encoded image bytes (stored as is if never modified and already in the output format)
+        image: decoded image
+        encoding: output format and encoder settings
+        file: encoded image file, an alternative to data that avoids holding the image as bytes
+        sha256: digest of the file content, if already known
+    """
+    def __init__(
+            self,
+            data: Optional[bytes] = None,
+            image: Optional[Image.Image] = None,
+            encoding: EncodingOptions = DEFAULT_ENCODING,
+            file: Optional[BinaryIO] = None,
+            sha256: Optional[str] = None,
+            ):
+        if data is None and image is None and file is None:
+            raise ValueError("ImageHandle needs encoded data, an encoded file or a decoded image.")
+        self.encoding = encoding
+        self._data = data
+        self._image = image
+        self._file = file
+        self._file_sha256 = sha256
+        self._encoded: Optional[EncodedImage] = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes, encoding: EncodingOptions = DEFAULT_ENCODING) -> "ImageHandle":
+        return cls(data=data, encoding=encoding)
+
+    @classmethod
+    def from_file(cls, file: BinaryIO, sha256: Optional[str] = None, encoding: EncodingOptions = DEFAULT_ENCODING) -> "ImageHandle":
+        """Wrap an encoded image file (e.g. a DecodedFile from AntonIA.utils.base64_stream), rewound."""
+        file.seek(0)
+        return cls(file=file, sha256=sha256, encoding=encoding)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, encoding: EncodingOptions = DEFAULT_ENCODING) -> "ImageHandle":
+        """Build from an RGB array; float arrays are rounded and clipped to 0-255."""
+        if array.dtype != np.uint8:
+            array = np.clip(np.rint(array), 0, 255).astype(np.uint8)
+        return cls(image=Image.fromarray(array), encoding=encoding)
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._image is not None
+
+    def image(self) -> Image.Image:
+        """Decoded RGB image, decoded on first access."""
+        if self._image is None:
+            if self._file is not None:
+                self._file.seek(0)
+                source = self._file
+            else:
+                data = self._data if self._data is not None else self._encoded.data
+                source = BytesIO(data) if isinstance(data, bytes) else data
+                source.seek(0)
+            with Image.open(source) as image:
+                self._image = image.convert("RGB")
+        return self._image
+
+    def array(self) -> np.ndarray:
+        """Pixels as a float32 HxWx3 array with values in 0-255."""
+        return np.asarray(self.image(), dtype=np.float32)
+
+    def encode(self, encoding: Optional[EncodingOptions] = None) -> EncodedImage:
+        """
+        Encoded bytes and their hash, computed once (per encoding), releasing the decoded pixels.
+        `encoding` overrides the handle's own options, e.g. the storage step's settings.
+        """
+        if encoding is not None and encoding != self.encoding:
+            if self._encoded is not None and self._image is None and self._data is None and self._file is None:
+                # re-encode from the previous encoding
+                if isinstance(self._encoded.data, bytes):
+                    self._data = self._encoded.data
+                else:
+                    self._file = self._encoded.data
+            self.encoding = encoding
+            self._encoded = None
+
+        if self._encoded is None:
+            if self._file is not None and detect_format(_file_header(self._file)) == self.encoding.format:
+                self._file.seek(0)
+                sha256 = self._file_sha256 or _hash_file(self._file)
+                self._encoded = EncodedImage(self._file, sha256, self.encoding.format)
+            elif self._data is not None and detect_format(self._data) == self.encoding.format:
+                self._encoded = EncodedImage(self._data, hashlib.sha256(self._data).hexdigest(), self.encoding.format)
+            else:
+                writer = _HashingWriter()
+                self.image().save(writer, format=self.encoding.format, **self.encoding.save_options())
+                self._encoded = EncodedImage(*writer.result(), self.encoding.format)
+            self._data = None
+            self._image = None
+            self._file = None
+        return self._encoded
+
+    def to_bytes(self) -> bytes:
+        return self.encode().read_bytes()
+
+    def __getstate__(self):
+        # Checkpoints pickle the encoded form; the encoding is kept for the storage step
+        encoded = self.encode()
+        if not isinstance(encoded.data, bytes):
+            encoded = EncodedImage(encoded.read_bytes(), encoded.sha256, encoded.format)
+        return {"encoding": self.encoding, "encoded": encoded}
+
+    def __setstate__(self, state):
+        self.encoding = state["encoding"]
+        self._encoded = state["encoded"]
+        self._data = None
+        self._image = None
+        self._file = None
+        self._file_sha256 = None
+
+
+def _hash_file(file: BinaryIO, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+ImageData = Union[bytes, ImageHandle]
+
+
+def as_handle(image: ImageData, encoding: EncodingOptions = DEFAULT_ENCODING) -> ImageHandle:
+    return image if isinstance(image, ImageHandle) else ImageHandle.from_bytes(image, encoding)
+
+
+def encode(image: ImageData, encoding: Optional[EncodingOptions] = None) -> EncodedImage:
+    """Encoded form of bytes or of a handle; bytes are kept as is when no encoding is requested."""
+    if isinstance(image, ImageHandle):
+        return image.encode(encoding)
+    if encoding is None:
+        return EncodedImage(image, hashlib.sha256(image).hexdigest(), detect_format(image) or "PNG")
+    return ImageHandle.from_bytes(image, encoding).encode()
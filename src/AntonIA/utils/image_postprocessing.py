@@ -0,0 +1,198 @@
+"""
+image_postprocessing.py
+-----------------------
+Composable post-processing of generated images on a single decoded NumPy array.
+
+The image is decoded once into a float32 RGB array (0-255) and every operation transforms
+that array: adding steps does not add PNG decode/encode round trips. The result is an
+ImageHandle, encoded only when it is stored.
+
+Classes:
+    PostProcessChain: ordered list of operations, callable as a postprocess_fn returning an ImageHandle.
+Functions:
+    resize(width, aspect_ratio): centre crop to an aspect ratio (e.g. "4:5") and resize.
+    color_grade(brightness, contrast, saturation, warmth): vectorized colour grading.
+    sharpen(amount): unsharp mask with a 3x3 box blur.
+    text_overlay(text, font_path, size_ratio): write text on a translucent band at the bottom.
+    watermark(watermark_path, opacity, scale): blend the watermark in the bottom-right corner.
+    parse_aspect_ratio(value): "4:5" -> 0.8 (width / height).
+"""
+import textwrap
+from logging import getLogger
+from typing import Callable, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .image_handle import DEFAULT_ENCODING, EncodingOptions, ImageData, ImageHandle, as_handle
+from .image_utils import WatermarkOverlayCache, _overlay_cache
+
+
+logger = getLogger("AntonIA.image_postprocessing")
+
+ImageOp = Callable[[np.ndarray], np.ndarray]
+
+WATERMARK_MARGIN = 10
+# Rec. 601 luma weights, used by the saturation adjustment
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+class PostProcessChain:
+    """
+    Runs the operations in order on one decoded image.
+
+    Args:
+        ops: functions taking and returning a float32 HxWx3 array with values in 0-255
+        encoding: settings the resulting handle is encoded with when stored
+    """
+    def __init__(self, ops: list[ImageOp], encoding: EncodingOptions = DEFAULT_ENCODING):
+        self.ops = list(ops)
+        self.encoding = encoding
+
+    def __call__(self, image: ImageData) -> ImageHandle:
+        array = as_handle(image).array()
+        for op in self.ops:
+            array = op(array)
+        return ImageHandle.from_array(array, self.encoding)
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+
+def _to_uint8(array: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(array), 0, 255).astype(np.uint8)
+
+
+def _blend(array: np.ndarray, layer: np.ndarray, top: int, left: int) -> np.ndarray:
+    """Alpha blend an RGBA float layer (0-255) onto the array, clipped to its bounds."""
+    height, width = layer.shape[:2]
+    top, left = max(top, 0), max(left, 0)
+    height, width = min(height, array.shape[0] - top), min(width, array.shape[1] - left)
+    if height <= 0 or width <= 0:
+        return array
+    region = array[top:top + height, left:left + width]
+    alpha = layer[:height, :width, 3:4] / 255.0
+    region *= 1.0 - alpha
+    region += layer[:height, :width, :3] * alpha
+    return array
+
+
+def parse_aspect_ratio(value: str) -> float:
+    """Parse "W:H" into the width / height ratio; raises ValueError if malformed."""
+    try:
+        width, height = (float(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"Aspect ratio must look like 'W:H', got '{value}'.") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Aspect ratio must be positive, got '{value}'.")
+    return width / height
+
+
+def resize(width: Optional[int] = None, aspect_ratio: Optional[str] = None) -> ImageOp:
+    """Centre crop to aspect_ratio (if set), then resize to width keeping the aspect ratio (if set)."""
+    ratio = parse_aspect_ratio(aspect_ratio) if aspect_ratio else None
+
+    def op(array: np.ndarray) -> np.ndarray:
+        height, current_width = array.shape[:2]
+        if ratio is not None:
+            if current_width / height > ratio:
+                crop_width = round(height * ratio)
+                left = (current_width - crop_width) // 2
+                array = array[:, left:left + crop_width]
+            else:
+                crop_height = round(current_width / ratio)
+                top = (height - crop_height) // 2
+                array = array[top:top + crop_height]
+        if width is None or width == array.shape[1]:
+            return np.ascontiguousarray(array)
+        size = (width, max(1, round(width * array.shape[0] / array.shape[1])))
+        resized = Image.fromarray(_to_uint8(array)).resize(size, Image.Resampling.LANCZOS)
+        return np.asarray(resized, dtype=np.float32)
+    return op
+
+
+def color_grade(brightness: float = 0.0, contrast: float = 1.0, saturation: float = 1.0, warmth: float = 0.0) -> ImageOp:
+    """
+    Args:
+        brightness: offset added to every channel, in 0-255 units
+        contrast: factor applied around mid grey (1.0 keeps the image)
+        saturation: factor applied to the distance from the luma (0.0 is greyscale)
+        warmth: offset added to red and removed from blue, in 0-255 units
+    """
+    def op(array: np.ndarray) -> np.ndarray:
+        if saturation != 1.0:
+            luma = (array @ LUMA_WEIGHTS)[..., None]
+            array = luma + (array - luma) * saturation
+        if contrast != 1.0:
+            array = (array - 127.5) * contrast + 127.5
+        if brightness:
+            array = array + brightness
+        if warmth:
+            array = array + np.array([warmth, 0.0, -warmth], dtype=np.float32)
+        return array
+    return op
+
+
+def sharpen(amount: float = 0.5) -> ImageOp:
+    """Unsharp mask: add `amount` times the difference with a 3x3 box blur."""
+    def op(array: np.ndarray) -> np.ndarray:
+        padded = np.pad(array, ((1, 1), (1, 1), (0, 0)), mode="edge")
+        height, width = array.shape[:2]
+        blurred = sum(
+            padded[dy:dy + height, dx:dx + width] for dy in range(3) for dx in range(3)
+        ) / 9.0
+        return array + amount * (array - blurred)
+    return op
+
+
+def _load_font(font_path: Optional[str], size: int):
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError:
+            logger.warning(f"Could not load font '{font_path}', using the default font")
+    return ImageFont.load_default(size=size)
+
+
+def text_overlay(text: str, font_path: Optional[str] = None, size_ratio: float = 0.05) -> ImageOp:
+    """
+    Write text centred on a translucent dark band at the bottom of the image.
+    Only the band is rendered with Pillow; it is then blended into the array.
+
+    Args:
+        size_ratio: font size as a fraction of the image width
+    """
+    def op(array: np.ndarray) -> np.ndarray:
+        height, width = array.shape[:2]
+        font = _load_font(font_path, max(8, int(width * size_ratio)))
+        measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+        char_width = max(1, measure.textlength("x", font=font))
+        lines = textwrap.wrap(text, width=max(1, int(width * 0.9 / char_width))) or [""]
+        line_height = int(font.size * 1.25)
+        band_height = line_height * len(lines) + 2 * WATERMARK_MARGIN
+
+        band = Image.new("RGBA", (width, band_height), (0, 0, 0, 110))
+        draw = ImageDraw.Draw(band)
+        for i, line in enumerate(lines):
+            x = (width - draw.textlength(line, font=font)) / 2
+            draw.text((x, WATERMARK_MARGIN + i * line_height), line, font=font, fill=(255, 255, 255, 255))
+        return _blend(array, np.asarray(band, dtype=np.float32), height - band_height, 0)
+    return op
+
+
+def watermark(
+        watermark_path: str,
+        opacity: float = 0.8,
+        scale: float = 0.2,
+        overlay_cache: Optional[WatermarkOverlayCache] = None,
+        ) -> ImageOp:
+    """Blend the watermark in the bottom-right corner; the prepared overlay comes from the overlay cache."""
+    cache = overlay_cache or _overlay_cache
+
+    def op(array: np.ndarray) -> np.ndarray:
+        height, width = array.shape[:2]
+        overlay = np.asarray(cache.overlay(watermark_path, width, opacity, scale), dtype=np.float32)
+        top = height - overlay.shape[0] - WATERMARK_MARGIN
+        left = width - overlay.shape[1] - WATERMARK_MARGIN
+        return _blend(array, overlay, top, left)
+    return op
@@ -0,0 +1,118 @@
+"""
+image_scoring.py
+----------------
+Local, no-API heuristics to rank generated image candidates.
+
+Every metric takes a PIL image and returns a float where higher is better. Images are
+downscaled before scoring: the heuristics only need the overall structure, and it keeps
+scoring a few 1024px candidates in the tens of milliseconds.
+
+Functions:
+    sharpness(image): variance of the Laplacian of the luminance (blurry images score low).
+    colorfulness(image): Hasler & Süsstrunk colourfulness metric.
+    text_contrast(image): share of strong edges in the busiest horizontal band, a proxy
+        for a legible phrase written on the image.
+    weighted_scorer(weights): scorer combining the metrics above.
+    score_images(images, scorer): decode and score image bytes concurrently.
+    map_candidates(fn, items): apply fn to every candidate on the thread pool used for scoring.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Optional
+
+import numpy as np
+from PIL import Image
+
+
+ImageScorer = Callable[[Image.Image], float]
+
+SCORING_SIZE = 256
+TEXT_BANDS = 8
+EDGE_THRESHOLD = 48.0  # luminance gradient considered a strong edge (0-255 scale)
+CANDIDATE_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _luminance(image: Image.Image) -> np.ndarray:
+    return np.asarray(image.convert("L"), dtype=np.float32)
+
+
+def sharpness(image: Image.Image) -> float:
+    gray = _luminance(image)
+    laplacian = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4 * gray[1:-1, 1:-1]
+    )
+    return float(np.log1p(laplacian.var()))
+
+
+def colorfulness(image: Image.Image) -> float:
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    rg = r - g
+    yb = 0.5 * (r + g) - b
+    return float(np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean())) / 100.0
+
+
+def text_contrast(image: Image.Image) -> float:
+    gray = _luminance(image)
+    strong_edges = np.abs(np.diff(gray, axis=1)) > EDGE_THRESHOLD
+    bands = np.array_split(strong_edges, TEXT_BANDS, axis=0)
+    return float(max(band.mean() for band in bands)) * 10.0
+
+
+METRICS: dict[str, ImageScorer] = {
+    "sharpness": sharpness,
+    "colorfulness": colorfulness,
+    "text_contrast": text_contrast,
+}
+
+DEFAULT_WEIGHTS = {"sharpness": 1.0, "colorfulness": 1.0, "text_contrast": 1.0}
+
+
+def weighted_scorer(weights: Optional[dict[str, float]] = None) -> ImageScorer:
+    """Return a scorer summing the weighted metrics; raises ValueError for unknown metric names."""
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown image metrics {sorted(unknown)}, expected some of {sorted(METRICS)}.")
+
+    def score(image: Image.Image) -> float:
+        return sum(weight * METRICS[name](image) for name, weight in weights.items() if weight)
+    return score
+
+
+def _decode_and_score(image_bytes: bytes, scorer: ImageScorer) -> float:
+    image = Image.open(BytesIO(image_bytes))
+    image.draft("RGB", (SCORING_SIZE, SCORING_SIZE))  # JPEG only: decode at reduced size
+    image = image.convert("RGB")
+    image.thumbnail((SCORING_SIZE, SCORING_SIZE))
+    return scorer(image)
+
+
+def _candidate_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CANDIDATE_WORKERS, thread_name_prefix="candidate")
+        return _executor
+
+
+def map_candidates(fn: Callable[[Any], Any], items: list) -> list:
+    """
+    Apply fn to every item in parallel, keeping their order.
+
+    Candidate decoding and scoring share one thread pool, created on first use, so
+    the threads are not respawned for every run. A single item is processed inline.
+    """
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    return list(_candidate_executor().map(fn, items))
+
+
+def score_images(images: list[bytes], scorer: Optional[ImageScorer] = None) -> list[float]:
+    """Score every image, decoding and scoring them in parallel (Pillow and NumPy release the GIL)."""
+    scorer = scorer or weighted_scorer()
+    return map_candidates(lambda data: _decode_and_score(data, scorer), images)
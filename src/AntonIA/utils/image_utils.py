@@ -1,11 +1,93 @@
 from PIL import Image, UnidentifiedImageError
+from collections import OrderedDict
 from typing import Callable, Optional
 from io import BytesIO
 import os
+import threading
 
+from .image_handle import DEFAULT_ENCODING, EncodingOptions
 
 
-def add_watermark(image_bytes: bytes, watermark_path: str, opacity: float = 0.8, scale: float = 0.2) -> bytes:
+class WatermarkOverlayCache:
+    """
+    In-memory cache of prepared watermark overlays (RGBA, resized, alpha scaled).
+
+    Overlays are keyed by (path, mtime, target width, opacity, scale), so editing the
+    watermark file invalidates them; the decoded source images are cached by (path, mtime).
+    Thread safe: personas of a batch watermark their images concurrently.
+    """
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._sources: dict[tuple, Image.Image] = {}
+        self._overlays: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def source(self, watermark_path: str) -> Image.Image:
+        """Decoded RGBA watermark; raises OSError / UnidentifiedImageError if it cannot be read."""
+        key = (os.path.abspath(watermark_path), os.stat(watermark_path).st_mtime_ns)
+        with self._lock:
+            image = self._sources.get(key)
+        if image is None:
+            with Image.open(watermark_path) as img:
+                image = img.convert("RGBA")
+            with self._lock:
+                # Drop the versions of this file that were replaced on disk
+                for stale in [k for k in self._sources if k[0] == key[0]]:
+                    del self._sources[stale]
+                self._sources[key] = image
+        return image
+
+    def overlay(self, watermark_path: str, base_width: int, opacity: float, scale: float) -> Image.Image:
+        """Watermark ready to be composited on an image of the given width."""
+        key = (os.path.abspath(watermark_path), os.stat(watermark_path).st_mtime_ns, base_width, opacity, scale)
+        with self._lock:
+            overlay = self._overlays.get(key)
+            if overlay is not None:
+                self._overlays.move_to_end(key)
+                self.hits += 1
+                return overlay
+            self.misses += 1
+
+        overlay = _prepare_overlay(self.source(watermark_path), base_width, opacity, scale)
+        with self._lock:
+            self._overlays[key] = overlay
+            while len(self._overlays) > self.max_entries:
+                self._overlays.popitem(last=False)
+        return overlay
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sources.clear()
+            self._overlays.clear()
+
+
+_overlay_cache = WatermarkOverlayCache()
+
+
+def _prepare_overlay(watermark: Image.Image, base_width: int, opacity: float, scale: float) -> Image.Image:
+    # Resize watermark relative to image size
+    w_scale = int(base_width * scale)
+    w_ratio = w_scale / watermark.width
+    new_size = (w_scale, int(watermark.height * w_ratio))
+    watermark = watermark.resize(new_size, Image.Resampling.LANCZOS)
+
+    # Adjust transparency with a lookup table
+    if opacity < 1:
+        alpha = watermark.getchannel("A").point([int(p * opacity) for p in range(256)])
+        watermark.putalpha(alpha)
+    return watermark
+
+
+def add_watermark(
+        image_bytes: bytes,
+        watermark_path: str,
+        opacity: float = 0.8,
+        scale: float = 0.2,
+        overlay_cache: Optional[WatermarkOverlayCache] = None,
+        encoding: Optional[EncodingOptions] = None,
+        ) -> bytes:
     """
     Adds a watermark to the bottom-right corner of an image.
 
@@ -14,26 +96,16 @@ def add_watermark(image_bytes: bytes, watermark_path: str, opacity: float = 0.8,
         watermark_path: path to the watermark image
         opacity: transparency of the watermark (0.0–1.0)
         scale: fraction of image width for watermark size (0.2 = 20%)
+        overlay_cache: cache of prepared overlays (defaults to the module wide one)
+        encoding: output format and encoder settings (PNG with default settings if None)
 
     Returns:
-        New image as bytes (PNG)
+        New image as bytes
     """
 
-    # Open base image and watermark
+    # Open base image and get the prepared watermark
     base = Image.open(BytesIO(image_bytes)).convert("RGBA")
-    watermark = Image.open(watermark_path).convert("RGBA")
-
-    # Resize watermark relative to image size
-    w_scale = int(base.width * scale)
-    w_ratio = w_scale / watermark.width
-    new_size = (w_scale, int(watermark.height * w_ratio))
-    watermark = watermark.resize(new_size, Image.Resampling.LANCZOS)
-
-    # Adjust transparency
-    if opacity < 1:
-        alpha = watermark.split()[3]
-        alpha = alpha.point(lambda p: int(p * opacity))
-        watermark.putalpha(alpha)
+    watermark = (overlay_cache or _overlay_cache).overlay(watermark_path, base.width, opacity, scale)
 
     # Paste watermark bottom-right
     position = (base.width - watermark.width - 10, base.height - watermark.height - 10)
@@ -41,9 +113,24 @@ def add_watermark(image_bytes: bytes, watermark_path: str, opacity: float = 0.8,
 
     # Export final image
     output = BytesIO()
-    base.convert("RGB").save(output, format="PNG")
+    encoding = encoding or DEFAULT_ENCODING
+    base.convert("RGB").save(output, format=encoding.format, **encoding.save_options())
     return output.getvalue()
 
+def is_valid_watermark(watermark_path: Optional[str]) -> bool:
+    """True if the watermark file exists and is a readable image."""
+    # Check if file exists
+    if not watermark_path or not os.path.exists(watermark_path):
+        return False
+
+    # Check if it's a valid image (decoded once and kept in the overlay cache)
+    try:
+        _overlay_cache.source(watermark_path)
+    except (UnidentifiedImageError, OSError):
+        return False
+    return True
+
+
 def add_watermark_fn_factory(
     watermark_path: str, opacity: float = 0.8, scale: float = 0.2
 ) -> Optional[Callable[[bytes], bytes]]:
@@ -59,15 +146,7 @@ def add_watermark_fn_factory(
         A function that takes image_bytes and returns watermarked bytes,
         or None if the watermark is missing/invalid.
     """
-    # Check if file exists
-    if not watermark_path or not os.path.exists(watermark_path):
-        return None
-
-    # Check if it's a valid image
-    try:
-        with Image.open(watermark_path) as img:
-            img.verify()  # Verify it’s an image file
-    except (UnidentifiedImageError, OSError):
+    if not is_valid_watermark(watermark_path):
         return None
 
     # If all checks pass, return the watermarking function
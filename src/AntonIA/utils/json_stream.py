@@ -0,0 +1,108 @@
+"""
+json_stream.py
+--------------
+Incremental parsing of a JSON object received in chunks, e.g. from a streamed LLM response.
+
+Classes:
+    IncrementalJSONObjectParser: reports the top-level string fields of an object as soon as
+        each one is complete, before the object itself is.
+Functions:
+    extract_json_object(text): first JSON object found in text surrounded by prose or code fences.
+"""
+import json
+from typing import Any
+
+
+class IncrementalJSONObjectParser:
+    """
+    Feed it chunks of text with `feed`; it returns the top-level string fields that
+    were completed by that chunk. Text before the opening brace (e.g. a markdown code
+    fence) is ignored, and so are nested values and non-string fields, which only the
+    final `json.loads` of the whole text sees.
+    """
+    def __init__(self):
+        self.fields: dict[str, Any] = {}
+        self._buffer = ""
+        self._depth = 0
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._expecting_key = False
+        self._key = None
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, chunk: str) -> dict[str, Any]:
+        """Consume a chunk and return the fields it completed."""
+        offset = len(self._buffer)
+        self._buffer += chunk
+        completed = {}
+        if self._done:
+            return completed
+
+        for i, char in enumerate(chunk, start=offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._on_top_level_string(self._buffer[self._string_start:i + 1], completed)
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = self._depth == 1 and self._expecting_key
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._expecting_key = True
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._done = True
+                    break
+            elif self._depth == 1 and char == ",":
+                self._expecting_key = True
+                self._key = None
+            elif self._depth == 1 and char == ":":
+                self._expecting_key = False
+        return completed
+
+    def _on_top_level_string(self, raw: str, completed: dict[str, Any]) -> None:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        if self._string_is_key:
+            self._key = value
+        elif self._key is not None:
+            self.fields[self._key] = completed[self._key] = value
+            self._key = None
+
+
+def extract_json_object(text: str) -> dict:
+    """
+    Return the first JSON object embedded in text, tolerating markdown code fences,
+    prose before or after it and trailing garbage.
+
+    Raises:
+        ValueError: if text contains no decodable JSON object
+    """
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
+        if isinstance(value, dict):
+            return value
+        start = text.find("{", start + 1)
+    raise ValueError("No JSON object found in text.")
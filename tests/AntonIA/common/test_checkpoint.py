@@ -0,0 +1,32 @@
+import pytest
+from AntonIA.common.checkpoint import RunCheckpoint, CheckpointError
+
+def test_create_and_resume_round_trip(tmp_path):
+    checkpoint = RunCheckpoint.create(str(tmp_path), "nonna")
+    assert checkpoint.run_id.startswith("nonna_")
+    checkpoint.save_stage("generate_prompt", {"prompt": "p", "details": {"phrase": "Ciao"}})
+    checkpoint.save_stage("generate_image", {"image_bytes": b"\x89PNG"})
+
+    resumed = RunCheckpoint.resume(str(tmp_path), checkpoint.run_id, "nonna")
+    assert resumed.completed_stages() == {
+        "generate_image": {"image_bytes": b"\x89PNG"},
+        "generate_prompt": {"prompt": "p", "details": {"phrase": "Ciao"}},
+    }
+
+def test_new_checkpoint_has_no_completed_stages(tmp_path):
+    assert RunCheckpoint.create(str(tmp_path), "nonna").completed_stages() == {}
+
+def test_resume_unknown_run_raises(tmp_path):
+    with pytest.raises(CheckpointError):
+        RunCheckpoint.resume(str(tmp_path), "missing_run")
+
+def test_resume_other_persona_raises(tmp_path):
+    checkpoint = RunCheckpoint.create(str(tmp_path), "nonna")
+    with pytest.raises(CheckpointError):
+        RunCheckpoint.resume(str(tmp_path), checkpoint.run_id, "abuela")
+
+def test_clear_removes_run_directory(tmp_path):
+    checkpoint = RunCheckpoint.create(str(tmp_path), "nonna")
+    checkpoint.save_stage("stage", {"x": 1})
+    checkpoint.clear()
+    assert not checkpoint.directory.exists()
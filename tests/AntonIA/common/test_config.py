@@ -141,6 +141,42 @@ def test_missing_grandma_name_raises(config_dir):
     with pytest.raises(config.ConfigError):
         config.load_config(config_dir=config_dir)
 
+def test_database_backend_defaults_and_validation(config_dir, monkeypatch):
+    monkeypatch.setenv(config.ENV_OPENAI_API_KEY, "env-api-key")
+    assert config.load_config(config_dir=config_dir).database.backend == "parquet"
+
+    base_path = Path(config_dir) / "base.yaml"
+    base_yaml = yaml.safe_load(base_path.read_text())
+    base_yaml["database"]["backend"] = "mongodb"
+    with open(base_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(base_yaml, f)
+    with pytest.raises(config.ConfigError):
+        config.load_config(config_dir=config_dir)
+
+    base_yaml["database"]["backend"] = "parquet"
+    base_yaml["database"]["storage_mode"] = "datasets"
+    with open(base_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(base_yaml, f)
+    with pytest.raises(config.ConfigError, match="storage mode"):
+        config.load_config(config_dir=config_dir)
+
+def test_image_scoring_weights_validation(config_dir, monkeypatch):
+    monkeypatch.setenv(config.ENV_OPENAI_API_KEY, "env-api-key")
+    base_path = Path(config_dir) / "base.yaml"
+    base_yaml = yaml.safe_load(base_path.read_text())
+
+    base_yaml["image"]["scoring_weights"] = {"sharpness": 2, "colorfulness": 0.5}
+    with open(base_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(base_yaml, f)
+    assert config.load_config(config_dir=config_dir).image.scoring_weights == {"sharpness": 2, "colorfulness": 0.5}
+
+    for weights in ({"sharpnes": 1.0}, {"sharpness": "high"}, ["sharpness"]):
+        base_yaml["image"]["scoring_weights"] = weights
+        with open(base_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(base_yaml, f)
+        with pytest.raises(config.ConfigError, match="scoring_weights"):
+            config.load_config(config_dir=config_dir)
+
 def test_list_personas(config_dir):
     personas = config.list_personas(config_dir=config_dir)
     assert set(personas) == {"default", "nonna"}
@@ -0,0 +1,99 @@
+import threading
+import pytest
+from AntonIA.common.stage_graph import StageGraph, StageGraphError, StageFailedError
+
+def test_run_passes_outputs_to_dependent_stages():
+    graph = StageGraph()
+    graph.add("double", lambda x: x * 2, inputs=("x",), outputs=("doubled",))
+    graph.add("split", lambda doubled: (doubled - 1, doubled + 1), inputs=("doubled",), outputs=("low", "high"))
+
+    result = graph.run({"x": 5})
+    assert result.values["doubled"] == 10
+    assert (result.values["low"], result.values["high"]) == (9, 11)
+    assert set(result.timings) == {"double", "split"}
+    assert result.skipped == []
+
+def test_independent_stages_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=5)
+    graph = StageGraph()
+    graph.add("source", lambda: 1, outputs=("value",))
+    graph.add("left", lambda value: barrier.wait() is not None, inputs=("value",), outputs=("left",))
+    graph.add("right", lambda value: barrier.wait() is not None, inputs=("value",), outputs=("right",))
+
+    # Each branch waits for the other at the barrier: only passes if they run concurrently
+    result = graph.run(max_workers=2)
+    assert result.values["left"] and result.values["right"]
+
+def test_completed_stages_are_skipped():
+    calls = []
+    graph = StageGraph()
+    graph.add("first", lambda: calls.append("first") or 1, outputs=("a",))
+    graph.add("second", lambda a: calls.append("second") or a + 1, inputs=("a",), outputs=("b",))
+
+    result = graph.run(completed={"first": {"a": 41}})
+    assert calls == ["second"]
+    assert result.values["b"] == 42
+    assert result.skipped == ["first"]
+    assert "first" not in result.timings
+
+def test_on_stage_complete_receives_outputs():
+    seen = {}
+    graph = StageGraph().add("answer", lambda: 42, outputs=("answer",)).add("sink", lambda answer: None, inputs=("answer",))
+    graph.run(on_stage_complete=lambda name, outputs: seen.update({name: outputs}))
+    assert seen == {"answer": {"answer": 42}, "sink": {}}
+
+def test_failing_stage_raises_with_stage_name():
+    graph = StageGraph()
+    graph.add("boom", lambda: 1 / 0, outputs=("x",))
+    graph.add("after", lambda x: x, inputs=("x",), outputs=("y",))
+    with pytest.raises(StageFailedError) as excinfo:
+        graph.run()
+    assert excinfo.value.stage == "boom"
+    assert isinstance(excinfo.value.__cause__, ZeroDivisionError)
+
+def test_missing_input_raises():
+    graph = StageGraph().add("needs", lambda missing: None, inputs=("missing",))
+    with pytest.raises(StageGraphError, match="not produced"):
+        graph.run()
+
+def test_cycle_raises():
+    graph = StageGraph()
+    graph.add("a", lambda b: b, inputs=("b",), outputs=("a",))
+    graph.add("b", lambda a: a, inputs=("a",), outputs=("b",))
+    with pytest.raises(StageGraphError, match="cycle"):
+        graph.run()
+
+def test_duplicated_stage_or_output_raises():
+    graph = StageGraph().add("a", lambda: 1, outputs=("x",))
+    with pytest.raises(StageGraphError):
+        graph.add("a", lambda: 1)
+    with pytest.raises(StageGraphError):
+        graph.add("b", lambda: 1, outputs=("x",))
+
+
+def test_early_outputs_start_dependent_stages_before_the_producer_finishes():
+    consumer_done = threading.Event()
+
+    def producer(emit):
+        emit("early", 1)
+        # Only returns once the consumer, which needs "early", has run
+        assert consumer_done.wait(timeout=5)
+        return 1, 2
+
+    def consumer(early):
+        consumer_done.set()
+        return early + 10
+
+    graph = (
+        StageGraph()
+        .add("producer", producer, outputs=("early", "late"), early_outputs=("early",))
+        .add("consumer", consumer, inputs=("early",), outputs=("result",))
+    )
+    result = graph.run()
+
+    assert result.values["result"] == 11
+    assert result.values["late"] == 2
+
+def test_early_outputs_must_be_declared_outputs():
+    with pytest.raises(StageGraphError):
+        StageGraph().add("a", lambda emit: 1, outputs=("x",), early_outputs=("y",))
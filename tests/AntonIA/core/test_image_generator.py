@@ -1,6 +1,7 @@
+import asyncio
 import pytest
 from unittest.mock import Mock
-from AntonIA.core.image_generator import generate
+from AntonIA.core.image_generator import generate, agenerate
 
 class DummyClient:
     def generate_image(self, prompt, size):
@@ -26,4 +27,35 @@ def test_generate_with_custom_size():
     prompt = "A sunset"
     size = "512x512"
     result = generate(client, prompt, size=size)
-    assert result == b"fake_image_bytes"
\ No newline at end of file
+    assert result == b"fake_image_bytes"
+
+class DummyAsyncClient:
+    async def generate_image(self, prompt, size):
+        return b"fake_image_bytes"
+
+def test_agenerate_calls_postprocess_fn():
+    postprocess_fn = Mock(return_value=b"processed_bytes")
+    result = asyncio.run(agenerate(DummyAsyncClient(), "A dog in space", postprocess_fn=postprocess_fn))
+    postprocess_fn.assert_called_once_with(b"fake_image_bytes")
+    assert result == b"processed_bytes"
+
+
+def test_generate_best_keeps_highest_scored_candidate_and_archives_the_rest(monkeypatch):
+    from AntonIA.core import image_generator
+
+    class CandidatesClient:
+        def generate_images(self, prompt, size, n):
+            return [b"low", b"high", b"mid"][:n]
+
+    scores = {b"low": 0.1, b"high": 0.9, b"mid": 0.5}
+    monkeypatch.setattr(image_generator, "score_images", lambda images, scorer=None: [scores[i] for i in images])
+    archived = []
+
+    result = image_generator.generate_best(
+        CandidatesClient(), "prompt", n=3,
+        postprocess_fn=lambda image: image + b"+watermark",
+        archive_fn=archived.extend,
+    )
+
+    assert result == b"high+watermark"
+    assert archived == [b"mid", b"low"]
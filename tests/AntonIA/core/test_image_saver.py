@@ -1,6 +1,11 @@
+import hashlib
+from datetime import datetime
+
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 from AntonIA.core import image_saver
+from AntonIA.utils.image_handle import ImageHandle
 
 class DummyStorageClient:
     def __init__(self):
@@ -36,4 +41,44 @@ def test_save_filename_changes_with_add_date():
     storage_client = DummyStorageClient()
     path_with_date = image_saver.save(data, storage_client, add_date=True)
     path_without_date = image_saver.save(data, storage_client, add_date=False)
-    assert path_with_date != path_without_date
\ No newline at end of file
+    assert path_with_date != path_without_date
+
+def test_save_encodes_image_handles_once_and_names_them_by_hash():
+    handle = ImageHandle.from_array(np.zeros((4, 4, 3), dtype=np.uint8))
+    storage_client = DummyStorageClient()
+    path = image_saver.save(handle, storage_client, add_date=False)
+
+    data = storage_client.saved[path.split("/")[-1]]
+    assert data.startswith(b"\x89PNG")
+    assert path.endswith(hashlib.sha256(data).hexdigest()[:8] + ".png")
+    assert handle.encode().data is data
+
+def test_save_shards_destination():
+    class RecordingStorageClient:
+        def save_file(self, data, filename, destination=None):
+            return "/".join((destination or []) + [filename])
+
+    digest = "ab12" + "0" * 60
+    assert image_saver.shard_destination("hash", digest) == ["ab", "12"]
+    assert image_saver.shard_destination("persona_date", digest, "Maria", datetime(2025, 3, 7)) == ["Maria", "2025", "03", "07"]
+    with pytest.raises(ValueError):
+        image_saver.shard_destination("weekly", digest)
+
+    path = image_saver.save(b"image bytes", RecordingStorageClient(), destination=["candidates"], sharding="date")
+    assert path.split("/")[:2] == ["candidates", str(datetime.now().year)]
+
+def test_migrate_flat_directory_moves_files_by_name_date_and_owner(tmp_path):
+    (tmp_path / "20240102_080000_abcdef12.png").write_bytes(b"a")
+    (tmp_path / "20240103_080000_12345678.jpg").write_bytes(b"b")
+    (tmp_path / ".tmpfile.tmp").write_bytes(b"partial")
+    (tmp_path / "2024").mkdir()
+
+    moves = image_saver.migrate_flat_directory(str(tmp_path), "persona_date", persona="unassigned", dry_run=True,
+                                               owners={"20240102_080000_abcdef12.png": "Maria"})
+    assert len(moves) == 2 and (tmp_path / "20240102_080000_abcdef12.png").exists()
+
+    image_saver.migrate_flat_directory(str(tmp_path), "persona_date", persona="unassigned",
+                                       owners={"20240102_080000_abcdef12.png": "Maria"})
+    assert (tmp_path / "Maria" / "2024" / "01" / "02" / "20240102_080000_abcdef12.png").read_bytes() == b"a"
+    assert (tmp_path / "unassigned" / "2024" / "01" / "03" / "20240103_080000_12345678.jpg").read_bytes() == b"b"
+    assert (tmp_path / ".tmpfile.tmp").exists()
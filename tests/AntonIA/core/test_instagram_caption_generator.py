@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from AntonIA.core import instagram_caption_generator
+from AntonIA.services.batch_client import MockBatchClient
 
 @pytest.fixture
 def mock_llm_client():
@@ -65,4 +66,15 @@ def test_generate_returns_string(
     result = instagram_caption_generator.generate(
         mock_llm_client, 0.5, "tpl", "phrase", "topic", "style", "lang", "tags"
     )
-    assert isinstance(result, str)
\ No newline at end of file
+    assert isinstance(result, str)
+
+def test_generate_batch_returns_captions_by_job_id():
+    batch_client = MockBatchClient("A caption")
+    job = instagram_caption_generator.CaptionJob(
+        model="m", system_prompt="s", temperature=0.5, template="{{phrase}} {{hashtags}}",
+        phrase="Hola", topic="t", style="s", language="spanish", hashtags="#x",
+    )
+
+    assert instagram_caption_generator.generate_batch(batch_client, {"run": job}) == {"run": "A caption"}
+    (request,) = batch_client.batches[0]
+    assert (request.custom_id, request.prompt, request.temperature) == ("run", "Hola #x", 0.5)
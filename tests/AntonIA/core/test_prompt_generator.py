@@ -33,17 +33,57 @@ def test_parse_response_valid(valid_llm_response):
     assert result["font"] == "arial"
 
 def test_parse_response_missing_keys():
-    response = json.dumps({"phrase": "Hola"})
-    result = prompt_generator.parse_response(response)
-    assert result["phrase"] == "Hola"
-    assert result["topic"] == ""
-    assert result["style"] == ""
-    assert result["font"] == ""
+    with pytest.raises(ValueError):
+        prompt_generator.parse_response(json.dumps({"phrase": "Hola"}))
+    with pytest.raises(ValueError):
+        prompt_generator.parse_response("{}")
+
+def test_parse_response_non_string_field():
+    response = json.dumps({"phrase": "hola", "topic": None, "style": "oil", "font": "serif"})
+    with pytest.raises(ValueError):
+        prompt_generator.parse_response(response)
 
 def test_parse_response_malformed(malformed_llm_response):
     with pytest.raises(ValueError):
         prompt_generator.parse_response(malformed_llm_response)
 
+def test_parse_response_extracts_object_from_fenced_answer(valid_llm_response):
+    result = prompt_generator.parse_response(f"Here you go:\n```json\n{valid_llm_response}\n```")
+    assert result["topic"] == "motivación"
+
+def test_generate_repairs_malformed_response_with_bounded_requests(valid_llm_response):
+    from AntonIA.services.llm_client import MockAIClient
+
+    class ScriptedClient(MockAIClient):
+        def __init__(self, responses):
+            super().__init__()
+            self.responses = list(responses)
+            self.calls = []
+        def generate_text(self, prompt, temperature=0.8, response_format=None):
+            self.calls.append((prompt, response_format))
+            return self.responses.pop(0)
+
+    client = ScriptedClient(["Buenos días!", valid_llm_response])
+    image_prompt, details = prompt_generator.generate(
+        client, "{{language}}", "{{phrase}}", past_records="",
+        response_format=prompt_generator.RESPONSE_FORMAT, repair_attempts=2,
+    )
+    assert image_prompt == "Buenos días, hoy es lunes."
+    assert len(client.calls) == 2
+    assert "Buenos días!" in client.calls[1][0]
+    assert all(fmt == prompt_generator.RESPONSE_FORMAT for _, fmt in client.calls)
+
+    invalid_schema = json.dumps({"phrase": "hola", "topic": None, "style": "oil", "font": "serif"})
+    client = ScriptedClient([invalid_schema, "{}", valid_llm_response])
+    _, details = prompt_generator.generate(client, "{{language}}", "{{phrase}}", past_records="", repair_attempts=2)
+    assert details["topic"] == "motivación"
+    assert len(client.calls) == 3
+
+    client = ScriptedClient(["nope", "still nope", "nope again"])
+    with pytest.raises(ValueError):
+        prompt_generator.generate(client, "{{language}}", "{{phrase}}", past_records="", repair_attempts=1)
+    assert len(client.calls) == 2
+
 @patch("AntonIA.core.prompt_generator.build_prompt_from_template")
 @patch("AntonIA.core.prompt_generator.query_llm")
 def test_generate_calls_and_returns(mock_query_llm, mock_build_prompt):
@@ -81,4 +121,98 @@ def test_generate_calls_and_returns(mock_query_llm, mock_build_prompt):
     assert parsed_response["font"] == "arial"
     assert parsed_response["language"] == "spanish"
     assert mock_build_prompt.call_count == 2
-    mock_query_llm.assert_called_once()
\ No newline at end of file
+    mock_query_llm.assert_called_once()
+
+def test_generate_batch_sends_one_request_per_job_and_drops_malformed_responses():
+    from AntonIA.services.batch_client import MockBatchClient
+
+    class PerJobBatchClient(MockBatchClient):
+        def run(self, requests):
+            super().run(requests)
+            return {"good": '{"phrase": "Hola", "topic": "Sol", "style": "Oleo", "font": "Serif"}', "bad": "not json"}
+
+    def job(language):
+        return prompt_generator.PromptGenerationJob(
+            model="m", system_prompt="s", prompt_generateion_template="{{language}}",
+            image_prompt_template="{{phrase}} {{topic}}", past_records="", language=language,
+        )
+    batch_client = PerJobBatchClient()
+
+    results = prompt_generator.generate_batch(batch_client, {"good": job("spanish"), "bad": job("english")})
+
+    assert [r.prompt for r in batch_client.batches[0]] == ["spanish", "english"]
+    assert results == {"good": ("Hola sol", {"phrase": "Hola", "topic": "sol", "style": "oleo", "font": "serif", "language": "spanish"})}
+
+
+def test_generate_streaming_reports_caption_details_before_the_stream_ends():
+    from AntonIA.services.llm_client import MockAIClient
+
+    events = []
+    class RecordingClient(MockAIClient):
+        def stream_text(self, prompt, temperature=0.8):
+            for chunk in super().stream_text(prompt, temperature, chunk_size=4):
+                events.append("chunk")
+                yield chunk
+
+    client = RecordingClient('{"phrase": "Hola", "topic": " Sol ", "style": "Oleo", "font": "Serif Bold Italic Condensed"}')
+    image_prompt, details = prompt_generator.generate_streaming(
+        client, "{{language}}", "{{phrase}} {{font}}", past_records="",
+        on_caption_details=lambda d: events.append(d),
+    )
+
+    reported = next(e for e in events if isinstance(e, dict))
+    assert reported == {"phrase": "Hola", "topic": "sol", "style": "oleo"}
+    assert events.index(reported) < len(events) - 1  # more chunks arrived afterwards
+    assert image_prompt == "Hola serif bold italic condensed"
+    assert details["font"] == "serif bold italic condensed"
+
+def test_generate_streaming_fails_when_repair_changes_reported_caption_details():
+    from AntonIA.services.llm_client import MockAIClient
+
+    class RepairingClient(MockAIClient):
+        def __init__(self, streamed, repaired):
+            super().__init__(streamed)
+            self.repaired = repaired
+        def generate_text(self, prompt, temperature=0.8, response_format=None):
+            return self.repaired
+
+    streamed = '{"phrase": "Hola", "topic": "Sol", "style": "Oleo"'  # truncated, no font
+    reported = []
+    client = RepairingClient(streamed, '{"phrase": "Hola", "topic": "sol", "style": "oleo", "font": "serif"}')
+    image_prompt, details = prompt_generator.generate_streaming(
+        client, "{{language}}", "{{phrase}} {{font}}", past_records="",
+        on_caption_details=reported.append, repair_attempts=1,
+    )
+    assert reported == [{"phrase": "Hola", "topic": "sol", "style": "oleo"}]
+    assert image_prompt == "Hola serif"
+
+    client = RepairingClient(streamed, '{"phrase": "Buenos días", "topic": "luna", "style": "oleo", "font": "serif"}')
+    with pytest.raises(ValueError, match="caption"):
+        prompt_generator.generate_streaming(
+            client, "{{language}}", "{{phrase}} {{font}}", past_records="",
+            on_caption_details=lambda d: None, repair_attempts=1,
+        )
+
+def test_generate_does_not_serve_malformed_responses_from_cache(valid_llm_response, tmp_path):
+    from AntonIA.services.cache import DiskCache
+    from AntonIA.services.llm_client import CachingLLMClient, MockAIClient
+
+    class ScriptedClient(MockAIClient):
+        def __init__(self, responses):
+            super().__init__()
+            self.responses = list(responses)
+            self.prompts = []
+        def generate_text(self, prompt, temperature=0.8, response_format=None):
+            self.prompts.append(prompt)
+            return self.responses.pop(0)
+
+    inner = ScriptedClient(["Buenos días!", valid_llm_response, valid_llm_response])
+    client = CachingLLMClient(inner, disk_cache=DiskCache(str(tmp_path)))
+    prompt_generator.generate(client, "{{language}}", "{{phrase}}", past_records="", repair_attempts=1)
+    _, details = prompt_generator.generate(client, "{{language}}", "{{phrase}}", past_records="", repair_attempts=1)
+
+    assert details["topic"] == "motivación"
+    assert inner.prompts == ["spanish", inner.prompts[1], "spanish"]  # malformed answer re-queried, repair not cached
+    assert client.stats.hits == 0
+    prompt_generator.generate(client, "{{language}}", "{{phrase}}", past_records="", repair_attempts=1)
+    assert client.stats.hits == 1
@@ -1,10 +1,11 @@
 import pytest
 import pandas as pd
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 from AntonIA.core.retrieve_past_records import retrieve_past_n_days
 
 class DummyDatabaseClient:
-    def get_records_matching_query(self, table, query):
+    def get_records_matching_filters(self, table, filters):
         # Simulate returning a DataFrame with some records
         data = [
             {"id": 1, "timestamp": "2024-06-10", "output": "result1"},
@@ -29,7 +30,7 @@ def test_retrieve_past_n_days_returns_formatted_records(mock_logger):
 @patch("AntonIA.core.retrieve_past_records.logger")
 def test_retrieve_past_n_days_empty_records(mock_logger):
     class EmptyDatabaseClient:
-        def get_records_matching_query(self, table, query):
+        def get_records_matching_filters(self, table, filters):
             return pd.DataFrame([])
 
     db_client = EmptyDatabaseClient()
@@ -38,4 +39,17 @@ def test_retrieve_past_n_days_empty_records(mock_logger):
 
     result = retrieve_past_n_days(db_client, table, n_days)
     assert result == ""
-    mock_logger.info.assert_called_once()
\ No newline at end of file
+    mock_logger.info.assert_called_once()
+
+@patch("AntonIA.core.retrieve_past_records.logger")
+def test_retrieve_past_n_days_filters_on_timestamp(mock_logger):
+    db_client = MagicMock()
+    db_client.get_records_matching_filters.return_value = pd.DataFrame([])
+
+    retrieve_past_n_days(db_client, "test_table", 3)
+
+    table, filters = db_client.get_records_matching_filters.call_args.args
+    assert table == "test_table"
+    assert len(filters) == 1
+    assert (filters[0].column, filters[0].operator) == ("timestamp", ">=")
+    assert filters[0].value == datetime.combine((datetime.now() - timedelta(days=3)).date(), datetime.min.time())
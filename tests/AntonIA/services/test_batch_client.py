@@ -0,0 +1,161 @@
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from AntonIA.services.batch_client import BatchError, BatchRequest, MockBatchClient, OpenAIBatchClient, query_llm_batch
+
+
+class StandInBatchServer:
+    """Local server mimicking the Files and Batches endpoints used by OpenAIBatchClient."""
+
+    def __init__(self, polls_before_completion=1, final_status="completed"):
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self.polls_before_completion = polls_before_completion
+        self.final_status = final_status
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.path == "/v1/files":
+                    self._reply(server.upload(self.headers["Content-Type"], body))
+                elif self.path == "/v1/batches":
+                    self._reply(server.create_batch(json.loads(body)))
+                else:
+                    self._reply({"error": "not found"}, 404)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if parts[:2] == ["v1", "batches"]:
+                    self._reply(server.retrieve_batch(parts[2]))
+                elif parts[:2] == ["v1", "files"] and parts[-1] == "content":
+                    self._reply_raw(server.files[parts[2]])
+                else:
+                    self._reply({"error": "not found"}, 404)
+
+            def _reply(self, payload, status=200):
+                self._reply_raw(json.dumps(payload).encode(), status, "application/json")
+
+            def _reply_raw(self, data, status=200, content_type="application/octet-stream"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def upload(self, content_type, body):
+        message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        file_part = next(p for p in message.iter_parts() if p.get_param("name", header="content-disposition") == "file")
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = file_part.get_payload(decode=True)
+        return {"id": file_id, "object": "file", "bytes": len(self.files[file_id]), "created_at": 0,
+                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+
+    def create_batch(self, params):
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = {"id": batch_id, "object": "batch", "endpoint": params["endpoint"],
+                                  "input_file_id": params["input_file_id"], "completion_window": params["completion_window"],
+                                  "status": "validating", "created_at": 0, "polls": 0}
+        return self.batches[batch_id]
+
+    def retrieve_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["polls"] > self.polls_before_completion and batch["status"] not in ("completed", "failed"):
+            batch["status"] = self.final_status
+            if self.final_status == "completed":
+                batch["output_file_id"] = self._run(batch["input_file_id"])
+        elif batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        return batch
+
+    def _run(self, input_file_id):
+        """Answer every request with its prompt in upper case; prompts containing 'fail' get an error."""
+        lines = []
+        for line in self.files[input_file_id].decode().splitlines():
+            request = json.loads(line)
+            prompt = request["body"]["messages"][1]["content"]
+            if "fail" in prompt:
+                lines.append({"custom_id": request["custom_id"], "response": {"status_code": 400, "body": {}}, "error": None})
+                continue
+            body = {"id": "c", "object": "chat.completion", "created": 0, "model": request["body"]["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": prompt.upper()}}]}
+            lines.append({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+        output_id = f"file-{len(self.files)}"
+        self.files[output_id] = "\n".join(json.dumps(line) for line in lines).encode()
+        return output_id
+
+
+def make_client(server, **kwargs):
+    sleeps = []
+    client = OpenAIBatchClient(api_key="k", base_url=server.url, poll_interval=5.0, sleep=sleeps.append, **kwargs)
+    return client, sleeps
+
+
+def test_batch_runs_against_stand_in_server():
+    with StandInBatchServer(polls_before_completion=2) as server:
+        client, sleeps = make_client(server)
+        texts = client.run([
+            BatchRequest("a", "m", "system", "hello"),
+            BatchRequest("b", "m", "system", "world"),
+        ])
+
+    assert texts == {"a": "HELLO", "b": "WORLD"}
+    assert sleeps == [5.0, 5.0]
+    uploaded = [json.loads(line) for line in server.files["file-0"].decode().splitlines()]
+    assert uploaded[0]["url"] == "/v1/chat/completions"
+    assert uploaded[0]["body"]["messages"][0] == {"role": "system", "content": "system"}
+
+def test_failed_requests_are_left_out():
+    with StandInBatchServer(polls_before_completion=0) as server:
+        client, _ = make_client(server)
+        texts = client.run([BatchRequest("ok", "m", "s", "fine"), BatchRequest("ko", "m", "s", "please fail")])
+
+    assert texts == {"ok": "FINE"}
+
+def test_failed_batch_raises():
+    with StandInBatchServer(polls_before_completion=0, final_status="failed") as server:
+        client, _ = make_client(server)
+        with pytest.raises(BatchError):
+            client.run([BatchRequest("a", "m", "s", "hello")])
+
+def test_batch_timeout_raises():
+    now = [0.0]
+    def sleep(seconds):
+        now[0] += seconds
+    with StandInBatchServer(polls_before_completion=100) as server:
+        client = OpenAIBatchClient(api_key="k", base_url=server.url, poll_interval=5.0, timeout=12.0, sleep=sleep, clock=lambda: now[0])
+        with pytest.raises(BatchError, match="did not complete"):
+            client.run([BatchRequest("a", "m", "s", "hello")])
+
+def test_duplicated_custom_ids_are_rejected():
+    client = OpenAIBatchClient(api_key="k")
+    with pytest.raises(BatchError):
+        client.submit([BatchRequest("a", "m", "s", "x"), BatchRequest("a", "m", "s", "y")])
+
+def test_query_llm_batch_wraps_errors():
+    class FailingBatchClient:
+        def run(self, requests):
+            raise BatchError("boom")
+
+    assert query_llm_batch(MockBatchClient("r"), [BatchRequest("a", "m", "s", "p")]) == {"a": "r"}
+    with pytest.raises(RuntimeError, match="Failed to query the LLM batch."):
+        query_llm_batch(FailingBatchClient(), [BatchRequest("a", "m", "s", "p")])
@@ -0,0 +1,56 @@
+import os
+import time
+from AntonIA.services.cache import LRUCache, DiskCache, make_cache_key
+
+def test_make_cache_key_is_stable_and_distinguishes_parts():
+    assert make_cache_key("a", 1, 0.5) == make_cache_key("a", 1, 0.5)
+    assert make_cache_key("a", 1, 0.5) != make_cache_key("a", 1, 0.6)
+    assert len(make_cache_key("x")) == 64
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"  # "b" is now the least recently used
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert (cache.stats.hits, cache.stats.misses) == (3, 1)
+
+def test_disk_cache_round_trip_persists_across_instances(tmp_path):
+    DiskCache(str(tmp_path)).set("key1", b"value")
+    cache = DiskCache(str(tmp_path))
+    assert cache.get("key1") == b"value"
+    assert cache.get("missing") is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+def test_disk_cache_expires_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl_seconds=60)
+    cache.set("key1", b"value")
+    old = time.time() - 120
+    os.utime(tmp_path / "ke" / "key1", (old, old))
+
+    assert cache.get("key1") is None
+    assert not (tmp_path / "ke" / "key1").exists()
+
+def test_disk_cache_evicts_least_recently_read_over_size_cap(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.set("aa1", b"12345")
+    cache.set("bb2", b"12345")
+    old = time.time() - 100
+    os.utime(tmp_path / "aa" / "aa1", (old, old))
+    cache.get("aa1")  # refreshes the access time of aa1, bb2 becomes the oldest
+    cache.set("cc3", b"12345")
+
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") == b"12345"
+    assert cache.get("cc3") == b"12345"
+
+def test_caches_delete_entries(tmp_path):
+    for cache in (LRUCache(), DiskCache(str(tmp_path))):
+        cache.set("key1", b"value")
+        cache.delete("key1")
+        cache.delete("missing")
+        assert cache.get("key1") is None
@@ -1,6 +1,8 @@
+import threading
 import pytest
 import pandas as pd
-from AntonIA.services.database_client import MockDatabaseClient, LocalFileDatabaseClient
+from datetime import datetime
+from AntonIA.services.database_client import MockDatabaseClient, LocalFileDatabaseClient, SQLiteDatabaseClient, Filter
 
 def test_mock_save_and_get_all_records():
     client = MockDatabaseClient()
@@ -72,4 +74,233 @@ def test_local_file_get_records_matching_query_invalid(tmp_path):
     table = "users"
     client.save_record(table, {"id": 1, "name": "Alice"})
     with pytest.raises(Exception):
-        client.get_records_matching_query(table, "unknown_column == 1")
\ No newline at end of file
+        client.get_records_matching_query(table, "unknown_column == 1")
+
+def test_local_dataset_save_writes_part_files(tmp_path):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode="dataset", compaction_threshold=0)
+    client.save_record("runs", {"id": 1, "name": "Alice"})
+    client.save_record("runs", {"id": 2, "name": "Bob"})
+
+    assert len(list((tmp_path / "runs").glob("part-*.parquet"))) == 2
+    assert not (tmp_path / "runs.parquet").exists()
+    df = client.get_all_records("runs")
+    assert list(df["name"]) == ["Alice", "Bob"]
+
+def test_local_dataset_get_all_records_empty_table(tmp_path):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode="dataset")
+    df = client.get_all_records("nonexistent")
+    assert isinstance(df, pd.DataFrame)
+    assert df.empty
+
+def test_local_dataset_reads_legacy_file_and_new_columns(tmp_path):
+    legacy = LocalFileDatabaseClient(str(tmp_path))
+    legacy.save_record("users", {"id": 1, "name": "Alice"})
+
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode="dataset", compaction_threshold=0)
+    client.save_record("users", {"id": 2, "name": "Bob", "age": 25})
+
+    df = client.get_all_records("users")
+    assert list(df["name"]) == ["Alice", "Bob"]
+    assert pd.isna(df.iloc[0]["age"])
+    assert client.get_records_matching_query("users", "age < 28").iloc[0]["name"] == "Bob"
+
+def test_local_dataset_compaction_merges_part_files(tmp_path):
+    client = LocalFileDatabaseClient(
+        str(tmp_path), storage_mode="dataset", compaction_threshold=3, background_compaction=False
+    )
+    for i in range(4):
+        client.save_record("runs", {"id": i})
+
+    assert len(list((tmp_path / "runs").glob("compacted-*.parquet"))) == 1
+    assert len(list((tmp_path / "runs").glob("part-*.parquet"))) == 1
+    assert list(client.get_all_records("runs")["id"]) == [0, 1, 2, 3]
+
+def test_local_dataset_background_compaction(tmp_path):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode="dataset", compaction_threshold=2)
+    client.save_record("runs", {"id": 1})
+    client.save_record("runs", {"id": 2})
+    client.wait_for_compaction()
+
+    assert not list((tmp_path / "runs").glob("part-*.parquet"))
+    assert list(client.get_all_records("runs")["id"]) == [1, 2]
+
+def test_local_dataset_full_compaction_absorbs_legacy_file(tmp_path):
+    LocalFileDatabaseClient(str(tmp_path)).save_record("runs", {"id": 1})
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode="dataset", compaction_threshold=0)
+    client.save_record("runs", {"id": 2})
+
+    assert client.compact("runs", full=True) == 2
+    assert not (tmp_path / "runs.parquet").exists()
+    assert list(client.get_all_records("runs")["id"]) == [1, 2]
+
+def test_local_dataset_compaction_merges_compacted_files_over_threshold(tmp_path):
+    client = LocalFileDatabaseClient(
+        str(tmp_path), storage_mode="dataset", compaction_threshold=2, background_compaction=False
+    )
+    for i in range(5):
+        client.save_record("runs", {"id": i})
+
+    assert len(list((tmp_path / "runs").glob("compacted-*.parquet"))) == 1
+    assert not list((tmp_path / "runs").glob("part-*.parquet"))
+    assert list(client.get_all_records("runs")["id"]) == [0, 1, 2, 3, 4]
+
+def test_local_dataset_skips_inputs_of_an_unfinished_compaction(tmp_path):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode="dataset", compaction_threshold=0)
+    client.save_record("runs", {"id": 1})
+    client.save_record("runs", {"id": 2})
+    parts = {p: p.read_bytes() for p in (tmp_path / "runs").glob("part-*.parquet")}
+    client.compact("runs")
+    for path, data in parts.items():  # as if the compaction stopped before deleting its inputs
+        path.write_bytes(data)
+
+    assert list(client.get_all_records("runs")["id"]) == [1, 2]
+    assert len(client.get_records_matching_filters("runs", [Filter("id", ">", 0)])) == 2
+
+    client.save_record("runs", {"id": 3})
+    assert client.compact("runs") == 0  # only removes the leftover inputs, one part file is not merged
+    assert not any(path.exists() for path in parts)
+    assert list(client.get_all_records("runs")["id"]) == [1, 2, 3]
+
+def test_local_file_rejects_unknown_storage_mode(tmp_path):
+    with pytest.raises(ValueError):
+        LocalFileDatabaseClient(str(tmp_path), storage_mode="unknown")
+
+
+def test_filter_rejects_unknown_operator():
+    with pytest.raises(ValueError):
+        Filter("age", "~=", 1)
+
+def test_mock_get_records_matching_filters():
+    client = MockDatabaseClient()
+    client.save_record("users", {"id": 1, "name": "Alice", "age": 30})
+    client.save_record("users", {"id": 2, "name": "Bob", "age": 25})
+    client.save_record("users", {"id": 3, "name": "Carol", "age": 40})
+
+    df = client.get_records_matching_filters("users", [Filter("age", ">", 26), Filter("age", "<", 35)])
+    assert list(df["name"]) == ["Alice"]
+    assert client.get_records_matching_filters("users", [Filter("unknown", "==", 1)]).empty
+
+@pytest.mark.parametrize("storage_mode", ["file", "dataset"])
+def test_local_file_get_records_matching_filters_on_timestamp(tmp_path, storage_mode):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode=storage_mode, compaction_threshold=0)
+    for day in (1, 5, 10):
+        client.save_record("runs", {"phrase": f"day {day}", "timestamp": datetime(2024, 6, day, 8, 0)})
+
+    df = client.get_records_matching_filters("runs", [Filter("timestamp", ">=", datetime(2024, 6, 5))])
+    assert list(df["phrase"]) == ["day 5", "day 10"]
+
+@pytest.mark.parametrize("storage_mode", ["file", "dataset"])
+def test_local_file_get_records_matching_filters_missing_table(tmp_path, storage_mode):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode=storage_mode)
+    assert client.get_records_matching_filters("nonexistent", [Filter("id", "==", 1)]).empty
+
+@pytest.mark.parametrize("storage_mode", ["file", "dataset"])
+def test_local_file_get_records_matching_filters_invalid_column(tmp_path, storage_mode):
+    client = LocalFileDatabaseClient(str(tmp_path), storage_mode=storage_mode, compaction_threshold=0)
+    client.save_record("users", {"id": 1, "name": "Alice"})
+    with pytest.raises(Exception):
+        client.get_records_matching_filters("users", [Filter("unknown_column", "==", 1)])
+
+def test_sqlite_save_and_get_all_records(tmp_path):
+    client = SQLiteDatabaseClient(str(tmp_path))
+    client.save_record("products", {"id": 1, "name": "Widget"})
+    client.save_record("products", {"id": 2, "name": "Gadget", "price": 9.5})
+
+    df = client.get_all_records("products")
+    assert list(df["name"]) == ["Widget", "Gadget"]
+    assert pd.isna(df.iloc[0]["price"])
+    assert df.iloc[1]["price"] == 9.5
+
+def test_sqlite_get_all_records_empty_table(tmp_path):
+    client = SQLiteDatabaseClient(str(tmp_path))
+    df = client.get_all_records("nonexistent")
+    assert isinstance(df, pd.DataFrame)
+    assert df.empty
+
+def test_sqlite_uses_wal_and_timestamp_index(tmp_path):
+    client = SQLiteDatabaseClient(str(tmp_path))
+    client.save_record("runs", {"phrase": "hola", "timestamp": datetime(2024, 6, 1)})
+
+    assert client._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = client._connection.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM "runs" WHERE "timestamp" >= ?', ["2024-01-01"]
+    ).fetchall()
+    assert "idx_runs_timestamp" in str(plan)
+
+def test_sqlite_get_records_matching_filters_on_timestamp(tmp_path):
+    client = SQLiteDatabaseClient(str(tmp_path))
+    for day in (1, 5, 10):
+        client.save_record("runs", {"phrase": f"day {day}", "timestamp": datetime(2024, 6, day, 8, 0)})
+
+    df = client.get_records_matching_filters("runs", [Filter("timestamp", ">=", datetime(2024, 6, 5))])
+    assert list(df["phrase"]) == ["day 5", "day 10"]
+    assert df["timestamp"].iloc[0] == datetime(2024, 6, 5, 8, 0)
+
+def test_sqlite_get_records_matching_query(tmp_path):
+    client = SQLiteDatabaseClient(str(tmp_path))
+    client.save_record("users", {"id": 1, "name": "Alice", "age": 30})
+    client.save_record("users", {"id": 2, "name": "Bob", "age": 25})
+
+    df = client.get_records_matching_query("users", "age < 28")
+    assert list(df["name"]) == ["Bob"]
+    with pytest.raises(Exception):
+        client.get_records_matching_query("users", "unknown_column == 1")
+
+def test_sqlite_filter_on_unknown_column_raises(tmp_path):
+    client = SQLiteDatabaseClient(str(tmp_path))
+    client.save_record("users", {"id": 1})
+    with pytest.raises(Exception):
+        client.get_records_matching_filters("users", [Filter("unknown_column", "==", 1)])
+
+def test_sqlite_records_visible_to_other_connections(tmp_path):
+    writer = SQLiteDatabaseClient(str(tmp_path))
+    reader = SQLiteDatabaseClient(str(tmp_path))
+    writer.save_record("runs", {"id": 1})
+    reader.save_record("runs", {"id": 2, "extra": "x"})
+    writer.save_record("runs", {"id": 3, "extra": "y"})
+
+    assert list(reader.get_all_records("runs")["id"]) == [1, 2, 3]
+    writer.close()
+    reader.close()
+
+def test_sqlite_clients_adding_the_same_column_concurrently(tmp_path):
+    clients = [SQLiteDatabaseClient(str(tmp_path)) for _ in range(2)]
+    clients[0].save_record("runs", {"id": 0})
+    rounds = 20
+    barrier = threading.Barrier(len(clients))
+    errors = []
+
+    def save_new_columns(client):
+        for i in range(rounds):
+            barrier.wait()
+            try:
+                client.save_record("runs", {"id": i, f"column_{i}": i})
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=save_new_columns, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(clients[0].get_all_records("runs")) == 1 + rounds * len(clients)
+    for client in clients:
+        client.close()
+
+@pytest.mark.parametrize("make_client", [
+    lambda path: MockDatabaseClient(),
+    lambda path: LocalFileDatabaseClient(str(path)),
+    lambda path: LocalFileDatabaseClient(str(path), storage_mode="dataset", compaction_threshold=2, background_compaction=False),
+    lambda path: SQLiteDatabaseClient(str(path)),
+], ids=["mock", "file", "dataset", "sqlite"])
+def test_replace_values_rewrites_matching_rows(tmp_path, make_client):
+    client = make_client(tmp_path)
+    for path in ("a.png", "b.png", "c.png"):
+        client.save_record("runs", {"image_path": path, "phrase": "hola"})
+
+    assert client.replace_values("runs", "image_path", {"a.png": "x/a.png", "c.png": "x/c.png", "z.png": "x/z.png"}) == 2
+    assert list(client.get_all_records("runs")["image_path"]) == ["x/a.png", "b.png", "x/c.png"]
+    assert client.replace_values("runs", "missing_column", {"a.png": "x"}) == 0
+    assert client.replace_values("no_table", "image_path", {"a.png": "x"}) == 0
@@ -0,0 +1,37 @@
+import asyncio
+from AntonIA.services.http_client import HttpClientRegistry, HttpPoolSettings
+from AntonIA.services.llm_client import OpenAIClient
+from AntonIA.services.image_generation_client import OpenAIimageGenerationClient
+
+def test_registry_reuses_the_sync_client():
+    registry = HttpClientRegistry(HttpPoolSettings(max_connections=5, timeout=42.0))
+    client = registry.client()
+
+    assert registry.client() is client
+    assert client.timeout.read == 42.0
+    registry.close()
+    assert client.is_closed
+    assert registry.client() is not client  # recreated after close
+    registry.close()
+
+def test_registry_keeps_one_async_client_per_event_loop():
+    registry = HttpClientRegistry()
+
+    async def get_twice():
+        first, second = registry.async_client(), registry.async_client()
+        await registry.aclose()
+        return first, second
+
+    first, second = asyncio.run(get_twice())
+    other, _ = asyncio.run(get_twice())
+    assert first is second
+    assert first is not other
+    assert first.is_closed
+
+def test_service_objects_share_the_connection_pool():
+    registry = HttpClientRegistry()
+    llm = OpenAIClient(api_key="k", http_client=registry.client())
+    image = OpenAIimageGenerationClient(api_key="k", http_client=registry.client())
+
+    assert llm.client._client is image.client._client is registry.client()
+    registry.close()
@@ -1,6 +1,11 @@
+import asyncio
+import base64
+import threading
 import pytest
 from AntonIA.services.image_generation_client import MockImageGenerationClient
-from AntonIA.services.image_generation_client import OpenAIimageGenerationClient
+from AntonIA.services.image_generation_client import OpenAIimageGenerationClient, AsyncOpenAIimageGenerationClient
+from AntonIA.services.image_generation_client import CachingImageGenerationClient
+from AntonIA.services.cache import DiskCache
 
 def test_mock_image_generation_client_returns_bytes():
     client = MockImageGenerationClient()
@@ -52,3 +57,88 @@ def test_openai_image_generation_client_raises_on_exception(monkeypatch):
     client = OpenAIimageGenerationClient(api_key="fake-key")
     with pytest.raises(RuntimeError, match="Image generation failed"):
         client.generate_image("A test prompt")
+
+
+class DummyAsyncOpenAI:
+    class images:
+        @staticmethod
+        async def generate(model, prompt, size, n, quality):
+            return DummyOpenAI.images.generate(model, prompt, size, n, quality)
+
+def test_async_openai_image_generation_client_returns_bytes(monkeypatch):
+    monkeypatch.setattr("AntonIA.services.image_generation_client.AsyncOpenAI", lambda api_key: DummyAsyncOpenAI)
+    client = AsyncOpenAIimageGenerationClient(api_key="fake-key")
+    result = asyncio.run(client.generate_image("A test prompt"))
+    assert isinstance(result, bytes)
+    assert result[:8] == b'\x89PNG\r\n\x1a\n'[:len(result)]
+
+
+class CountingImageClient:
+    model = "img-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_image(self, prompt, size="1024x1024"):
+        self.calls += 1
+        return f"{prompt}@{size}".encode()
+
+def test_caching_image_generation_client_reuses_images_across_instances(tmp_path):
+    first = CountingImageClient()
+    assert CachingImageGenerationClient(first, DiskCache(str(tmp_path))).generate_image("cat", "1024x1024") == b"cat@1024x1024"
+
+    # A new run (new client, same cache directory) does not regenerate the image
+    second = CountingImageClient()
+    client = CachingImageGenerationClient(second, DiskCache(str(tmp_path)))
+    assert client.generate_image("cat", "1024x1024") == b"cat@1024x1024"
+    assert second.calls == 0
+    assert client.stats.hits == 1
+
+    client.generate_image("cat", "1024x1536")
+    assert second.calls == 1
+
+
+def test_openai_image_generation_client_requests_n_candidates_in_one_call(monkeypatch):
+    requests = []
+    class CandidatesOpenAI:
+        class images:
+            @staticmethod
+            def generate(model, prompt, size, n, quality):
+                requests.append(n)
+                payloads = [base64.b64encode(f"image {i}".encode()).decode() for i in range(n)]
+                return type("Result", (), {"data": [type("obj", (), {"b64_json": p}) for p in payloads]})()
+    monkeypatch.setattr("AntonIA.services.image_generation_client.OpenAI", lambda api_key: CandidatesOpenAI)
+    decoding_threads = []
+    b64decode = base64.b64decode
+    def recording_b64decode(data):
+        decoding_threads.append(threading.current_thread().name)
+        return b64decode(data)
+    monkeypatch.setattr(base64, "b64decode", recording_b64decode)
+
+    images = OpenAIimageGenerationClient(api_key="fake-key").generate_images("A test prompt", n=3)
+
+    assert images == [b"image 0", b"image 1", b"image 2"]
+    assert requests == [3]
+    assert all(name.startswith("candidate") for name in decoding_threads)  # decoded on the scoring pool
+
+def test_caching_image_generation_client_caches_candidates(tmp_path):
+    inner = MockImageGenerationClient()
+    client = CachingImageGenerationClient(inner, DiskCache(str(tmp_path)))
+
+    first = client.generate_images("cat", n=2)
+    assert client.generate_images("cat", n=2) == first
+    assert (client.stats.misses, client.stats.hits) == (1, 1)
+
+def test_generate_image_files_decodes_to_files_and_fills_the_cache(monkeypatch, tmp_path):
+    import hashlib
+    monkeypatch.setattr("AntonIA.services.image_generation_client.OpenAI", lambda api_key: DummyOpenAI)
+    client = CachingImageGenerationClient(OpenAIimageGenerationClient(api_key="fake-key"), DiskCache(str(tmp_path)))
+
+    decoded = client.generate_image_files("A test prompt")[0]
+    data = decoded.file.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'[:len(data)]
+    assert decoded.sha256 == hashlib.sha256(data).hexdigest()
+
+    # Same cache entry as generate_image
+    assert client.generate_image("A test prompt") == data
+    assert client.stats.hits == 1
@@ -1,5 +1,7 @@
+import asyncio
 import pytest
-from AntonIA.services.llm_client import OpenAIClient, MockAIClient, query_llm
+from AntonIA.services.llm_client import OpenAIClient, AsyncOpenAIClient, CachingLLMClient, MockAIClient, query_llm, aquery_llm
+from AntonIA.services.cache import DiskCache
 
 class DummyOpenAIChatCompletions:
     def create(self, model, messages, temperature):
@@ -38,4 +40,159 @@ def test_query_llm_with_openai_client(monkeypatch):
     client = OpenAIClient(api_key="fake-key")
     prompt = "Good morning!"
     result = query_llm(client, prompt)
-    assert result == "Dummy OpenAI response."
\ No newline at end of file
+    assert result == "Dummy OpenAI response."
+
+class DummyAsyncOpenAIChatCompletions:
+    async def create(self, model, messages, temperature):
+        return DummyOpenAIChatCompletions().create(model, messages, temperature)
+
+class DummyAsyncOpenAIClient:
+    def __init__(self, api_key):
+        self.chat = type('Chat', (), {'completions': DummyAsyncOpenAIChatCompletions()})()
+
+def test_async_openai_client_generate_text(monkeypatch):
+    monkeypatch.setattr("AntonIA.services.llm_client.AsyncOpenAI", lambda api_key: DummyAsyncOpenAIClient(api_key))
+    client = AsyncOpenAIClient(api_key="fake-key", system_prompt="You are helpful.")
+    result = asyncio.run(aquery_llm(client, "Hello world", temperature=0.7))
+    assert result == "Dummy OpenAI response."
+
+def test_aquery_llm_wraps_errors():
+    class FailingClient:
+        async def generate_text(self, prompt, temperature=0.8):
+            raise Exception("API error")
+    with pytest.raises(RuntimeError, match="Failed to query the LLM."):
+        asyncio.run(aquery_llm(FailingClient(), "Hello"))
+
+
+class CountingClient:
+    def __init__(self, model="m", system_prompt="s"):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.calls = 0
+
+    def generate_text(self, prompt, temperature=0.8, response_format=None):
+        self.calls += 1
+        return f"response to {prompt} at {temperature}"
+
+def test_caching_llm_client_reuses_identical_requests():
+    inner = CountingClient()
+    client = CachingLLMClient(inner)
+
+    assert client.generate_text("hi", 0.5) == "response to hi at 0.5"
+    assert client.generate_text("hi", 0.5) == "response to hi at 0.5"
+    client.generate_text("hi", 0.7)
+    client.generate_text("bye", 0.5)
+
+    assert inner.calls == 3
+    assert (client.stats.hits, client.stats.misses) == (1, 3)
+
+def test_response_format_is_sent_only_when_set(monkeypatch):
+    sent = []
+    class RecordingCompletions:
+        def create(self, **kwargs):
+            sent.append(kwargs)
+            return DummyOpenAIChatCompletions().create(kwargs["model"], kwargs["messages"], kwargs["temperature"])
+    class RecordingOpenAIClient:
+        def __init__(self, api_key):
+            self.chat = type('Chat', (), {'completions': RecordingCompletions()})()
+    monkeypatch.setattr("AntonIA.services.llm_client.OpenAI", lambda api_key: RecordingOpenAIClient(api_key))
+    client = OpenAIClient(api_key="fake-key")
+
+    query_llm(client, "hi")
+    query_llm(client, "hi", response_format={"type": "json_object"})
+
+    assert "response_format" not in sent[0]
+    assert sent[1]["response_format"] == {"type": "json_object"}
+
+def test_caching_llm_client_key_includes_response_format():
+    inner = CountingClient()
+    client = CachingLLMClient(inner)
+    client.generate_text("hi", 0.5)
+    client.generate_text("hi", 0.5, response_format={"type": "json_object"})
+    client.generate_text("hi", 0.5, response_format={"type": "json_object"})
+    assert inner.calls == 2
+
+def test_caching_llm_client_key_includes_model_and_system_prompt(tmp_path):
+    disk_cache = DiskCache(str(tmp_path))
+    CachingLLMClient(CountingClient(model="a"), disk_cache=disk_cache).generate_text("hi")
+
+    other_model = CountingClient(model="b")
+    CachingLLMClient(other_model, disk_cache=disk_cache).generate_text("hi")
+    assert other_model.calls == 1
+
+    same = CountingClient(model="a")
+    assert CachingLLMClient(same, disk_cache=disk_cache).generate_text("hi") == "response to hi at 0.8"
+    assert same.calls == 0
+
+
+def test_openai_client_retries_transient_errors(monkeypatch):
+    import httpx
+    import openai
+    from AntonIA.services.retry import RetryPolicy
+
+    created = {}
+    class FlakyCompletions(DummyOpenAIChatCompletions):
+        calls = 0
+        def create(self, model, messages, temperature):
+            FlakyCompletions.calls += 1
+            if FlakyCompletions.calls == 1:
+                raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+            return super().create(model, messages, temperature)
+
+    def fake_openai(api_key, **kwargs):
+        created.update(kwargs)
+        client = DummyOpenAIClient(api_key)
+        client.chat.completions = FlakyCompletions()
+        return client
+
+    monkeypatch.setattr("AntonIA.services.llm_client.OpenAI", fake_openai)
+    monkeypatch.setattr("AntonIA.services.retry.time.sleep", lambda seconds: None)
+    client = OpenAIClient(api_key="fake-key", retry_policy=RetryPolicy(max_attempts=2))
+
+    assert client.generate_text("Hello") == "Dummy OpenAI response."
+    assert FlakyCompletions.calls == 2
+    assert created == {"max_retries": 0}
+
+
+class DummyStream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for delta in self.deltas:
+            choice = type("Choice", (), {"delta": type("Delta", (), {"content": delta})()})()
+            yield type("Chunk", (), {"choices": [choice]})()
+
+def test_openai_client_stream_text_yields_deltas(monkeypatch):
+    calls = []
+    class StreamingCompletions:
+        def create(self, model, messages, temperature, stream):
+            calls.append(stream)
+            return DummyStream(["Hel", None, "lo"])
+    monkeypatch.setattr(
+        "AntonIA.services.llm_client.OpenAI",
+        lambda api_key: type("Client", (), {"chat": type("Chat", (), {"completions": StreamingCompletions()})()})(),
+    )
+
+    assert list(OpenAIClient(api_key="fake-key").stream_text("Hi")) == ["Hel", "lo"]
+    assert calls == [True]
+
+def test_stream_llm_falls_back_to_generate_text_and_caching_client_stores_streams():
+    from AntonIA.services.llm_client import stream_llm
+
+    class NonStreamingClient:
+        def generate_text(self, prompt, temperature=0.8):
+            return "whole"
+    assert list(stream_llm(NonStreamingClient(), "p")) == ["whole"]
+
+    client = CachingLLMClient(MockAIClient(response="streamed response"))
+    assert "".join(client.stream_text("p")) == "streamed response"
+    assert list(client.stream_text("p")) == ["streamed response"]
+    assert client.generate_text("p") == "streamed response"
+    assert (client.stats.misses, client.stats.hits) == (1, 2)
@@ -0,0 +1,59 @@
+from AntonIA.services.rate_limiter import RateLimit, TokenBucketRateLimiter, estimate_tokens
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def make_limiter(clock, limits, **kwargs):
+    return TokenBucketRateLimiter(limits, sleep=clock.sleep, clock=clock, **kwargs)
+
+def test_estimate_tokens_grows_with_text():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 400) == 101
+
+def test_requests_within_burst_do_not_wait():
+    clock = FakeClock()
+    limiter = make_limiter(clock, {"m": RateLimit(requests_per_minute=60)}, burst_seconds=3)
+
+    assert [limiter.acquire("m") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert clock.sleeps == []
+
+def test_requests_beyond_burst_wait_for_refill():
+    clock = FakeClock()
+    limiter = make_limiter(clock, {"m": RateLimit(requests_per_minute=60)}, burst_seconds=2)
+
+    limiter.acquire("m")
+    limiter.acquire("m")
+    assert limiter.acquire("m") == 1.0  # 1 request per second
+
+def test_token_bucket_limits_large_requests():
+    clock = FakeClock()
+    limiter = make_limiter(clock, {"m": RateLimit(tokens_per_minute=600)}, burst_seconds=10)  # 10 tokens/s, capacity 100
+
+    assert limiter.acquire("m", tokens=100) == 0.0
+    assert limiter.acquire("m", tokens=50) == 5.0
+
+def test_unlisted_models_are_not_limited():
+    clock = FakeClock()
+    limiter = make_limiter(clock, {"m": RateLimit(requests_per_minute=1)}, burst_seconds=1)
+
+    for _ in range(10):
+        assert limiter.acquire("other") == 0.0
+
+def test_state_file_is_shared_between_limiters(tmp_path):
+    clock = FakeClock()
+    state_file = str(tmp_path / "rate_limits.json")
+    limits = {"m": RateLimit(requests_per_minute=60)}
+    first = make_limiter(clock, limits, burst_seconds=1, state_file=state_file)
+    second = make_limiter(clock, limits, burst_seconds=1, state_file=state_file)
+
+    assert first.acquire("m") == 0.0
+    assert second.acquire("m") == 1.0
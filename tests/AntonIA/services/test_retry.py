@@ -0,0 +1,67 @@
+import httpx
+import openai
+import pytest
+from AntonIA.services.retry import RetryPolicy, call_with_retry, is_retryable
+
+def make_status_error(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, request=request, headers=headers)
+    return openai.APIStatusError("error", response=response, body=None)
+
+class FlakyCall:
+    def __init__(self, errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+def test_is_retryable_classification():
+    policy = RetryPolicy()
+    request = httpx.Request("POST", "https://api.openai.com")
+    assert is_retryable(make_status_error(429), policy)
+    assert is_retryable(make_status_error(503), policy)
+    assert is_retryable(openai.APITimeoutError(request=request), policy)
+    assert not is_retryable(make_status_error(400), policy)
+    assert not is_retryable(ValueError("bad"), policy)
+
+def test_call_with_retry_retries_transient_errors_with_backoff():
+    sleeps = []
+    fn = FlakyCall([make_status_error(429), make_status_error(500)])
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, jitter=0.0)
+
+    assert call_with_retry(fn, policy, sleep=sleeps.append) == "ok"
+    assert fn.calls == 3
+    assert sleeps == [1.0, 2.0]
+
+def test_call_with_retry_raises_non_retryable_immediately():
+    fn = FlakyCall([make_status_error(400)])
+    with pytest.raises(openai.APIStatusError):
+        call_with_retry(fn, RetryPolicy(), sleep=lambda s: None)
+    assert fn.calls == 1
+
+def test_call_with_retry_gives_up_after_max_attempts():
+    fn = FlakyCall([make_status_error(503)] * 5)
+    with pytest.raises(openai.APIStatusError):
+        call_with_retry(fn, RetryPolicy(max_attempts=2), sleep=lambda s: None)
+    assert fn.calls == 2
+
+def test_call_with_retry_respects_deadline():
+    fn = FlakyCall([make_status_error(503)] * 5)
+    policy = RetryPolicy(max_attempts=10, base_delay=10.0, jitter=0.0, deadline_seconds=15.0)
+    now = [0.0]
+    def sleep(seconds):
+        now[0] += seconds
+    with pytest.raises(openai.APIStatusError):
+        call_with_retry(fn, policy, sleep=sleep, clock=lambda: now[0])
+    # 10s after the first failure fits in the deadline, the next 20s do not
+    assert fn.calls == 2
+
+def test_delay_honours_retry_after_header_and_jitter_bounds():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0, jitter=0.5)
+    assert policy.delay_for(1, make_status_error(429, {"retry-after": "7"})) == 7.0
+    assert 2.0 <= policy.delay_for(10) <= 4.0
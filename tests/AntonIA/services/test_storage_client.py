@@ -1,8 +1,12 @@
+import errno
+import hashlib
+import io
+import os
 import pytest
 import tempfile
 import shutil
 from pathlib import Path
-from AntonIA.services.storage_client import MockStorageClient, LocalStorageClient
+from AntonIA.services.storage_client import MockStorageClient, LocalStorageClient, S3StorageClient, S3_MIN_PART_SIZE
 
 def test_mock_storage_client_save_file():
     client = MockStorageClient()
@@ -47,4 +51,194 @@ def test_local_storage_client_creates_base_dir():
         base_dir = Path(tmpdir) / "new_base"
         client = LocalStorageClient(str(base_dir))
         assert base_dir.exists()
-        assert base_dir.is_dir()
\ No newline at end of file
+        assert base_dir.is_dir()
+
+def test_local_storage_client_copies_file_objects(tmp_path):
+    source = io.BytesIO(b"streamed content")
+    source.read(3)
+    path = LocalStorageClient(str(tmp_path)).save_file(source, "streamed.bin")
+    assert Path(path).read_bytes() == b"streamed content"
+
+def test_local_storage_client_failed_write_leaves_no_file(tmp_path):
+    class BrokenStream:
+        def seek(self, position):
+            pass
+        def read(self, size=-1):
+            raise OSError("connection lost")
+
+    client = LocalStorageClient(str(tmp_path))
+    client.save_file(b"good", "image.png")
+    with pytest.raises(OSError):
+        client.save_file(BrokenStream(), "image.png")
+    assert (tmp_path / "image.png").read_bytes() == b"good"
+    assert [p.name for p in tmp_path.iterdir()] == ["image.png"]
+
+def test_local_storage_client_batches_fsyncs_and_caches_directories(tmp_path, monkeypatch):
+    events = []
+    real_fsync, real_replace = os.fsync, os.replace
+    monkeypatch.setattr("AntonIA.services.storage_client.os.fsync", lambda fd: events.append("fsync") or real_fsync(fd))
+    monkeypatch.setattr("AntonIA.services.storage_client.os.replace", lambda src, dst: events.append("replace") or real_replace(src, dst))
+    client = LocalStorageClient(str(tmp_path), fsync="batch", fsync_batch_size=3)
+
+    mkdirs = []
+    real_mkdir = Path.mkdir
+    monkeypatch.setattr(Path, "mkdir", lambda self, *a, **k: mkdirs.append(self) or real_mkdir(self, *a, **k))
+    client.save_file(b"1", "a.png", ["day"])
+    client.save_file(b"2", "b.png", ["day"])
+    # Each file's data is synced before its rename; only the directory sync is deferred
+    assert events == ["fsync", "replace"] * 2 and mkdirs == [tmp_path / "day"]
+
+    client.save_file(b"3", "c.png", ["day"])
+    assert events == ["fsync", "replace"] * 3 + ["fsync"]  # the batch is full: one directory sync
+    client.flush()
+    assert events.count("fsync") == 4
+
+    with pytest.raises(ValueError):
+        LocalStorageClient(str(tmp_path), fsync="sometimes")
+
+def test_content_addressed_layout_stores_identical_content_once(tmp_path):
+    client = LocalStorageClient(str(tmp_path), layout="content_addressed")
+    digest = hashlib.sha256(b"same image").hexdigest()
+
+    first = Path(client.save_file(b"same image", "first.png", ["day1"]))
+    second = Path(client.save_file(io.BytesIO(b"same image"), "second.png", ["day2"]))
+    third = Path(client.save_file(b"ignored, already stored", "third.png", sha256=digest))
+
+    stored = Path(client.lookup(digest))
+    assert stored == tmp_path / "objects" / digest[:2] / digest[2:4] / digest
+    assert [p.read_bytes() for p in (first, second, third)] == [b"same image"] * 3
+    assert stored.stat().st_nlink == 4
+    assert len(list((tmp_path / "objects").glob("*/*/*"))) == 1
+    assert client.lookup("0" * 64) is None
+
+def test_content_addressed_garbage_collection_keeps_referenced_objects(tmp_path, monkeypatch):
+    client = LocalStorageClient(str(tmp_path), layout="content_addressed")
+    kept = Path(client.save_file(b"kept", "kept.png"))
+    dropped = Path(client.save_file(b"dropped", "dropped.png"))
+
+    def unsupported_link(*args):
+        raise OSError(errno.EPERM, "hard links not supported")
+    monkeypatch.setattr("AntonIA.services.storage_client.os.link", unsupported_link)
+    saved = Path(client.save_file(b"recorded", "recorded.png"))
+    record = tmp_path / "recorded.png.ref"
+    assert saved.read_bytes() == b"recorded" and saved.parent.parent.parent.name == "objects"
+    assert (tmp_path / record.read_text()) == saved
+
+    dropped.unlink()
+    assert client.collect_garbage() == (1, len(b"dropped"))
+    assert kept.read_bytes() == b"kept"
+    assert saved.read_bytes() == b"recorded"
+
+    with pytest.raises(ValueError):
+        LocalStorageClient(str(tmp_path), layout="flat")
+
+def test_content_addressed_save_stores_again_an_object_collected_before_linking(tmp_path, monkeypatch):
+    client = LocalStorageClient(str(tmp_path), layout="content_addressed")
+    digest = hashlib.sha256(b"image").hexdigest()
+    client.save_file(b"image", "first.png")
+    (tmp_path / "first.png").unlink()
+
+    real_link = os.link
+    collected = []
+    def link_after_garbage_collection(src, dst):
+        if not collected:
+            collected.append(client.collect_garbage())
+        return real_link(src, dst)
+    monkeypatch.setattr("AntonIA.services.storage_client.os.link", link_after_garbage_collection)
+
+    saved = Path(client.save_file(b"image", "second.png", sha256=digest))
+    assert collected == [(1, len(b"image"))]
+    assert saved == tmp_path / "second.png" and saved.read_bytes() == b"image"
+    assert not list(tmp_path.glob("*.ref"))
+
+    def failing_link(src, dst):
+        raise OSError(errno.EIO, "I/O error")
+    monkeypatch.setattr("AntonIA.services.storage_client.os.link", failing_link)
+    with pytest.raises(OSError):
+        client.save_file(b"image", "third.png")
+    assert not (tmp_path / "third.png.ref").exists()
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 calls used by S3StorageClient."""
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+
+    def put_object(self, Bucket, Key, Body, ContentMD5, Metadata):
+        self.objects[Key] = (Body, Metadata)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata):
+        self.uploads["u1"] = (Key, Metadata, {})
+        return {"UploadId": "u1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentMD5):
+        self.uploads[UploadId][2][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        key, metadata, parts = self.uploads.pop(UploadId)
+        bodies = [parts[part["PartNumber"]] for part in MultipartUpload["Parts"]]
+        self.objects[key] = (b"".join(bodies), metadata)
+        etag = hashlib.md5(b"".join(hashlib.md5(body).digest() for body in bodies)).hexdigest()
+        return {"ETag": f'"{etag}-{len(bodies)}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+def test_s3_storage_client_uploads_small_and_multipart_files():
+    fake = FakeS3Client()
+    client = S3StorageClient("bucket", prefix="images/", multipart_threshold=1024,
+                             multipart_chunk_size=S3_MIN_PART_SIZE, max_concurrency=2, client=fake)
+    assert client.save_file(b"small", "a.png", ["Maria", "2025"]) == "s3://bucket/images/Maria/2025/a.png"
+    assert fake.objects["images/Maria/2025/a.png"] == (b"small", {"sha256": hashlib.sha256(b"small").hexdigest()})
+
+    big = bytes(range(256)) * (3 * S3_MIN_PART_SIZE // 256 + 7)
+    client.save_file(io.BytesIO(big), "big.png")
+    body, metadata = fake.objects["images/big.png"]
+    assert body == big and metadata["sha256"] == hashlib.sha256(big).hexdigest()
+    assert fake.uploads == {}
+
+def test_s3_storage_client_only_checks_etags_when_asked():
+    class EncryptedS3Client(FakeS3Client):
+        """Like SSE-KMS buckets, returns ETags that are not the MD5 of the data."""
+        def put_object(self, **kwargs):
+            super().put_object(**kwargs)
+            return {"ETag": '"0"'}
+        def upload_part(self, **kwargs):
+            super().upload_part(**kwargs)
+            return {"ETag": '"0"'}
+
+    fake = EncryptedS3Client()
+    client = S3StorageClient("bucket", multipart_threshold=10, multipart_chunk_size=S3_MIN_PART_SIZE, client=fake)
+    client.save_file(b"x" * 5, "small.png")
+    client.save_file(b"x" * 100, "big.png")
+    assert set(fake.objects) == {"small.png", "big.png"}
+
+    fake = EncryptedS3Client()
+    client = S3StorageClient("bucket", multipart_threshold=10, multipart_chunk_size=S3_MIN_PART_SIZE,
+                             verify_etag=True, client=fake)
+    with pytest.raises(IOError):
+        client.save_file(b"x" * 100, "a.png", sha256="0" * 64)
+    assert fake.uploads == {} and fake.objects == {}
+
+    with pytest.raises(ValueError):
+        S3StorageClient("bucket", multipart_chunk_size=1024, client=fake)
+
+def test_s3_storage_client_against_moto(monkeypatch):
+    pytest.importorskip("moto")
+    import boto3
+    from moto import mock_aws
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="antonia")
+        client = S3StorageClient("antonia", region="us-east-1", multipart_threshold=S3_MIN_PART_SIZE,
+                                 multipart_chunk_size=S3_MIN_PART_SIZE)
+        big = b"y" * (2 * S3_MIN_PART_SIZE + 1)
+        client.save_file(b"small", "a.png")
+        client.save_file(big, "b.png", ["day"])
+
+        stored = boto3.client("s3", region_name="us-east-1").get_object(Bucket="antonia", Key="day/b.png")
+        assert stored["Body"].read() == big
+        assert stored["ETag"].strip('"').endswith("-3")
@@ -1,4 +1,5 @@
 import pytest
+from AntonIA.common.config import EncodingConfig, HttpConfig, PostprocessingConfig, RateLimitConfig, RetryConfig, StorageConfig
 from AntonIA.pipeline import main
 
 @pytest.fixture
@@ -56,4 +57,318 @@ def mock_dependencies(monkeypatch):
 
 def test_main_runs_without_error(mock_dependencies):
     # Should not raise any exceptions
-    main("test_persona")
\ No newline at end of file
+    main("test_persona")
+
+def test_run_batch_reports_each_persona(monkeypatch):
+    from AntonIA import pipeline
+
+    base_config = type("Config", (), {
+        "image": type("Image", (), {"storage_path": "/tmp/images"})(),
+        "database": type("Database", (), {})(),
+        "rate_limits": RateLimitConfig(enabled=True),
+        "http": HttpConfig(),
+        "storage": StorageConfig(),
+    })()
+    monkeypatch.setattr(pipeline, "load_config", lambda persona, config_dir: base_config)
+    monkeypatch.setattr(pipeline, "LocalStorageClient", lambda base_dir, **kwargs: "storage_client")
+    monkeypatch.setattr(pipeline, "build_database_client", lambda database_config: "db_client")
+
+    calls = []
+    def fake_main(persona, config_dir, shared_clients):
+        calls.append((persona, shared_clients))
+        if persona == "broken":
+            raise RuntimeError("boom")
+    monkeypatch.setattr(pipeline, "main", fake_main)
+
+    results = pipeline.run_batch(["a", "broken", "b"], config_dir="cfg", max_workers=2)
+
+    assert [r.persona for r in results] == ["a", "broken", "b"]
+    assert [r.success for r in results] == [True, False, True]
+    assert results[1].error == "RuntimeError: boom"
+    # Shared clients are built once and handed to every run
+    assert len({id(shared) for _, shared in calls}) == 1
+    assert calls[0][1].database_client == "db_client"
+    assert calls[0][1].rate_limiter is not None
+    assert calls[0][1].http_clients is not None
+
+def test_run_batch_survives_an_invalid_first_persona(monkeypatch):
+    from AntonIA import pipeline
+
+    base_config = type("Config", (), {})()
+    def fake_load_config(persona, config_dir):
+        if persona == "missing":
+            raise FileNotFoundError("Persona configuration file not found")
+        return base_config
+    monkeypatch.setattr(pipeline, "load_config", fake_load_config)
+    monkeypatch.setattr(pipeline, "build_shared_clients", lambda config: pipeline.SharedClients("storage", "db"))
+    monkeypatch.setattr(pipeline, "main", lambda persona, config_dir, shared_clients: pipeline.load_config(persona, config_dir))
+
+    results = pipeline.run_batch(["missing", "a"], config_dir="cfg")
+
+    assert [r.success for r in results] == [False, True]
+    assert results[0].error.startswith("FileNotFoundError")
+
+
+def test_run_batch_empty_list():
+    from AntonIA import pipeline
+    assert pipeline.run_batch([]) == []
+
+
+def test_amain_runs_caption_and_image_concurrently(monkeypatch):
+    import asyncio
+    from AntonIA import pipeline
+
+    config = type("Config", (), {
+        "llm": type("LLM", (), {"api_key": "k", "model": "m", "system_prompt": "s", "temperature": 0.5,
+                              "structured_output": True, "repair_attempts": 2})(),
+        "image": type("Image", (), {"api_key": "k", "model": "m", "size": "512x512", "candidates": 1,
+                                    "postprocessing": PostprocessingConfig(), "encoding": EncodingConfig(),
+                                    "stream_decode": False, "spool_max_memory": 1024})(),
+        "database": type("Database", (), {"runs_table_name": "runs", "past_records_to_retrieve": 1})(),
+        "grandma": type("Grandma", (), {"name": "Test", "language": "en", "watermark_path": None, "hashtags": "#test"})(),
+        "storage": StorageConfig(),
+        "prompts": type("Prompts", (), {
+            "creation_template": "c", "image_gen_template": "i", "instagram_caption_template": "t"
+        })(),
+        "retry": RetryConfig(),
+    })()
+    monkeypatch.setattr(pipeline, "load_config", lambda persona, config_dir: config)
+    monkeypatch.setattr(pipeline, "AsyncOpenAIClient", lambda **kwargs: "llm_client")
+    monkeypatch.setattr(pipeline, "AsyncOpenAIimageGenerationClient", lambda **kwargs: "image_client")
+    monkeypatch.setattr(pipeline.retrieve_past_records, "retrieve_past_n_days", lambda **kwargs: "")
+
+    async def fake_prompt(**kwargs):
+        return "image_prompt", {"phrase": "Hello", "topic": "World", "style": "Modern", "font": "Arial"}
+    monkeypatch.setattr(pipeline.prompt_generator, "agenerate", fake_prompt)
+
+    # Each branch waits for the other one to have started: this only completes if they run concurrently
+    caption_started, image_started = asyncio.Event(), asyncio.Event()
+    async def fake_caption(*args, **kwargs):
+        caption_started.set()
+        await image_started.wait()
+        return "Test caption"
+    async def fake_image(*args, **kwargs):
+        image_started.set()
+        await caption_started.wait()
+        return b"image_bytes"
+    monkeypatch.setattr(pipeline.instagram_caption_generator, "agenerate", fake_caption)
+    monkeypatch.setattr(pipeline.image_generator, "agenerate", fake_image)
+
+    saved = {}
+    monkeypatch.setattr(pipeline.image_saver, "save", lambda image_bytes, storage_client, encoding=None, **shard_options: "/tmp/image.png")
+    monkeypatch.setattr(pipeline.run_info_saver, "save", lambda db, table, run_info: saved.update(run_info=run_info))
+
+    shared = pipeline.SharedClients(storage_client="storage", database_client="db")
+    asyncio.run(asyncio.wait_for(pipeline.amain("p", shared_clients=shared), timeout=5))
+
+    assert saved["run_info"].caption == "Test caption"
+    assert saved["run_info"].image_path == "/tmp/image.png"
+
+    # A run that builds its own clients closes them, async HTTP client included, even when it fails
+    class FakeHttpClients:
+        closed = []
+        def async_client(self):
+            return "async_http_client"
+        async def aclose(self):
+            self.closed.append("aclose")
+        def close(self):
+            self.closed.append("close")
+    monkeypatch.setattr(pipeline, "build_shared_clients", lambda config: pipeline.SharedClients("storage", "db", http_clients=FakeHttpClients()))
+    async def failing_prompt(**kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(pipeline.prompt_generator, "agenerate", failing_prompt)
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.amain("p"))
+    assert FakeHttpClients.closed == ["aclose", "close"]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_build_stage_graph_runs_end_to_end_with_mock_clients(stream):
+    from AntonIA import pipeline
+    from AntonIA.services import MockAIClient, MockImageGenerationClient, MockStorageClient, MockDatabaseClient
+
+    config = type("Config", (), {
+        "llm": type("LLM", (), {"temperature": 0.5, "stream": stream, "structured_output": True, "repair_attempts": 2})(),
+        "image": type("Image", (), {"size": "512x512", "candidates": 1, "postprocessing": PostprocessingConfig(sharpen=0.5),
+                                    "encoding": EncodingConfig(format="JPEG"), "stream_decode": stream})(),
+        "database": type("Database", (), {"runs_table_name": "runs", "past_records_to_retrieve": 1})(),
+        "grandma": type("Grandma", (), {"name": "Test", "language": "en", "watermark_path": None, "hashtags": "#test"})(),
+        "storage": StorageConfig(sharding="persona_date"),
+        "prompts": type("Prompts", (), {
+            "creation_template": "{{day_of_week}} {{past_records}} {{language}}",
+            "image_gen_template": "{{phrase}} {{topic}} {{style}} {{font}} {{language}}",
+            "instagram_caption_template": "{{phrase}} {{topic}} {{style}} {{language}} {{hashtags}}",
+        })(),
+    })()
+    database_client = MockDatabaseClient()
+
+    graph = pipeline.build_stage_graph(
+        config,
+        MockAIClient(response='{"phrase": "Hello", "topic": "Sun", "style": "Oil", "font": "Serif"}'),
+        MockAIClient(response="A caption"),
+        MockImageGenerationClient(),
+        MockStorageClient(),
+        database_client,
+    )
+    result = graph.run()
+
+    assert set(result.timings) == {s.name for s in graph.stages}
+    record = database_client.get_all_records("runs").iloc[0]
+    assert record["caption"] == "A caption"
+    assert record["prompt"] == "Hello sun oil serif en"
+    assert record["image_path"].startswith("mock://")
+    assert record["image_path"].startswith("mock://Test/") and record["image_path"].endswith(".jpg")
+
+
+def test_main_resumes_failed_run_from_checkpoint(monkeypatch, tmp_path):
+    from AntonIA import pipeline
+    from AntonIA.common.stage_graph import StageGraph, StageFailedError
+
+    config = type("Config", (), {
+        "llm": type("LLM", (), {"api_key": "k", "model": "m", "system_prompt": "s", "cache": None})(),
+        "image": type("Image", (), {"api_key": "k", "model": "m", "cache": None, "spool_max_memory": 1024})(),
+        "grandma": type("Grandma", (), {"language": "en"})(),
+        "pipeline": type("Pipeline", (), {"checkpoint_dir": str(tmp_path)})(),
+        "retry": RetryConfig(),
+    })()
+    monkeypatch.setattr(pipeline, "load_config", lambda persona, config_dir: config)
+    monkeypatch.setattr(pipeline, "OpenAIClient", lambda **kwargs: "llm_client")
+    monkeypatch.setattr(pipeline, "OpenAIimageGenerationClient", lambda **kwargs: "image_client")
+    monkeypatch.setattr(pipeline, "with_llm_cache", lambda client, cache_config: client)
+    monkeypatch.setattr(pipeline, "with_image_cache", lambda client, cache_config: client)
+
+    calls = []
+    attempts = {"second": 0}
+    def second(value):
+        attempts["second"] += 1
+        if attempts["second"] == 1:
+            raise RuntimeError("transient failure")
+        calls.append("second")
+    def build_graph(*args):
+        graph = StageGraph()
+        graph.add("first", lambda: calls.append("first") or 1, outputs=("value",))
+        graph.add("second", second, inputs=("value",))
+        return graph
+    monkeypatch.setattr(pipeline, "build_stage_graph", build_graph)
+
+    shared = pipeline.SharedClients(storage_client="storage", database_client="db")
+    with pytest.raises(StageFailedError):
+        pipeline.main("p", shared_clients=shared)
+    (run_dir,) = tmp_path.iterdir()
+
+    pipeline.main("p", shared_clients=shared, resume_run_id=run_dir.name)
+    assert calls == ["first", "second"]
+    assert not run_dir.exists()
+
+
+def test_run_batch_offline_checkpoints_batch_results_and_resumes_each_persona(monkeypatch, tmp_path):
+    from AntonIA import pipeline
+    from AntonIA.common.checkpoint import RunCheckpoint
+    from AntonIA.services import MockDatabaseClient
+    from AntonIA.services.batch_client import MockBatchClient
+
+    def make_config(persona):
+        return type("Config", (), {
+            "llm": type("LLM", (), {"model": "m", "system_prompt": "s", "temperature": 0.5, "structured_output": True})(),
+            "database": type("Database", (), {"runs_table_name": f"{persona}_runs", "past_records_to_retrieve": 1})(),
+            "grandma": type("Grandma", (), {"language": "en", "hashtags": "#test"})(),
+            "prompts": type("Prompts", (), {
+                "creation_template": "{{language}}", "image_gen_template": "{{phrase}}", "instagram_caption_template": "{{phrase}}",
+            })(),
+            "pipeline": type("Pipeline", (), {"checkpoint_dir": str(tmp_path)})(),
+        })()
+    monkeypatch.setattr(pipeline, "load_config", lambda persona, config_dir: make_config(persona))
+    monkeypatch.setattr(pipeline, "build_shared_clients", lambda config: pipeline.SharedClients("storage", MockDatabaseClient()))
+
+    class ScriptedBatchClient(MockBatchClient):
+        """First batch returns prompts (malformed for 'b'), second batch returns captions."""
+        def run(self, requests):
+            super().run(requests)
+            if len(self.batches) == 1:
+                return {r.custom_id: "oops" if r.custom_id.startswith("b_") else '{"phrase": "Hi", "topic": "t", "style": "s", "font": "f"}'
+                        for r in requests}
+            return {r.custom_id: f"caption {r.prompt}" for r in requests}
+
+    resumed = {}
+    def fake_main(persona, config_dir, shared_clients, resume_run_id):
+        resumed[persona] = RunCheckpoint.resume(str(tmp_path), resume_run_id).completed_stages()
+    monkeypatch.setattr(pipeline, "main", fake_main)
+
+    batch_client = ScriptedBatchClient()
+    results = pipeline.run_batch_offline(["a", "b", "c"], config_dir="cfg", batch_client=batch_client)
+
+    assert [r.success for r in results] == [True, False, True]
+    assert "generate_prompt" in results[1].error
+    assert [len(batch) for batch in batch_client.batches] == [3, 2]
+    assert batch_client.batches[0][0].response_format["type"] == "json_schema"
+    assert set(resumed) == {"a", "c"}
+    assert resumed["a"]["generate_prompt"]["prompt_for_image_generation"] == "Hi"
+    assert resumed["a"]["generate_caption"] == {"caption": "caption Hi"}
+    assert set(resumed["c"]) == {"retrieve_past_records", "generate_prompt", "generate_caption"}
+
+
+def test_run_batch_offline_survives_an_invalid_first_persona(monkeypatch, tmp_path):
+    from AntonIA import pipeline
+    from AntonIA.services import MockDatabaseClient
+    from AntonIA.services.batch_client import MockBatchClient
+
+    def fake_load_config(persona, config_dir):
+        if persona == "missing":
+            raise FileNotFoundError("Persona configuration file not found")
+        return type("Config", (), {
+            "llm": type("LLM", (), {"model": "m", "system_prompt": "s", "temperature": 0.5, "structured_output": False})(),
+            "database": type("Database", (), {"runs_table_name": f"{persona}_runs", "past_records_to_retrieve": 1})(),
+            "grandma": type("Grandma", (), {"language": "en", "hashtags": "#test"})(),
+            "prompts": type("Prompts", (), {
+                "creation_template": "{{language}}", "image_gen_template": "{{phrase}}", "instagram_caption_template": "{{phrase}}",
+            })(),
+            "pipeline": type("Pipeline", (), {"checkpoint_dir": str(tmp_path)})(),
+        })()
+    monkeypatch.setattr(pipeline, "load_config", fake_load_config)
+    monkeypatch.setattr(pipeline, "build_shared_clients", lambda config: pipeline.SharedClients("storage", MockDatabaseClient()))
+    monkeypatch.setattr(pipeline, "main", lambda persona, config_dir, shared_clients, resume_run_id: None)
+
+    class ValidBatchClient(MockBatchClient):
+        def run(self, requests):
+            super().run(requests)
+            return {r.custom_id: '{"phrase": "Hi", "topic": "t", "style": "s", "font": "f"}' for r in requests}
+
+    results = pipeline.run_batch_offline(["missing", "a"], config_dir="cfg", batch_client=ValidBatchClient())
+
+    assert [r.success for r in results] == [False, True]
+    assert results[0].error.startswith("FileNotFoundError")
+
+
+def test_migrate_storage_moves_images_and_rewrites_run_records(monkeypatch, tmp_path):
+    from AntonIA import pipeline
+    from AntonIA.services import MockDatabaseClient
+
+    storage_path = tmp_path / "images"
+    storage_path.mkdir()
+    image = storage_path / "20240102_080000_abcdef12.png"
+    image.write_bytes(b"image")
+    class ClosableDatabaseClient(MockDatabaseClient):
+        closed = False
+        def close(self):
+            self.closed = True
+    database_client = ClosableDatabaseClient()
+    database_client.save_record("Maria_runs", {"image_path": str(image)})
+
+    def fake_load_config(persona=None, config_dir=None):
+        return type("Config", (), {
+            "image": type("Image", (), {"storage_path": str(storage_path)})(),
+            "storage": StorageConfig(sharding="persona_date"),
+            "database": type("Database", (), {"runs_table_name": "Maria_runs"})(),
+            "grandma": type("Grandma", (), {"name": "Maria"})(),
+        })()
+    monkeypatch.setattr(pipeline, "load_config", fake_load_config)
+    monkeypatch.setattr(pipeline, "list_personas", lambda config_dir: ["maria"])
+    monkeypatch.setattr(pipeline, "build_database_client", lambda database_config: database_client)
+
+    moves = pipeline.migrate_storage(config_dir="cfg")
+
+    new_path = storage_path / "Maria" / "2024" / "01" / "02" / image.name
+    assert moves == [(str(image), str(new_path))]
+    assert new_path.read_bytes() == b"image"
+    assert database_client.tables["Maria_runs"][0]["image_path"] == str(new_path)
+    assert database_client.closed
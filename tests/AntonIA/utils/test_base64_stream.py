@@ -0,0 +1,29 @@
+import base64
+import hashlib
+import io
+import os
+
+import pytest
+
+from AntonIA.utils.base64_stream import decode_base64_spooled, decode_base64_to
+
+
+def test_chunked_decode_matches_b64decode_and_hashes_output():
+    data = os.urandom(10_003)
+    sink = io.BytesIO()
+    size, sha256 = decode_base64_to(base64.b64encode(data).decode(), sink, chunk_size=64)
+    assert sink.getvalue() == data
+    assert (size, sha256) == (len(data), hashlib.sha256(data).hexdigest())
+
+def test_spooled_decode_spills_to_disk_above_max_memory():
+    data = os.urandom(5000)
+    small = decode_base64_spooled(base64.b64encode(data).decode(), max_memory=10_000)
+    large = decode_base64_spooled(base64.b64encode(data).decode(), max_memory=1000, chunk_size=400)
+    assert not small.file._rolled and large.file._rolled
+    assert small.file.read() == large.file.read() == data
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(ValueError):
+        decode_base64_to("aGVsbG8=", io.BytesIO(), chunk_size=6)
+    with pytest.raises(ValueError):
+        decode_base64_spooled("not base64!")
@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import pickle
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from AntonIA.utils.base64_stream import decode_base64_spooled
+from AntonIA.utils.image_handle import EncodingOptions, ImageHandle, detect_format, encode
+
+def png_bytes(color=(10, 20, 30)):
+    output = BytesIO()
+    Image.new("RGB", (8, 6), color).save(output, format="PNG")
+    return output.getvalue()
+
+def test_unmodified_bytes_are_stored_as_received_without_decoding():
+    data = png_bytes()
+    handle = ImageHandle.from_bytes(data)
+    encoded = handle.encode()
+
+    assert encoded.data is data
+    assert encoded.sha256 == hashlib.sha256(data).hexdigest()
+    assert not handle.is_decoded
+    assert encode(data) == encoded
+
+def test_decoded_images_are_encoded_once_with_the_hash_of_the_output():
+    handle = ImageHandle.from_array(np.full((6, 8, 3), 300.0, dtype=np.float32))
+    first = handle.encode()
+
+    assert handle.encode() is first
+    assert first.sha256 == hashlib.sha256(first.data).hexdigest()
+    assert not handle.is_decoded  # pixels released after encoding
+    assert handle.array()[0, 0].tolist() == [255.0, 255.0, 255.0]
+
+def test_handles_pickle_in_encoded_form():
+    handle = ImageHandle.from_array(np.zeros((6, 8, 3), dtype=np.uint8))
+    restored = pickle.loads(pickle.dumps(handle))
+    assert restored.encode() == handle.encode()
+
+def test_handle_needs_data_or_image():
+    with pytest.raises(ValueError):
+        ImageHandle()
+
+@pytest.mark.parametrize("options", [
+    EncodingOptions("JPEG", quality=80, progressive=True),
+    EncodingOptions("WEBP", quality=75, optimize=True),
+    EncodingOptions("PNG", compress_level=1),
+])
+def test_encoding_options_select_format_and_extension(options):
+    encoded = encode(png_bytes(), options)
+    assert detect_format(encoded.data) == encoded.format == options.format
+    assert encoded.extension == options.extension
+    assert Image.open(BytesIO(encoded.data)).size == (8, 6)
+
+def test_storage_encoding_overrides_the_handle_encoding():
+    handle = ImageHandle.from_array(np.zeros((6, 8, 3), dtype=np.uint8))
+    assert handle.encode(EncodingOptions("JPEG")).format == "JPEG"
+    with pytest.raises(ValueError):
+        EncodingOptions("GIF")
+
+def test_file_handles_are_stored_from_the_file_when_no_conversion_is_needed():
+    data = png_bytes()
+    handle = ImageHandle.from_file(BytesIO(data), sha256="precomputed")
+    encoded = handle.encode()
+    assert not isinstance(encoded.data, bytes)
+    assert encoded.read_bytes() == data and encoded.sha256 == "precomputed"
+    assert pickle.loads(pickle.dumps(handle)).to_bytes() == data
+
+    converted = ImageHandle.from_file(BytesIO(data)).encode(EncodingOptions("JPEG"))
+    assert detect_format(converted.data) == "JPEG"
+
+def test_unpickled_file_handles_can_be_re_encoded():
+    decoded = decode_base64_spooled(base64.b64encode(png_bytes()).decode("ascii"))
+    handle = ImageHandle.from_file(decoded.file, sha256=decoded.sha256)
+
+    restored = pickle.loads(pickle.dumps(handle))
+    encoded = restored.encode(EncodingOptions("JPEG", progressive=True))
+    assert detect_format(encoded.data) == "JPEG"
+    assert Image.open(BytesIO(encoded.data)).size == (8, 6)
@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from AntonIA.utils import image_postprocessing
+from AntonIA.utils.image_postprocessing import PostProcessChain
+from AntonIA.utils.image_utils import WatermarkOverlayCache
+
+
+def png_bytes(color=(100, 150, 200), size=(120, 80)):
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+def decode(image_bytes):
+    return np.asarray(Image.open(BytesIO(image_bytes)).convert("RGB"))
+
+
+def test_chain_decodes_once_and_defers_encoding(monkeypatch):
+    image_bytes = png_bytes()
+    saves = []
+    original_save = Image.Image.save
+    monkeypatch.setattr(Image.Image, "save", lambda self, *a, **k: saves.append(1) or original_save(self, *a, **k))
+
+    chain = PostProcessChain([
+        image_postprocessing.color_grade(brightness=10),
+        image_postprocessing.sharpen(0.5),
+        image_postprocessing.color_grade(contrast=1.0, warmth=5),
+    ])
+    handle = chain(image_bytes)
+    assert saves == []  # encoding is deferred to the storage step
+
+    result = decode(handle.to_bytes())
+    assert len(saves) == 1
+    assert tuple(result[40, 60]) == (115, 160, 205)
+
+def test_resize_crops_to_aspect_ratio_and_resizes():
+    op = image_postprocessing.resize(width=40, aspect_ratio="4:5")
+    assert op(np.zeros((80, 120, 3), dtype=np.float32)).shape == (50, 40, 3)
+    assert image_postprocessing.resize(width=60)(np.zeros((80, 120, 3), dtype=np.float32)).shape == (40, 60, 3)
+    with pytest.raises(ValueError):
+        image_postprocessing.resize(aspect_ratio="wide")
+
+def test_color_grade_saturation_zero_gives_grey():
+    array = np.array([[[255.0, 0.0, 0.0]]], dtype=np.float32)
+    grey = image_postprocessing.color_grade(saturation=0.0)(array)
+    assert np.allclose(grey, 255 * 0.299, atol=1e-3)
+
+def test_sharpen_leaves_flat_images_unchanged_and_boosts_edges():
+    flat = np.full((5, 5, 3), 90.0, dtype=np.float32)
+    assert np.allclose(image_postprocessing.sharpen(1.0)(flat), flat)
+
+    edge = np.zeros((5, 6, 3), dtype=np.float32)
+    edge[:, 3:] = 200.0
+    sharpened = image_postprocessing.sharpen(1.0)(edge)
+    assert sharpened[2, 3, 0] > 200.0 and sharpened[2, 2, 0] < 0.0
+
+def test_text_overlay_and_watermark_only_touch_their_regions(tmp_path):
+    watermark_path = tmp_path / "watermark.png"
+    Image.new("RGBA", (10, 10), (255, 255, 255, 255)).save(watermark_path)
+    base = np.zeros((200, 200, 3), dtype=np.float32)
+
+    marked = image_postprocessing.watermark(str(watermark_path), opacity=0.5, scale=0.2, overlay_cache=WatermarkOverlayCache())(base.copy())
+    assert np.allclose(marked[185, 185], 255 * 0.5, atol=1.5)
+    assert not marked[:150, :150].any()
+
+    written = image_postprocessing.text_overlay("Buenos días")(base.copy())
+    assert written[-20:].any()
+    assert not written[:100].any()
@@ -0,0 +1,50 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+from AntonIA.utils.image_scoring import METRICS, colorfulness, sharpness, text_contrast, score_images, weighted_scorer, map_candidates
+
+def checkerboard(size=128, square=8):
+    pattern = (np.indices((size, size)) // square).sum(axis=0) % 2
+    return Image.fromarray((pattern * 255).astype(np.uint8)).convert("RGB")
+
+def to_png(image):
+    buf = BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+def test_sharpness_drops_when_blurred():
+    image = checkerboard()
+    assert sharpness(image) > sharpness(image.filter(ImageFilter.GaussianBlur(4)))
+
+def test_colorfulness_of_grey_is_zero():
+    assert colorfulness(Image.new("RGB", (32, 32), (128, 128, 128))) == 0
+    assert colorfulness(Image.new("RGB", (32, 32), (255, 0, 0))) > 0
+
+def test_text_contrast_detects_written_text():
+    plain = Image.new("RGB", (256, 256), "white")
+    written = plain.copy()
+    ImageDraw.Draw(written).text((10, 120), "Buenos dias " * 4, fill="black")
+    assert text_contrast(written) > text_contrast(plain) == 0
+
+def test_weighted_scorer_rejects_unknown_metrics():
+    with pytest.raises(ValueError):
+        weighted_scorer({"beauty": 1.0})
+
+def test_score_images_keeps_input_order():
+    sharp, blurred = checkerboard(), checkerboard().filter(ImageFilter.GaussianBlur(4))
+    scores = score_images([to_png(blurred), to_png(sharp)], weighted_scorer({"sharpness": 1.0}))
+    assert scores[1] > scores[0]
+
+def test_map_candidates_runs_on_the_shared_pool_in_order():
+    import threading
+    names = map_candidates(lambda i: (i, threading.current_thread().name), [1, 2, 3])
+    assert [i for i, _ in names] == [1, 2, 3]
+    assert all(name.startswith("candidate") for _, name in names)
+    assert map_candidates(lambda i: threading.current_thread().name, [1]) == [threading.current_thread().name]
+
+def test_metrics_match_the_names_accepted_by_the_config():
+    from AntonIA.common.config import IMAGE_SCORING_METRICS
+    assert set(METRICS) == set(IMAGE_SCORING_METRICS)
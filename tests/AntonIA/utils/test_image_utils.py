@@ -55,6 +55,27 @@ def test_add_watermark_fn_factory_valid():
     assert result_img.size == (100, 100)
     os.remove(watermark_path)
 
+def test_overlay_cache_reuses_overlays_until_the_file_changes():
+    watermark_path = create_temp_watermark()
+    cache = image_utils.WatermarkOverlayCache()
+
+    first = image_utils.add_watermark(create_test_image(), watermark_path, overlay_cache=cache)
+    second = image_utils.add_watermark(create_test_image(), watermark_path, overlay_cache=cache)
+    image_utils.add_watermark(create_test_image(size=(200, 200)), watermark_path, overlay_cache=cache)
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    overlay = cache.overlay(watermark_path, 100, 0.8, 0.2)
+    assert overlay.size == (20, 20)
+    assert overlay.getpixel((0, 0))[3] == int(128 * 0.8)
+
+    Image.new("RGBA", (20, 20), (0, 0, 255, 255)).save(watermark_path, format="PNG")
+    stat = os.stat(watermark_path)
+    os.utime(watermark_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.overlay(watermark_path, 100, 0.8, 0.2).getpixel((0, 0)) == (0, 0, 255, int(255 * 0.8))
+    assert cache.misses == 3
+    os.remove(watermark_path)
+
 def test_add_watermark_fn_factory_missing_file():
     fn = image_utils.add_watermark_fn_factory("nonexistent_file.png")
     assert fn is None
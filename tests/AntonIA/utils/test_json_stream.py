@@ -0,0 +1,32 @@
+import pytest
+from AntonIA.utils.json_stream import IncrementalJSONObjectParser, extract_json_object
+
+def feed_all(parser, text, chunk_size):
+    return [parser.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+
+def test_fields_are_reported_once_complete():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('{"phrase": "Buenos d') == {}
+    assert parser.feed('ías", "topic": "sol"') == {"phrase": "Buenos días", "topic": "sol"}
+    assert parser.feed(', "style"') == {}
+    assert parser.feed(': "óleo"}') == {"style": "óleo"}
+    assert parser.fields == {"phrase": "Buenos días", "topic": "sol", "style": "óleo"}
+
+def test_escaped_quotes_and_colons_inside_strings():
+    parser = IncrementalJSONObjectParser()
+    text = '{"phrase": "Say \\"hi\\": now, ok", "topic": "a, b"}'
+    feed_all(parser, text, 3)
+    assert parser.fields == {"phrase": 'Say "hi": now, ok', "topic": "a, b"}
+
+def test_code_fence_nested_and_non_string_values_are_ignored():
+    parser = IncrementalJSONObjectParser()
+    text = '```json\n{"n": 3, "tags": ["x", "y"], "meta": {"k": "v"}, "style": "oil"}\n```'
+    feed_all(parser, text, 5)
+    assert parser.fields == {"style": "oil"}
+    assert parser.text == text
+
+def test_extract_json_object_skips_fences_prose_and_invalid_braces():
+    text = 'Sure! {not json} here it is:\n```json\n{"phrase": "Hola {amigo}", "n": [1]}\n```\nAnything else?'
+    assert extract_json_object(text) == {"phrase": "Hola {amigo}", "n": [1]}
+    with pytest.raises(ValueError):
+        extract_json_object('no object here, only [1, 2]')